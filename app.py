@@ -1,10 +1,2 @@
-
-from dash import Dash
-import dash_bootstrap_components as dbc
-
-
-# Initialize the Dash app
-app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP], suppress_callback_exceptions=True)
-
-
-server = app.server 
\ No newline at end of file
+# The app is built in index.py; this module only keeps `app:server` working
+from index import app, server  # noqa: F401
@@ -0,0 +1,113 @@
+"""Cache backends side by side: round trips, TTL, size limits and get/put latency.
+
+    python -m benchmarks.cache_backends --rows 100000
+
+Runs the same checks on the memory, disk and Redis backends (the latter
+against benchmarks.fake_redis): a prepared core partition and every tab's
+pivot tables must come back equal, entries must expire after their TTL and
+values over the namespace size must not be kept. Then times put/get of a
+partition and of one tab's pivots. Exits 1 on any mismatch.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.synthetic import core_rows
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def same(a, b):
+    if isinstance(a, pd.DataFrame):
+        return isinstance(b, pd.DataFrame) and a.equals(b) and list(a.dtypes) == list(b.dtypes)
+    if isinstance(a, (list, tuple)):
+        return type(a) is type(b) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def check(name, backend, partition, pivots, repeat):
+    failures = []
+    blob = backend.namespace('check-values', 1024 * 1024 * 1024)
+    for key, value in [((partition[0]['booking_date'].iloc[0], 'open'), partition),
+                       ('agent-7', ['/core', '/feedback']), *pivots.items()]:
+        blob.put(key, value)
+        if not same(value, blob.get(key)):
+            failures.append(f"round trip of {key!r}")
+
+    short = backend.namespace('check-ttl', 1024 * 1024, ttl=0.2)
+    short.put('default', 1)
+    short.put('longer', 2, ttl=60)
+    time.sleep(0.3)
+    if short.get('default') is not None or short.get('longer') != 2:
+        failures.append("TTL")
+
+    small = backend.namespace('check-size', 64 * 1024)
+    small.put('big', partition)
+    if name == 'memory':
+        # The memory LRU keeps the newest entry even if it alone is over the limit
+        small.put('small', 'x')
+        kept = 'big' in small
+    else:
+        kept = small.get('big') is not None
+    if kept:
+        failures.append("size limit")
+    if small.pop('missing', 'default') != 'default':
+        failures.append("pop default")
+
+    tab = next(iter(pivots.values()))
+    timings = {
+        'put partition': median_ms(lambda: blob.put('partition', partition), repeat),
+        'get partition': median_ms(lambda: blob.get('partition'), repeat),
+        'put pivots': median_ms(lambda: blob.put('pivots', tab), repeat),
+        'get pivots': median_ms(lambda: blob.get('pivots'), repeat),
+    }
+    print(f"\n{name}: {'ok' if not failures else 'FAILED ' + ', '.join(failures)}")
+    for label, ms in timings.items():
+        print(f"  {label:14} {ms:8.2f} ms")
+    for namespace, stats in backend.stats().items():
+        print(f"  {namespace:13} {stats}")
+    for namespace in backend.namespaces.values():
+        namespace.clear()
+    backend.close()
+    return not failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+    from services import cache
+
+    df = core.prepare_data(core.fill_core_nulls(core_rows(args.rows, days=30))).reset_index(drop=True)
+    stored = core.datasets.register(df, key=f"bench:{args.rows}")
+    day = df['booking_date'].iloc[0]
+    partition = (df[df['booking_date'] == day].reset_index(drop=True), time.time(), True)
+    pivots = {tab: core.tab_pivots(stored, tab) for tab in core.TAB_CONTAINERS}
+    print(f"{args.rows} rows, partition of {len(partition[0])} rows")
+
+    ok = check('memory', cache.MemoryBackend(), partition, pivots, args.repeat)
+    ok = check('disk', cache.DiskBackend(tempfile.mkdtemp(prefix='bridge_cache_')), partition, pivots,
+               args.repeat) and ok
+    with FakeRedisServer(password='secret') as server:
+        ok = check('redis (fake)', cache.from_url(server.url), partition, pivots, args.repeat) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
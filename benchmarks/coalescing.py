@@ -0,0 +1,68 @@
+"""Shift-start burst: many users load the same period at once.
+
+    python -m benchmarks.coalescing --users 40 --latency 2
+
+Replaces fetch_core_data with a synthetic query that takes --latency
+seconds, then starts --users threads that each ask the core partition
+cache for the same range, like agents clicking "Today" together. Reports
+how many queries ran and how many callers waited on the day lock and then
+used the partition another caller stored (load_waits.loads). One query and
+--users - 1 coalesced callers is the expected outcome; fails otherwise.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from benchmarks.synthetic import core_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=2.0)
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+    from services import load_waits
+    from services.partition_cache import ist_today
+
+    today = ist_today()
+    raw = core_rows(args.rows, days=1, start=str(today))
+
+    fetches = []
+
+    def slow_fetch(start_date, end_date):
+        fetches.append((start_date, end_date))
+        time.sleep(args.latency)
+        return core.fill_core_nulls(raw.copy())
+
+    core.fetch_core_data = slow_fetch
+    core.core_cache.invalidate()
+    before = load_waits.loads.stats()
+
+    barrier = threading.Barrier(args.users)
+    sizes = []
+
+    def user():
+        barrier.wait()
+        sizes.append(len(core.core_cache.get_range(today, today)))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user) for _ in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    coalesced = load_waits.loads.stats()['coalesced'] - before['coalesced']
+    print(f"{args.users} users in {elapsed:.2f} s: {len(fetches)} queries ran, {coalesced} coalesced, "
+          f"{len(set(sizes))} distinct result size(s)")
+    return 0 if len(fetches) == 1 and coalesced == args.users - 1 and len(set(sizes)) == 1 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
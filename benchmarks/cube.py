@@ -0,0 +1,84 @@
+"""Core pivot callbacks answered from the count cube vs scanning the rows.
+
+    python -m benchmarks.cube --rows 100000 1000000
+
+"rows" is what filter_data + update_pivot_tables did before the cube:
+filter the stored rows, then run create_pivot_table once per table.
+"cube" slices CountCube for the same tables. Exits non-zero if any table
+differs between the two.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import core_rows
+
+# (index, columns, cube restriction, equivalent row restriction)
+TABLES = [
+    (['master_service'], ['new_status'], None, None),
+    (['crm_admin_name'], ['new_status'], None, None),
+    (['user_source'], ['new_status'], None, None),
+    (['Activity_Status_Final', 'comments'], ['vehicle_type'],
+     {'Activity_Status_Final': ['Cancelled Booking']}, "Activity_Status_Final == 'Cancelled Booking'"),
+    (['Activity_Status_Final', 'comments'], ['vehicle_type'],
+     {'Activity_Status_Final': ['Other Booking']}, "Activity_Status_Final == 'Other Booking'"),
+    (['cleaned_category'], ['vehicle_type'], {'followup_eligible': [True]}, "followup_eligible"),
+]
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+    from services.aggregation import CountCube
+
+    failed = False
+    for rows in args.rows:
+        df = core.prepare_data(core.fill_core_nulls(core_rows(rows, days=args.days)))
+        stored = core.datasets.register(df, key=f"bench:{rows}")
+        filters = {
+            'cities': sorted(df['city'].astype(str).unique())[:3],
+            'crm_admins': sorted(df['crm_admin_name'].astype(str).unique())[:25],
+        }
+        handle = dict(stored, filters=core.normalize_filters(**filters))
+
+        def from_rows():
+            filtered = core.apply_filters(df, handle['filters'])
+            return [core.create_pivot_table(filtered, index, columns, 'booking_id', 'count', query)
+                    for index, columns, _, query in TABLES]
+
+        def from_cube():
+            return [core.cube_pivot_table(handle, index, columns, where) for index, columns, where, _ in TABLES]
+
+        for expected, actual in zip(from_rows(), from_cube()):
+            if list(expected.columns) != list(actual.columns) or expected.to_dict('records') != actual.to_dict('records'):
+                failed = True
+                print(f"MISMATCH ({rows} rows) {list(expected.columns)[:2]}")
+
+        started = time.perf_counter()
+        cube = CountCube(df, core.CUBE_DIMENSIONS)
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f"\n{rows} rows over {args.days} days: cube {len(cube)} cells, {cube.nbytes / 2**20:.1f} MiB, "
+              f"built in {build_ms:.0f} ms")
+        print(f"  rows  {median_ms(from_rows, args.repeat):8.1f} ms per filter change")
+        print(f"  cube  {median_ms(from_cube, args.repeat):8.1f} ms per filter change")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
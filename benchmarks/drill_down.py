@@ -0,0 +1,63 @@
+"""Drill-down request size and lookup time for a pivot cell click.
+
+    python -m benchmarks.drill_down --rows 100000 1000000
+
+"before" is the request the old toggle_booking_details received: the
+active_cell, data, columns and id of every pivot table on the page plus
+the filtered-data handle. "after" is the active_cell list and the handle.
+Lookup time is drill_down_rows for the clicked cell.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import core_rows
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    for rows in args.rows:
+        df = core.prepare_data(core.fill_core_nulls(core_rows(rows, days=30)))
+        handle = dict(core.datasets.register(df, key=f"bench:{rows}"), filters={})
+
+        tables = []
+        for (table_index, suffix), (index_cols, column_cols, where) in core.PIVOT_TABLES.items():
+            component = core.create_pivot_table_component(
+                core.cube_pivot_table(handle, index_cols, column_cols, where), index_cols, "", suffix)
+            tables.append(component.children[1])
+
+        clicked = next(table for table in tables if table.id['index'] == 'crm_admin_name')
+        record = clicked.data[0]
+        cell = {'row': 0, 'column': 2, 'column_id': 'Goaxled', 'row_id': record['id']}
+        active_cells = [cell if table is clicked else None for table in tables]
+
+        before = json.dumps([active_cells, handle, [table.data for table in tables],
+                             [table.columns for table in tables], [table.id for table in tables]])
+        after = json.dumps([active_cells, handle])
+        lookup = median_ms(lambda: core.drill_down_rows(handle, 'crm_admin_name', '', json.loads(record['id']), 'Goaxled'),
+                           args.repeat)
+        print(f"{rows} rows: request before {len(before) / 1024:.1f} KiB, after {len(after) / 1024:.2f} KiB, "
+              f"lookup {lookup:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Filter and pivot speed of the prepared core frame: object vs compact dtypes.
+
+    python -m benchmarks.dtypes --rows 100000 1000000
+
+"before" converts the prepared frame back to object strings and int64
+flags, which is what prepare_data produced before the dtype change.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import core_rows
+from services.frames import memory_report
+from services.lru import frame_nbytes
+
+
+def as_object(df):
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = df[column].astype('int64')
+    return df
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--report', action='store_true', help="print the per-column memory report")
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    for rows in args.rows:
+        after = core.prepare_data(core.fill_core_nulls(core_rows(rows, days=30)))
+        before = as_object(after)
+        filters = {
+            'cities': sorted(after['city'].astype(str).unique())[:3],
+            'crm_admins': sorted(after['crm_admin_name'].astype(str).unique())[:25],
+        }
+
+        print(f"\n{rows} rows")
+        print(f"  memory: before {frame_nbytes(before) / 2**20:.1f} MiB, after {frame_nbytes(after) / 2**20:.1f} MiB")
+        for label, frame in (('before', before), ('after', after)):
+            filter_best, filter_median = best_of(lambda: core.apply_filters(frame, filters), args.repeat)
+            pivot_best, pivot_median = best_of(
+                lambda: core.create_pivot_table(frame, ['crm_admin_name'], ['new_status'], 'booking_id', 'count'),
+                args.repeat
+            )
+            print(f"  {label:6} filter {filter_median * 1000:8.1f} ms (best {filter_best * 1000:.1f}), "
+                  f"person pivot {pivot_median * 1000:8.1f} ms (best {pivot_best * 1000:.1f})")
+        if args.report:
+            print(memory_report(after).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
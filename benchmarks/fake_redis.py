@@ -0,0 +1,157 @@
+"""In-process server speaking the subset of the Redis protocol services.cache uses.
+
+    with FakeRedisServer() as server:
+        backend = cache.from_url(server.url)
+
+Keys live in one dict per database with optional expiry; there is no
+persistence and no maxmemory eviction.
+"""
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.db = 0
+        self.queued = None
+        while True:
+            try:
+                args = self.read_command()
+            except ConnectionError:
+                return
+            if args is None:
+                return
+            try:
+                reply = self.server.fake.execute(self, args)
+            except Exception as e:
+                reply = e
+            self.wfile.write(encode(reply))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+def encode(reply):
+    if isinstance(reply, Exception):
+        return b'-ERR %s\r\n' % str(reply).encode()
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, bool):
+        return b':%d\r\n' % reply
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
+
+
+class FakeRedisServer:
+    def __init__(self, host='127.0.0.1', port=0, password=None):
+        self.password = password
+        self.databases = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}{self.host}:{self.port}/0"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _live(self, db, key):
+        item = db.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del db[key]
+            return None
+        return item
+
+    def execute(self, client, args):
+        name = args[0].decode().upper()
+        with self._lock:
+            self.commands += 1
+            if name == 'MULTI':
+                client.queued = []
+                return 'OK'
+            if name == 'EXEC':
+                queued, client.queued = client.queued, None
+                if queued is None:
+                    raise ValueError("EXEC without MULTI")
+                # Under one hold of the lock, so no other client runs in between
+                return [self._command(client, command) for command in queued]
+            if client.queued is not None:
+                client.queued.append(args)
+                return 'QUEUED'
+            return self._command(client, args)
+
+    def _command(self, client, args):
+        name = args[0].decode().upper()
+        db = self.databases.setdefault(client.db, {})
+        if name == 'PING':
+            return 'PONG'
+        if name == 'AUTH':
+            if args[-1].decode() != self.password:
+                raise ValueError("invalid password")
+            return 'OK'
+        if name == 'SELECT':
+            client.db = int(args[1])
+            return 'OK'
+        if name == 'GET':
+            item = self._live(db, args[1])
+            return None if item is None else item[0]
+        if name == 'SET':
+            expires_at = None
+            options = [arg.decode().upper() for arg in args[3:]]
+            if 'PX' in options:
+                expires_at = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+            elif 'EX' in options:
+                expires_at = time.monotonic() + int(options[options.index('EX') + 1])
+            if 'NX' in options and self._live(db, args[1]) is not None:
+                return None
+            db[args[1]] = (args[2], expires_at)
+            return 'OK'
+        if name == 'DEL':
+            return sum(db.pop(key, None) is not None for key in args[1:])
+        if name == 'SCAN':
+            # One pass returns everything: the cursor is always 0 afterwards
+            options = [arg.decode() for arg in args[2:]]
+            pattern = options[options.index('MATCH') + 1] if 'MATCH' in options else '*'
+            keys = [key for key in list(db) if self._live(db, key) is not None
+                    and fnmatch.fnmatchcase(key.decode(), pattern)]
+            return [b'0', keys]
+        if name == 'DBSIZE':
+            return len(db)
+        if name == 'FLUSHDB':
+            db.clear()
+            return 'OK'
+        raise ValueError(f"unknown command '{name}'")
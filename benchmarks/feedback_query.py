@@ -0,0 +1,165 @@
+"""Compare the feedback query against the one it replaced.
+
+Load the fixtures (python -m fixtures.load ... --config /tmp/bridge.ini),
+then run:
+
+    BRIDGE_DB_CONFIG=/tmp/bridge.ini python -m benchmarks.feedback_query --start 2025-01-01 --end 2025-01-31
+
+Times both queries, shows how each reads b2b_checkin_report and exits
+non-zero when the rows the page reads, or the tables it builds from them,
+differ. Both return one row per check-in report and follow-up; the old rows
+are compared as they come, only projected to the columns the new query
+returns. The fixtures have bookings with several follow-ups and several
+price rows per service, so a join that fans out, or one that drops
+follow-ups, shows up as a mismatch.
+
+The queries use MySQL syntax; run this against MySQL 8.
+"""
+import argparse
+import statistics
+import sys
+import time
+from collections import Counter
+
+import pandas as pd
+
+from services import db, queries
+
+# Feedback query as it was before the sargable, column-projected rewrite
+LEGACY_FEEDBACK_QUERY = """
+WITH LatestBookings AS (
+    SELECT DISTINCT
+        b.gb_booking_id AS gb_booking_id,
+        b.b2b_cust_phone AS customer_number,
+        b.b2b_vehicle_type AS b2b_vehicle_type,
+        b.b2b_swap_flag AS b2b_swap_flag,
+        b.b2b_service_type AS b2b_service_type,
+        b.tvs_job_card_no AS tvs_job_card_no,
+        b.b2b_log as goaxle_date,
+        b.brand as make,
+        b.model,
+        g.booking_id AS g_booking_id,
+        g.mec_id AS mec_id,
+        g.status AS g_status,
+        g.flag AS g_flag,
+        g.booking_status AS g_booking_status,
+        g.source AS g_source,
+        g.log AS booking_date,
+        g.axle_flag AS g_axle_flag,
+        g.city AS g_city,
+        g.locality AS locality,
+        g.flag_unwntd AS flag_unwntd,
+        g.flag_duplicate AS flag_duplicate,
+        g.service_status AS g_service_status,
+        f.b2b_booking_id AS f_b2b_booking_id,
+        f.crm_goaxle_id AS crm_goaxle_id,
+        f.log AS f_log,
+        s.b2b_acpt_flag AS b2b_acpt_flag,
+        cm.crm_log_id AS crm_log_id,
+        cm.name AS cm_name,
+        cm.flag AS cm_flag,
+        cm.crm_flag AS crm_flag,
+        cm.cre_flag AS cre_flag,
+        c.b2b_log AS b2b_log,
+        ms.master_service AS ms_master_service
+    FROM
+        b2b.b2b_booking_tbl AS b
+            LEFT JOIN go_bumpr.user_booking_tb AS g ON b.gb_booking_id = g.booking_id
+            LEFT JOIN go_bumpr.go_axle_service_price_tbl AS ms ON ms.service_type = g.service_type AND g.vehicle_type = ms.type
+            LEFT JOIN go_bumpr.feedback_track AS f ON f.b2b_booking_id = b.b2b_booking_id
+            JOIN b2b.b2b_status s ON s.b2b_booking_id = b.b2b_booking_id
+            LEFT JOIN go_bumpr.crm_admin cm ON cm.crm_log_id = f.crm_goaxle_id
+            LEFT JOIN b2b.b2b_mec_tbl AS m ON m.b2b_shop_id = b.b2b_shop_id
+            LEFT JOIN b2b.b2b_checkin_report AS c ON b.b2b_booking_id = c.b2b_booking_id
+    WHERE 
+        DATE(c.b2b_log) BETWEEN %s AND %s            
+        AND
+        (
+            (b.b2b_check_in_report = 1  OR  g.service_status IN ('Completed', 'inprogress'))
+        )
+)
+SELECT * FROM LatestBookings
+"""
+
+GROUP_COLUMNS = ['service_category', 'source', 'cm_name']
+
+
+def run_query(sql, section, params, repeat):
+    timings = []
+    df = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with db.connect(section) as conn:
+            df = pd.read_sql(sql, conn, params=params)
+        timings.append(time.perf_counter() - started)
+    return df, timings
+
+
+def checkin_access(sql, section, params):
+    """(access type, key, rows) of the b2b_checkin_report step in the plan."""
+    with db.connect(section) as conn:
+        plan = pd.read_sql(f"EXPLAIN {sql}", conn, params=params)
+    step = plan[plan['table'] == 'c']
+    if step.empty:
+        return None
+    return tuple(step.iloc[0][['type', 'key', 'rows']])
+
+
+def row_counts(df, columns):
+    return Counter(df[columns].astype(str).itertuples(index=False, name=None))
+
+
+def compare(legacy_df, new_df):
+    """Return a list of human readable differences (empty when equivalent)."""
+    from pages.feedback import create_grouped_table, prepare_feedback_data
+
+    problems = []
+    columns = list(new_df.columns)
+    missing = [column for column in columns if column not in legacy_df.columns]
+    if missing:
+        return [f"columns missing from the legacy result: {missing}"]
+
+    legacy_rows, new_rows = row_counts(legacy_df, columns), row_counts(new_df, columns)
+    if legacy_rows != new_rows:
+        problems.append(f"{sum((legacy_rows - new_rows).values())} rows only in legacy, "
+                        f"{sum((new_rows - legacy_rows).values())} only in new")
+
+    legacy_prepared, new_prepared = prepare_feedback_data(legacy_df), prepare_feedback_data(new_df)
+    for group_column in GROUP_COLUMNS:
+        legacy_table = create_grouped_table(legacy_prepared, group_column).sort_values([group_column, 'count'])
+        new_table = create_grouped_table(new_prepared, group_column).sort_values([group_column, 'count'])
+        if not legacy_table.reset_index(drop=True).equals(new_table.reset_index(drop=True)):
+            problems.append(f"the {group_column} table differs")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--start', required=True, help="first check-in date, YYYY-MM-DD")
+    parser.add_argument('--end', required=True, help="last check-in date, YYYY-MM-DD")
+    parser.add_argument('--section', default='mysql_dev', help="config.ini section of the fixture database")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    legacy_params = (args.start, args.end)
+    params = {'start_date': args.start, 'end_date': args.end}
+    legacy_df, legacy_timings = run_query(LEGACY_FEEDBACK_QUERY, args.section, legacy_params, args.repeat)
+    new_df, new_timings = run_query(queries.FEEDBACK_QUERY, args.section, params, args.repeat)
+
+    legacy_median = statistics.median(legacy_timings)
+    new_median = statistics.median(new_timings)
+    print(f"legacy: {len(legacy_df)} rows x {len(legacy_df.columns)} columns, median {legacy_median * 1000:.1f} ms, "
+          f"check-in reports read as {checkin_access(LEGACY_FEEDBACK_QUERY, args.section, legacy_params)}")
+    print(f"new:    {len(new_df)} rows x {len(new_df.columns)} columns, median {new_median * 1000:.1f} ms, "
+          f"check-in reports read as {checkin_access(queries.FEEDBACK_QUERY, args.section, params)}")
+    if new_median:
+        print(f"speedup: {legacy_median / new_median:.2f}x")
+
+    problems = compare(legacy_df, new_df)
+    for problem in problems:
+        print(f"MISMATCH: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Dropdown filtering of the core rows: sequential isin scans vs the bitmap filter index.
+
+    python -m benchmarks.filters --rows 100000 1000000
+
+"scan" is apply_filters, one isin mask and frame copy per dropdown.
+"index" is FilterIndex.select, which returns row positions. Exits
+non-zero if the two select different rows.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import core_rows
+from services.filter_index import FilterIndex
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    failed = False
+    for rows in args.rows:
+        df = core.prepare_data(core.fill_core_nulls(core_rows(rows, days=30)))
+        column_of = dict(core.FILTER_COLUMNS)
+        cities = sorted(df['city'].astype(str).unique())
+        people = sorted(df['crm_admin_name'].astype(str).unique())
+        cases = {
+            'one city': {'cities': cities[:1]},
+            'cities + 4w': {'cities': cities[:5], 'vehicle_types': ['4w']},
+            '3 people': {'crm_admins': people[:3]},
+            'all six': {'cities': cities[:4], 'vehicle_types': ['4w', '2w'], 'master_services': ['Master Service 1'],
+                        'service_types': ['Service Type 1', 'Service Type 2'], 'crm_admins': people[:50],
+                        'user_sources': ['Source 1', 'Source 2', 'Source 3']},
+        }
+
+        started = time.perf_counter()
+        filter_index = FilterIndex(df, list(column_of.values()))
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f"\n{rows} rows: index {filter_index.nbytes / 2**20:.1f} MiB, built in {build_ms:.0f} ms")
+
+        for label, filters in cases.items():
+            filters = core.normalize_filters(**filters)
+            by_column = {column_of[name]: values for name, values in filters.items()}
+            expected = np.flatnonzero(df.index.isin(core.apply_filters(df, filters).index))
+            if not np.array_equal(expected, filter_index.select(by_column)):
+                failed = True
+                print(f"  MISMATCH {label}")
+            scan = median_ms(lambda: core.apply_filters(df, filters), args.repeat)
+            indexed = median_ms(lambda: filter_index.select(by_column), args.repeat)
+            print(f"  {label:12} scan {scan:7.2f} ms, index {indexed:7.2f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
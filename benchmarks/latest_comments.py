@@ -0,0 +1,142 @@
+"""Compare the core query against the pre-rewrite LatestComments CTE.
+
+Point BRIDGE_DB_CONFIG at a config.ini whose section holds the local fixture
+database, then run:
+
+    python -m benchmarks.latest_comments --start 2025-01-01 --end 2025-01-31
+
+Exits non-zero when the rewritten query returns different bookings or a
+comment the old query would not have returned.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from services import db, queries
+
+# Core query as it was before the LatestComments rewrite
+LEGACY_CORE_QUERY = """
+WITH LatestComments AS (
+    SELECT user_id, book_id, comments, category, status AS comment_status, log AS comment_log
+    FROM admin_comments_tbl ac
+    WHERE log = (SELECT MAX(log) FROM admin_comments_tbl ac2 WHERE ac2.book_id = ac.book_id)
+)
+SELECT DISTINCT
+    a.booking_id,
+    CONCAT(UPPER(LEFT(TRIM(a.vehicle_type), 1)), LOWER(SUBSTRING(TRIM(a.vehicle_type), 2))) AS vehicle_type,
+    a.status AS booking_status,
+    a.booking_status AS booking_status_code,
+    a.axle_flag,
+    a.flag,
+    a.flag_unwntd,
+    a.enquiry_flag,
+    a.log AS raw_log_timestamp,
+    DATE(ADDTIME(a.log, '05:30:00')) AS booking_date,
+    b.b2b_check_in_report,
+    b.b2b_swap_flag,
+    a.service_status AS service_status_code,
+    a.city,
+    a.service_type,
+    c.master_service,
+    d.name AS crm_admin_name,
+    e.user_source,
+    f.activity AS activity_name,
+    a.activity_status AS activity_status_code,
+    lc.comments,
+    lc.category,
+    g.b2b_shop_name,
+    uv.vehicle_id AS user_vehicle_id,
+    a.vech_id,
+    uv.id AS vehicle_table_id,
+    a.user_veh_id
+FROM go_bumpr.user_booking_tb a
+LEFT JOIN b2b.b2b_booking_tbl b ON a.booking_id = b.gb_booking_id
+LEFT JOIN go_bumpr.go_axle_service_price_tbl c ON a.service_type = c.service_type AND a.vehicle_type = c.type
+LEFT JOIN crm_admin d ON d.crm_log_id = a.crm_update_id
+LEFT JOIN user_vehicle_table uv ON uv.id = a.user_veh_id
+LEFT JOIN go_bumpr.user_source_tbl e ON e.user_source = a.source
+LEFT JOIN go_bumpr.admin_activity_tbl f ON f.id = a.activity_status
+LEFT JOIN b2b.b2b_mec_tbl g ON g.b2b_shop_id = b.b2b_shop_id
+LEFT JOIN LatestComments lc ON a.booking_id = lc.book_id
+WHERE
+    a.log BETWEEN 
+        SUBTIME(CONCAT(%(start_date)s, ' 00:00:00'), '05:30:00') AND 
+        SUBTIME(CONCAT(%(end_date)s, ' 23:59:59'), '05:30:00')
+    AND (a.mec_id NOT IN (400001, 200018, 200379, 203042, 400974) or a.mec_id is null)
+    AND a.user_id NOT IN (21816, 41317, 859, 3132, 20666, 56511, 2792, 128, 19, 7176, 19470, 1, 951, 103699, 113453, 108783, 226, 252884, 189598, 133986, 270162, 298572, 287322, 53865, 289516, 14485, 1678, 30865, 125455, 338469, 9570, 388733, 276771, 392833, 378368, 309341, 299526, 304771, 1935, 22115, 44794, 1031939, 639065, 662228, 965020, 804253, 722759, 378258, 1088113, 1165855, 1165488, 1133076, 1288252, 304783)
+    AND a.source NOT IN ('Sulekha Booking', 'Sbi Bookings', 'BTL Booking', 'RSA Bookings', 'nmsa_web', 'Uber')
+    AND (a.service_type NOT IN ('Breakdown Assistance', 'Bike Tyre Puncture', 'Car Tyre Puncture', 'Flat Tyre Assistance', 'Vehicle Towing', 'Puncture', 'Towing', 'Bike Breakdown', 'Bike Puncture', 'Deep Clean', 'IOCL Check-up') or a.service_type is null)
+    AND a.nmsa_flag != 1
+    AND a.flag_unwntd != 1
+    AND (b.b2b_swap_flag !=1 or b.b2b_swap_flag is null)
+"""
+
+
+def run_query(sql, section, params, repeat):
+    timings = []
+    df = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with db.connect(section) as conn:
+            df = pd.read_sql(sql, conn, params=params)
+        timings.append(time.perf_counter() - started)
+    return df, timings
+
+
+def compare(legacy_df, new_df):
+    """Return a list of human readable differences (empty when equivalent)."""
+    problems = []
+
+    legacy_ids = set(legacy_df['booking_id'])
+    new_ids = set(new_df['booking_id'])
+    if legacy_ids != new_ids:
+        problems.append(
+            f"booking ids differ: {len(legacy_ids - new_ids)} only in legacy, "
+            f"{len(new_ids - legacy_ids)} only in new"
+        )
+
+    duplicated = new_df['booking_id'].duplicated(keep=False)
+    if duplicated.any():
+        # Only the comment join is expected to be deduplicated by the rewrite
+        problems.append(f"{new_df.loc[duplicated, 'booking_id'].nunique()} bookings still repeat in the new query")
+
+    columns = list(legacy_df.columns)
+    legacy_rows = set(legacy_df.astype(str).itertuples(index=False, name=None))
+    new_rows = new_df[columns].astype(str).itertuples(index=False, name=None)
+    unexpected = [row for row in new_rows if row not in legacy_rows]
+    if unexpected:
+        problems.append(f"{len(unexpected)} rows of the new query are not present in the legacy result")
+
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--start', required=True, help="IST start date, YYYY-MM-DD")
+    parser.add_argument('--end', required=True, help="IST end date, YYYY-MM-DD")
+    parser.add_argument('--section', default='mysql_devcs', help="config.ini section of the fixture database")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    params = {'start_date': args.start, 'end_date': args.end}
+    legacy_df, legacy_timings = run_query(LEGACY_CORE_QUERY, args.section, params, args.repeat)
+    new_df, new_timings = run_query(queries.CORE_QUERY, args.section, params, args.repeat)
+
+    legacy_median = statistics.median(legacy_timings)
+    new_median = statistics.median(new_timings)
+    print(f"legacy: {len(legacy_df)} rows, median {legacy_median * 1000:.1f} ms")
+    print(f"new:    {len(new_df)} rows, median {new_median * 1000:.1f} ms")
+    if new_median:
+        print(f"speedup: {legacy_median / new_median:.2f}x")
+
+    problems = compare(legacy_df, new_df)
+    for problem in problems:
+        print(f"MISMATCH: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
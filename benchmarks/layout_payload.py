@@ -0,0 +1,46 @@
+"""Check that the initial page layouts stay under a fixed JSON size budget.
+
+    python -m benchmarks.layout_payload
+
+The layouts are what every visitor downloads before picking a date, so
+they must not grow with the amount of data in the database. Exits
+non-zero when a page is over its budget.
+"""
+import argparse
+import json
+import sys
+
+import plotly
+
+# Serialized layout budget per page, in bytes
+LAYOUT_BUDGETS = {
+    'pages.core': 32 * 1024,
+    'pages.feedback': 32 * 1024,
+    'pages.login': 16 * 1024,
+}
+
+
+def layout_bytes(layout):
+    if callable(layout):
+        layout = layout()
+    return len(json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+
+    over_budget = False
+    for module_name, budget in LAYOUT_BUDGETS.items():
+        module = sys.modules[module_name]
+        size = layout_bytes(module.layout)
+        status = 'ok' if size <= budget else 'OVER BUDGET'
+        over_budget = over_budget or size > budget
+        print(f"{module_name}: {size} bytes (budget {budget}) {status}")
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
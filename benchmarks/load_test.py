@@ -0,0 +1,248 @@
+"""Callback load test: the core page under gunicorn against the fixtures database.
+
+    python -m fixtures.load --url mysql+pymysql://root@127.0.0.1:3306 --scale 1m --config /tmp/bridge.ini
+    python -m benchmarks.load_test --config /tmp/bridge.ini --workers 1 4 16 --users 16 --duration 20
+
+For each worker count, starts gunicorn with gunicorn.conf.py on
+wsgi:application, with BRIDGE_DB_CONFIG set to --config, so every load
+runs the real core query on the fixture MySQL server. Each worker count
+starts with empty partition, dataset and job directories. --users client
+threads then replay core page sessions: Go (the background load, polled
+until done), filter options, a city filter, the active tab's pivots, a tab
+switch and an export. Prints p50/p95/p99 latency per step, the HTTP
+requests/sec served, and the dashboard queries and coalesced loads the
+server reports on /metrics.
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Totals read from /metrics after each run
+REPORTED_METRICS = ('dashboard_queries_started_total', 'dashboard_queries_failed_total',
+                    'partition_loads_coalesced_total')
+
+
+def callback_specs():
+    import index  # noqa: F401  (registers the Dash pages)
+    from dash._callback import GLOBAL_CALLBACK_LIST
+
+    return GLOBAL_CALLBACK_LIST
+
+
+def find_spec(specs, output_prefix):
+    return next(spec for spec in specs if spec['output'].lstrip('.').startswith(output_prefix))
+
+
+def outputs_of(spec):
+    parts = spec['output'][2:-2].split('...') if spec['output'].startswith('..') else [spec['output']]
+    outputs = []
+    for part in parts:
+        component_id, prop = part.rsplit('.', 1)
+        outputs.append({'id': component_id, 'property': prop.split('@')[0]})
+    return outputs
+
+
+def payload(spec, values, changed):
+    """Request body the renderer sends for `spec`, with values keyed by (id, property)."""
+    def props(items):
+        return [{'id': item['id'], 'property': item['property'], 'value': values.get((item['id'], item['property']))}
+                for item in items]
+    outputs = outputs_of(spec)
+    return {
+        'output': spec['output'],
+        'outputs': outputs if spec['output'].startswith('..') else outputs[0],
+        'inputs': props(spec['inputs']),
+        'state': props(spec['state']),
+        'changedPropIds': [f"{changed[0]}.{changed[1]}"],
+    }
+
+
+class Client:
+    def __init__(self, base_url, specs, record):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.specs = specs
+        self.record = record
+
+    def post(self, step, spec, values, changed):
+        started = time.perf_counter()
+        body = payload(spec, values, changed)
+        response = self.session.post(f"{self.base_url}/_dash-update-component", json=body)
+        self.record(None)
+        response.raise_for_status()
+        result = response.json() if response.status_code == 200 else {}
+        # Background callbacks answer with a job to poll
+        while 'cacheKey' in result and 'response' not in result:
+            time.sleep(0.1)
+            response = self.session.post(
+                f"{self.base_url}/_dash-update-component?cacheKey={result['cacheKey']}&job={result['job']}", json=body)
+            self.record(None)
+            response.raise_for_status()
+            polled = response.json() if response.status_code == 200 else {}
+            if 'response' in polled:
+                result = polled
+        self.record((step, time.perf_counter() - started))
+        return result.get('response', {})
+
+    def session_flow(self, user, rng, today):
+        load, options, filtered, pivots, export = (
+            find_spec(self.specs, prefix) for prefix in
+            ('stored-data.data', 'city-filter.options', 'filtered-data.data', 'service-pivot-container', 'download-active-tab-data'))
+        span = rng.choice([1, 3, 7, 14])
+        start, end = str(today - timedelta(days=span - 1)), str(today)
+
+        values = {('date-apply-btn', 'n_clicks'): 1, ('log-date-picker', 'start_date'): start,
+                  ('log-date-picker', 'end_date'): end, ('login-status', 'data'): {'session_id': f"load-{user}"}}
+        stored = self.post('load', load, values, ('date-apply-btn', 'n_clicks'))['stored-data']['data']
+        if isinstance(stored, dict) and 'error' in stored:
+            raise RuntimeError(f"load of {start} to {end} failed: {stored['error']}")
+
+        values = {('stored-data', 'data'): stored}
+        city_options = self.post('options', options, values, ('stored-data', 'data'))['city-filter']['options']
+
+        cities = [rng.choice(city_options)['value']] if city_options else []
+        values = {('stored-data', 'data'): stored, ('city-filter', 'value'): cities}
+        handle = self.post('filter', filtered, values, ('city-filter', 'value'))['filtered-data']['data']
+
+        values = {('filtered-data', 'data'): handle, ('tabs', 'value'): 'tab-service',
+                  ('log-date-picker', 'start_date'): start, ('log-date-picker', 'end_date'): end}
+        self.post('pivots', pivots, values, ('filtered-data', 'data'))
+        values[('tabs', 'value')] = 'tab-person'
+        self.post('tab switch', pivots, values, ('tabs', 'value'))
+
+        values = {('export-data-btn', 'n_clicks'): 1, ('filtered-data', 'data'): handle,
+                  ('tabs', 'value'): 'tab-person', ('export-format-dropdown', 'value'): 'numbers'}
+        self.post('export', export, values, ('export-data-btn', 'n_clicks'))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers, threads, port, env, log_path):
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+             '--threads', str(threads), '--bind', f"127.0.0.1:{port}", 'wsgi:application'],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited, see {log_path}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/_dash-layout", timeout=2).ok:
+                return process
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def scrape(port):
+    """Values of REPORTED_METRICS on the server's /metrics."""
+    values = {}
+    for line in requests.get(f"http://127.0.0.1:{port}/metrics", timeout=10).text.splitlines():
+        name, _, value = line.partition(' ')
+        if name in REPORTED_METRICS:
+            values[name] = float(value)
+    return values
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(workers, args, specs, env, today, log_path):
+    port = free_port()
+    process = start_gunicorn(workers, args.threads, port, env, log_path)
+    latencies = {}
+    requests_served = [0]
+    errors = []
+    lock = threading.Lock()
+
+    def record(sample):
+        with lock:
+            if sample is None:
+                requests_served[0] += 1
+            else:
+                latencies.setdefault(sample[0], []).append(sample[1])
+
+    def user(index):
+        rng = random.Random(args.seed + index)
+        client = Client(f"http://127.0.0.1:{port}", specs, record)
+        while time.perf_counter() < deadline:
+            try:
+                client.session_flow(index, rng, today)
+            except Exception as e:
+                errors.append(e)
+
+    try:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=user, args=(i,)) for i in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        reported = scrape(port)
+    finally:
+        process.terminate()
+        process.wait()
+
+    callbacks = sum(len(samples) for samples in latencies.values())
+    print(f"\n{workers} worker(s) x {args.threads} threads, {args.users} users: "
+          f"{requests_served[0] / elapsed:.1f} req/s (with job polls), {callbacks / elapsed:.1f} callbacks/s, "
+          f"{len(errors)} errors")
+    print("  " + ", ".join(f"{name} {reported.get(name, 0):.0f}" for name in REPORTED_METRICS))
+    print(f"  {'step':12} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step, samples in latencies.items():
+        ms = [sample * 1000 for sample in samples]
+        print(f"  {step:12} {len(ms):6d} {statistics.median(ms):9.1f} {percentile(ms, 95):9.1f} {percentile(ms, 99):9.1f}")
+    if errors:
+        print(f"  first error: {errors[0]!r}, server log in {log_path}")
+    return not errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', required=True, help="config.ini written by fixtures.load --config")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from services.partition_cache import ist_today
+
+    specs = callback_specs()
+    workdir = tempfile.mkdtemp(prefix='bridge_load_')
+    ok = True
+    for workers in args.workers:
+        env = dict(os.environ, BRIDGE_DB_CONFIG=os.path.abspath(args.config),
+                   BRIDGE_BACKGROUND_DIR=os.path.join(workdir, f"jobs-{workers}"),
+                   BRIDGE_DATASET_DIR=os.path.join(workdir, f"datasets-{workers}"),
+                   BRIDGE_ARROW_DIR=os.path.join(workdir, f"arrow-{workers}"),
+                   BRIDGE_METRICS_DIR=os.path.join(workdir, f"metrics-{workers}"),
+                   PYTHONPATH=ROOT)
+        ok = run(workers, args, specs, env, ist_today(), os.path.join(workdir, f"gunicorn-{workers}.log")) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Person tab payload: "N (p%)" text cells vs numeric count and share columns.
+
+    python -m benchmarks.pivot_payload --agents 300 800
+
+Builds the Person-Based Conversion table for a range with several hundred
+agents and measures the DataTable it ships: JSON bytes, server
+serialization time (dash's to_json), and client parse time (JSON.parse in
+node, skipped when node is not installed). The app does not compress
+responses, so the raw size is what travels; the gzip size is for reference. "text" is the table with the
+old string cells, "numeric" is the table the page now sends.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from dash._utils import to_json
+
+from benchmarks.synthetic import core_rows
+
+NODE_PARSE = """
+const fs = require('fs');
+const text = fs.readFileSync(process.argv[1], 'utf8');
+const repeat = Number(process.argv[2]);
+const timings = [];
+for (let i = 0; i < repeat; i++) {
+    const started = process.hrtime.bigint();
+    JSON.parse(text);
+    timings.push(Number(process.hrtime.bigint() - started) / 1e6);
+}
+timings.sort((a, b) => a - b);
+console.log(timings[Math.floor(timings.length / 2)]);
+"""
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def client_parse_ms(payload, repeat):
+    node = shutil.which('node')
+    if not node:
+        return None
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        f.write(payload)
+    try:
+        out = subprocess.run([node, '-e', NODE_PARSE, f.name, str(repeat)], capture_output=True, text=True, check=True)
+        return float(out.stdout.strip())
+    finally:
+        os.unlink(f.name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, nargs='+', default=[300, 800])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    for agents in args.agents:
+        df = core.prepare_data(core.fill_core_nulls(core_rows(args.rows, days=30, agents=agents)))
+        handle = dict(core.datasets.register(df, key=f"bench:{agents}"), filters={})
+        numeric = core.cube_pivot_table(handle, ['crm_admin_name'], ['new_status'])
+        text = core.pivot_table_as_text(numeric)
+
+        print(f"\nPerson tab, {agents} agents ({len(numeric)} rows)")
+        for label, pivot_df in (('text', text), ('numeric', numeric)):
+            table = core.create_pivot_table_component(pivot_df, ['crm_admin_name'], "").children[1]
+            if label == 'text':
+                # The table as it was sent before: one string column per status
+                table.columns = [{"name": str(col), "id": str(col)} for col in pivot_df.columns]
+            payload = to_json(table)
+            serialize = median_ms(lambda: to_json(table), args.repeat)
+            parse = client_parse_ms(payload, args.repeat)
+            parse_text = f"{parse:.2f} ms" if parse is not None else "n/a (no node)"
+            gzipped = len(gzip.compress(payload.encode()))
+            print(f"  {label:8} {len(payload) / 1024:7.1f} KiB ({gzipped / 1024:.1f} KiB gzip), "
+                  f"serialize {serialize:6.2f} ms, client parse {parse_text}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Rows/sec of the core preparation stage, checked against the previous implementation.
+
+    python -m benchmarks.prepare --rows 100000 1000000
+
+Exits non-zero if fill_core_nulls + prepare_data disagree with the
+row-by-row implementation they replaced. Text columns that are passed
+through untouched hold the string '0' for NULL where the old whole-frame
+fillna(0) stored the integer 0, so those are compared as text.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import core_rows
+
+PASS_THROUGH_TEXT = ['booking_status', 'service_status_code', 'category', 'b2b_shop_name']
+
+
+def legacy_prepare_data(df, categorical_columns, flag_columns):
+    """prepare_data as it was before vectorization, fed by fillna(0)."""
+    df = df.fillna(0)
+    df = df[df['user_source'] != 'Re-Engagement Bookings']
+    df['master_service'] = df['master_service'].astype(str).replace(['0', '', ' '], 'No Service Available')
+    df['service_type'] = df['service_type'].astype(str).replace(['0', '', ' '], 'No Service Available')
+    df['crm_admin_name'] = df['crm_admin_name'].astype(str).replace(['0', '', ' '], 'No Name Available')
+    df['user_source'] = df['user_source'].astype(str).replace(['0', '', ' '], 'No Service Available')
+    df['activity_name'] = df['activity_name'].astype(str).replace(['0', '', ' '], 'Unknown Status')
+    df['city'] = df['city'].astype(str).str.strip().str.title().replace(['0', '', ' '], 'No city Available')
+    df['comments'] = df['activity_name'].astype(str).replace(['0', "", ' '], 'Unknown Status')
+    df['Dates'] = pd.to_datetime(df['booking_date']).dt.date
+    df['booking_date'] = pd.to_datetime(df['booking_date']).dt.date
+    condition = [
+        df['comments'].isin([
+            'Customer called for a status update', 'Done with Local shop', 'Duplicate Booking',
+            'Just Enquiry/checking the App', 'Just for Quotation', 'Post Service Escalationn',
+            'Price not satisfied/Quotes are too high', 'Testing', 'Wrong Number'
+        ]),
+        df['comments'].isin([
+            'All RNRs are exhausted ', 'Currentlyservice is not needed', 'Not in Chennai/Bangalore/Hyderabad/Trichy',
+            'Not Interested', 'Reminded in Whatsapp Images not received', 'Vehicle Sold / No Vehicle'
+        ])
+    ]
+    df['Activity_Status_Final'] = np.select(condition, ['Cancelled Booking', 'Other Booking'], default='Unknown Status').astype(str)
+    conditions = [
+        (df['flag'] == 1),
+        (df['flag_unwntd'] == 1),
+        ((df['booking_status_code'] == 2) & (df['axle_flag'] == 1) & (df['flag'] == 0)) | (df['service_status_code'] == 'Completed'),
+        (df['booking_status_code'].isin([3, 4, 5, 6]) & (df['flag'] == 0)),
+        (df['booking_status_code'] == 1) & (df['flag'] == 0),
+        (df['booking_status_code'] == 0) & (df['flag'] != 1),
+    ]
+    results = ['Cancelled', 'Duplicate', 'Goaxled', 'Follow-up', 'Idle', 'Others']
+    df['new_status'] = np.select(conditions, results, default='Unknown Status').astype(str)
+    df['cleaned_category'] = df['category'].replace(0, 'Follow up').astype(str)
+    df.loc[df['cleaned_category'].str.startswith('JD -'), 'cleaned_category'] = 'JD Category'
+    df['cleaned_category'] = df['cleaned_category'].str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
+    df['followup_eligible'] = df['booking_status_code'].isin([3, 4, 5, 6]) & (df['flag'] == 0)
+    df['vehicle_type'] = df['vehicle_type'].astype(str).str.strip().str.lower()
+    df['vehicle_type'] = df['vehicle_type'].apply(lambda x: x if x in ['4w', '2w'] else 'Others')
+    for column in categorical_columns + ['cleaned_category']:
+        df[column] = df[column].astype('category')
+    for column in flag_columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def differences(expected, actual):
+    problems = []
+    if list(expected.columns) != list(actual.columns):
+        problems.append(f"columns differ: {list(expected.columns)} != {list(actual.columns)}")
+        return problems
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    for column in expected.columns:
+        left, right = expected[column], actual[column]
+        if column in PASS_THROUGH_TEXT:
+            left, right = left.astype(str), right.astype(str)
+        try:
+            pd.testing.assert_series_equal(left, right)
+        except AssertionError as e:
+            problems.append(f"{column}: {str(e).splitlines()[0]}")
+    return problems
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    failed = False
+    for rows in args.rows:
+        raw = core_rows(rows, days=30)
+        legacy = lambda: legacy_prepare_data(raw, core.CATEGORICAL_COLUMNS, core.INTEGER_FLAG_COLUMNS)
+        current = lambda: core.prepare_data(core.fill_core_nulls(raw))
+
+        problems = differences(legacy(), current())
+        for problem in problems:
+            print(f"MISMATCH ({rows} rows) {problem}")
+        failed = failed or bool(problems)
+
+        legacy_seconds = timed(legacy, args.repeat)
+        current_seconds = timed(current, args.repeat)
+        print(f"{rows} rows: legacy {rows / legacy_seconds:,.0f} rows/s ({legacy_seconds * 1000:.0f} ms), "
+              f"current {rows / current_seconds:,.0f} rows/s ({current_seconds * 1000:.0f} ms)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
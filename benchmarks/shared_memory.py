@@ -0,0 +1,90 @@
+"""Memory of N worker processes holding the same prepared core frame.
+
+    python -m benchmarks.shared_memory --rows 1000000 --workers 1 4 8
+
+"pickle" is every worker loading its own copy (what each worker's
+partition cache held before). "arrow" is every worker memory-mapping the
+same Arrow file. Each worker loads the frame, touches every column and
+reports its proportional set size (PSS) growth while all workers are
+alive; PSS splits shared pages between the processes mapping them, so the
+sum is the memory the workers cost together. Linux only (PSS).
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+
+import pandas as pd
+
+from benchmarks.synthetic import core_rows
+
+
+def touch(df):
+    """Read every numeric value so mapped pages are actually resident."""
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.cat.codes
+        if values.dtype.kind in 'iufbM':
+            values.to_numpy().view('u1').sum()
+
+
+def worker(mode, path, barrier, results):
+    import psutil
+
+    from services import arrow_store
+
+    process = psutil.Process()
+    before = process.memory_full_info().pss
+    if mode == 'pickle':
+        with open(path, 'rb') as f:
+            df = pickle.load(f)
+    else:
+        df = arrow_store.read_frame(path)
+    touch(df)
+    barrier.wait()
+    results.put(process.memory_full_info().pss - before)
+    barrier.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+    from services import arrow_store
+
+    df = core.prepare_data(core.fill_core_nulls(core_rows(args.rows, days=30))).reset_index(drop=True)
+    workdir = tempfile.mkdtemp(prefix='bridge_shared_')
+    paths = {'pickle': os.path.join(workdir, 'core.pkl'), 'arrow': os.path.join(workdir, 'core.arrow')}
+    with open(paths['pickle'], 'wb') as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    arrow_store.write_frame(df, paths['arrow'])
+    if not arrow_store.read_frame(paths['arrow']).equals(df):
+        print("Arrow round trip changed the frame")
+        return 1
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{args.rows} rows")
+    for workers in args.workers:
+        line = []
+        for mode, path in paths.items():
+            barrier, results = context.Barrier(workers), context.Queue()
+            processes = [context.Process(target=worker, args=(mode, path, barrier, results)) for _ in range(workers)]
+            for process in processes:
+                process.start()
+            total = sum(results.get() for _ in range(workers))
+            for process in processes:
+                process.join()
+            line.append(f"{mode} {total / 2**20:8.1f} MiB")
+        print(f"  {workers:2d} workers: " + ", ".join(line))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Time the application import and count database calls made during it.
+
+    python -m benchmarks.startup --repeat 5
+
+Each run imports index.py (and through Dash pages, every page module) in a
+fresh interpreter. Exits non-zero if any run opened a connection or
+executed a statement.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure_once():
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+
+    calls = {'connections': 0, 'statements': 0}
+
+    def on_connect(dbapi_connection, connection_record):
+        calls['connections'] += 1
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        calls['statements'] += 1
+
+    event.listen(Pool, 'connect', on_connect)
+    event.listen(Engine, 'before_cursor_execute', on_execute)
+
+    started = time.perf_counter()
+    import index  # noqa: F401
+    calls['import_seconds'] = time.perf_counter() - started
+    return calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return 0
+
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.startup', '--child'],
+            check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    timings = [run['import_seconds'] for run in runs]
+    connections = sum(run['connections'] for run in runs)
+    statements = sum(run['statements'] for run in runs)
+    print(f"import: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {len(runs)} runs")
+    print(f"database connections: {connections}, statements: {statements}")
+    return 1 if connections or statements else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Hot-path benchmark suite with stored baselines.
+
+    python -m benchmarks.suite                         # compare with benchmarks/baselines.json
+    python -m benchmarks.suite --rows 10000 --only core.
+    python -m benchmarks.suite --save                  # record the current numbers as the baseline
+
+Times the data paths behind the core and feedback pages on synthetic frames
+(benchmarks.synthetic) of each --rows size: best wall time of --repeat runs
+(the least noisy statistic to gate on), peak traced memory of one run (tracemalloc, which numpy and pandas
+report to) and, for callbacks, the JSON bytes of the response as Dash
+serializes it. Callbacks run with a callback context naming the input
+that fired, like a request would.
+
+A metric more than --threshold above its baseline (plus a small absolute
+allowance for timer and allocator noise) is a regression and the run exits
+with status 1. Wall times only compare meaningfully on the machine that
+recorded the baseline; the file records which one that was.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import core_rows, feedback_rows
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_THRESHOLD = 0.25
+# Differences below these never count as regressions
+NOISE_FLOOR = {'ms': 2.0, 'peak_mib': 1.0, 'payload_bytes': 0}
+
+
+@contextmanager
+def triggered(prop_id, inputs_list=None):
+    """Callback context of a request fired by `prop_id`."""
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    token = context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': None}],
+                                            inputs_list=inputs_list or []))
+    try:
+        yield
+    finally:
+        context_value.reset(token)
+
+
+def cases(rows, seed):
+    """Yield (name, call, reset, prop_id, inputs_list) per measured path on `rows`-row frames.
+
+    `call` returns the callback response, or None for helpers that are not
+    callbacks; `reset` runs untimed before every call. The feedback frames
+    are built after the core cases ran, so at 1M rows the two pages' frames
+    need not fit in the dataset registry together.
+    """
+    from pages import core, feedback
+
+    def no_reset():
+        pass
+
+    def helper(result):
+        # Not a callback: nothing is sent to the browser
+        return None
+
+    raw = core.fill_core_nulls(core_rows(rows, days=30, seed=seed))
+    prepared = core.prepare_data(raw)
+    stored = core.datasets.register(prepared, key=f"suite:core:{rows}")
+    cities = sorted(prepared['city'].astype(str).unique())
+    with triggered('city-filter.value'):
+        filtered = core.filter_data(stored, cities[:2], [], [], [], [], [])
+    core.resolve_cube(filtered)
+
+    # The Person pivot's Grand Total x Goaxled cell, and the pattern-matching input carrying it
+    person = core.create_pivot_table_component(
+        core.cube_pivot_table(filtered, ['crm_admin_name'], ['new_status']), ['crm_admin_name'], "").children[1]
+    cell_id = person.id
+    cell = {'row': len(person.data) - 1, 'column': 1, 'column_id': 'Goaxled', 'row_id': person.data[-1]['id']}
+    drill_inputs = [[{'id': cell_id, 'property': 'active_cell', 'value': cell}]]
+
+    yield 'core.prepare_data', lambda: helper(core.prepare_data(raw)), no_reset, None, None
+    yield ('core.create_pivot_table',
+           lambda: helper(core.create_pivot_table(prepared, ['crm_admin_name'], ['new_status'], 'booking_id', 'count')),
+           no_reset, None, None)
+    yield ('core.filter_data', lambda: core.filter_data(stored, cities[:2], ['2w'], [], [], [], []),
+           no_reset, 'vehicle-type-filter.value', None)
+    yield ('core.update_pivot_tables',
+           lambda: core.update_pivot_tables(filtered, 'tab-person', '2025-01-01', '2025-01-30'),
+           core.pivot_memo.clear, 'filtered-data.data', None)
+    yield ('core.toggle_booking_details', lambda: core.toggle_booking_details([cell], filtered),
+           no_reset, json.dumps(cell_id, sort_keys=True, separators=(',', ':')) + '.active_cell', drill_inputs)
+
+    checkins = feedback.prepare_feedback_data(feedback_rows(rows, days=30, seed=seed))
+    checkins_handle = feedback.datasets.register(checkins, key=f"suite:feedback:{rows}")
+    _, person_table, _ = feedback.update_table('person', checkins_handle, [], [], [], True)
+    modal_cell = {'row': 1, 'column': 1, 'column_id': 'count'}
+
+    yield ('feedback.create_grouped_table', lambda: helper(feedback.create_grouped_table(checkins, 'cm_name')),
+           no_reset, None, None)
+    yield ('feedback.handle_modal',
+           lambda: feedback.handle_modal(modal_cell, None, None, person_table, 'person', {'display': 'none'},
+                                         checkins_handle, None, [], [], []),
+           no_reset, 'data-table.active_cell', None)
+
+
+def measure(call, reset, prop_id, inputs_list, repeat):
+    from dash._utils import to_json
+
+    with triggered(prop_id, inputs_list):
+        reset()
+        response = call()
+        timings = []
+        for _ in range(repeat):
+            reset()
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+        reset()
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    result = {'ms': round(min(timings) * 1000, 3), 'peak_mib': round(peak / 2**20, 3)}
+    if response is not None:
+        result['payload_bytes'] = len(to_json(response).encode())
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Regression messages for metrics above their baseline."""
+    regressions = []
+    for name, sizes in results.items():
+        for rows, metrics in sizes.items():
+            base = baseline.get(name, {}).get(rows)
+            if base is None:
+                continue
+            for metric, value in metrics.items():
+                if metric in base and value > base[metric] * (1 + threshold) + NOISE_FLOOR[metric]:
+                    regressions.append(f"{name} @ {rows} rows: {metric} {value} vs baseline {base[metric]}")
+    return regressions
+
+
+def machine():
+    return {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', help="run the cases whose name contains this")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, help=f"allowed relative increase, default {DEFAULT_THRESHOLD} "
+                                                        "or the one stored with the baseline")
+    parser.add_argument('--save', action='store_true', help="write these results into the baseline file")
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    baseline = stored.get('results', {})
+    threshold = args.threshold if args.threshold is not None else stored.get('threshold', DEFAULT_THRESHOLD)
+    if baseline and not args.save and stored.get('machine') != machine():
+        print(f"Note: baseline recorded on {stored.get('machine')}, wall times may not compare")
+
+    results = {}
+    print(f"{'case':32} {'rows':>9} {'ms':>10} {'peak MiB':>9} {'payload KiB':>12} {'ms vs base':>11}")
+    for rows in args.rows:
+        for name, call, reset, prop_id, inputs_list in cases(rows, args.seed):
+            if args.only and args.only not in name:
+                continue
+            metrics = measure(call, reset, prop_id, inputs_list, args.repeat)
+            results.setdefault(name, {})[str(rows)] = metrics
+            base = baseline.get(name, {}).get(str(rows))
+            change = f"{(metrics['ms'] / base['ms'] - 1) * 100:+.0f}%" if base and base.get('ms') else "new"
+            payload = f"{metrics['payload_bytes'] / 1024:.1f}" if 'payload_bytes' in metrics else "-"
+            print(f"{name:32} {rows:9d} {metrics['ms']:10.2f} {metrics['peak_mib']:9.1f} {payload:>12} {change:>11}")
+
+    if args.save:
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': machine(), 'threshold': threshold, 'results': baseline}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions beyond {threshold:.0%}" if baseline else "\nNo baseline to compare with, run with --save")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Synthetic frames shaped like the dashboard query results."""
+import numpy as np
+import pandas as pd
+
+CITIES = ['chennai', 'Bangalore', ' hyderabad', 'trichy', 'coimbatore', 'madurai', 'pune', 'mumbai',
+          'delhi', 'kochi', 'salem', 'vellore', 'mysore', 'vizag', 'nellore', '', None]
+VEHICLE_TYPES = ['4w', '2w', '4W', '2w ', 'Pv', None]
+MASTER_SERVICES = [f'Master Service {i}' for i in range(20)] + [None]
+SERVICE_TYPES = [f'Service Type {i}' for i in range(80)] + ['', None]
+USER_SOURCES = [f'Source {i}' for i in range(40)] + ['Re-Engagement Bookings', None]
+ACTIVITIES = [
+    'Customer called for a status update', 'Done with Local shop', 'Duplicate Booking',
+    'Just Enquiry/checking the App', 'Just for Quotation', 'Post Service Escalationn',
+    'Price not satisfied/Quotes are too high', 'Testing', 'Wrong Number',
+    'All RNRs are exhausted ', 'Currentlyservice is not needed', 'Not in Chennai/Bangalore/Hyderabad/Trichy',
+    'Not Interested', 'Reminded in Whatsapp Images not received', 'Vehicle Sold / No Vehicle',
+] + [f'Activity {i}' for i in range(15)] + [' ', None]
+FEEDBACK_MASTER_SERVICES = ['General Service 1', 'General Service 2', 'Car Wash', 'Denting & Painting 3', 'Tyres',
+                            'Battery', 'AC Service 2', 'Bike Service 1', None]
+CATEGORIES = ['Price', 'Call back later', 'Vehicle not available', 'JD - Car Service', 'JD - Bike Service',
+              'Follow up call', 'Waiting for approval', None]
+
+
+def core_rows(n, days=30, seed=0, agents=300, start='2025-01-01'):
+    """Rows shaped like CORE_QUERY output, with NULLs where the joins miss."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    booked_at = start + pd.to_timedelta(rng.integers(0, 86400 * days, n), unit='s')
+    agent_names = [f'Agent {i}' for i in range(agents)] + [None]
+
+    categories = rng.choice(np.array(CATEGORIES, dtype=object), n)
+    # A share of categories carry a booking id prefix, e.g. "3690262 - Price"
+    prefixed = rng.random(n) < 0.2
+    prefixes = rng.integers(1_000_000, 9_999_999, n).astype(str)
+    categories = np.where(
+        prefixed & pd.notna(categories),
+        np.char.add(np.char.add(prefixes, ' - '), categories.astype(str)),
+        categories,
+    )
+
+    df = pd.DataFrame({
+        'booking_id': np.arange(1, n + 1) + 3_000_000,
+        'vehicle_type': rng.choice(np.array(VEHICLE_TYPES, dtype=object), n),
+        'booking_status': rng.choice(['Open', 'Closed'], n),
+        'booking_status_code': rng.choice([0, 1, 2, 3, 4, 5, 6], n),
+        'axle_flag': rng.choice([0, 1], n),
+        'flag': rng.choice([0, 0, 0, 1], n),
+        'flag_unwntd': 0,
+        'enquiry_flag': rng.choice(np.array([0, 1, None], dtype=object), n),
+        'raw_log_timestamp': booked_at,
+        'booking_date': (booked_at + pd.Timedelta(hours=5, minutes=30)).date,
+        'b2b_check_in_report': rng.choice(np.array([0, 1, None], dtype=object), n),
+        'b2b_swap_flag': rng.choice(np.array([0, None], dtype=object), n),
+        'service_status_code': rng.choice(np.array(['Completed', 'inprogress', 'Pending', None], dtype=object), n),
+        'city': rng.choice(np.array(CITIES, dtype=object), n),
+        'service_type': rng.choice(np.array(SERVICE_TYPES, dtype=object), n),
+        'master_service': rng.choice(np.array(MASTER_SERVICES, dtype=object), n),
+        'crm_admin_name': rng.choice(np.array(agent_names, dtype=object), n),
+        'user_source': rng.choice(np.array(USER_SOURCES, dtype=object), n),
+        'activity_name': rng.choice(np.array(ACTIVITIES, dtype=object), n),
+        'activity_status_code': rng.integers(0, 40, n),
+        'comments': rng.choice(np.array(['Called', 'RNR', None], dtype=object), n),
+        'category': categories,
+        'b2b_shop_name': rng.choice(np.array([f'Outlet {i}' for i in range(200)] + [None], dtype=object), n),
+        'user_vehicle_id': rng.choice(np.array([1, 2, None], dtype=object), n),
+        'vech_id': rng.integers(1, 500, n),
+        'vehicle_table_id': rng.choice(np.array([10, 20, None], dtype=object), n),
+        'user_veh_id': rng.integers(1, 500, n),
+    })
+    return df.infer_objects()
+
+
+def feedback_rows(n, days=30, seed=0, agents=300, start='2025-01-01'):
+    """Rows shaped like the feedback query output, one per checked-in b2b booking."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    booked_at = start + pd.to_timedelta(rng.integers(0, 86400 * days, n), unit='s')
+    goaxle_at = booked_at + pd.to_timedelta(rng.integers(0, 2 * 86400, n), unit='s')
+    checkin_at = goaxle_at + pd.to_timedelta(rng.integers(0, 3 * 86400, n), unit='s')
+    booking_ids = np.arange(1, n + 1) + 3_000_000
+    agent_ids = rng.choice(np.array(list(range(1001, 1001 + agents)) + [None], dtype=object), n)
+    brands = rng.choice(['Maruti', 'Hyundai', 'Honda', 'TVS', 'Bajaj'], n)
+
+    df = pd.DataFrame({
+        'gb_booking_id': booking_ids,
+        'customer_number': [f'9{number:09d}' for number in rng.integers(0, 10**9, n)],
+        'b2b_vehicle_type': rng.choice(['2w', '4w'], n),
+        'b2b_swap_flag': rng.choice(np.array([0, None], dtype=object), n),
+        'b2b_service_type': rng.choice(np.array(SERVICE_TYPES[:-2], dtype=object), n),
+        'tvs_job_card_no': rng.choice(np.array([f'JC{i:08d}' for i in range(1000)] + [None], dtype=object), n),
+        'goaxle_date': goaxle_at,
+        'make': brands,
+        'model': np.char.add(brands.astype(str), ' Model'),
+        'g_booking_id': booking_ids,
+        'mec_id': rng.choice(np.array([None, 101, 202], dtype=object), n),
+        'g_status': rng.choice(['Open', 'Closed'], n),
+        'g_flag': rng.choice([0, 0, 0, 1], n),
+        'g_booking_status': rng.choice([0, 1, 2, 3, 4, 5, 6], n),
+        'g_source': rng.choice(np.array([f'source_{i}' for i in range(40)] + ['re_engagement_bookings'], dtype=object), n),
+        'booking_date': booked_at,
+        'g_axle_flag': 1,
+        'g_city': rng.choice(np.array(CITIES, dtype=object), n),
+        'locality': rng.choice([f'Locality {i}' for i in range(400)], n),
+        'flag_unwntd': 0,
+        'flag_duplicate': rng.choice([0, 0, 0, 1], n),
+        'g_service_status': rng.choice(np.array(['Completed', 'inprogress', None], dtype=object), n),
+        'f_b2b_booking_id': booking_ids + 4_000_000,
+        'crm_goaxle_id': agent_ids,
+        'f_log': checkin_at + pd.Timedelta(hours=6),
+        'b2b_acpt_flag': rng.choice([0, 1, 1, 1], n),
+        'crm_log_id': agent_ids,
+        'cm_name': pd.Series(agent_ids).map(lambda agent: None if agent is None else f'Agent {agent - 1001}'),
+        'cm_flag': 0,
+        'crm_flag': 1,
+        'cre_flag': rng.choice([0, 1], n),
+        'b2b_log': checkin_at,
+        'ms_master_service': rng.choice(np.array(FEEDBACK_MASTER_SERVICES, dtype=object), n),
+    })
+    return df.infer_objects()
@@ -0,0 +1,64 @@
+"""Core tab rendering: all five tabs per filter change vs the active tab with the pivot memo.
+
+    python -m benchmarks.tabs --rows 100000 1000000
+
+"all tabs" renders every tab for one filter change, which is what
+update_pivot_tables did before. "active tab" renders only the visible one
+(a memo miss), "revisit" renders it again and "export" exports it, both
+served from the memo. Prints the memo hit/miss counters at the end.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import core_rows
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import index  # noqa: F401  (registers the Dash pages)
+    from pages import core
+
+    for rows in args.rows:
+        df = core.prepare_data(core.fill_core_nulls(core_rows(rows, days=30)))
+        stored = core.datasets.register(df, key=f"bench:{rows}")
+        cities = sorted(df['city'].astype(str).unique())
+        core.resolve_cube(stored)
+
+        handle = dict(stored, filters=core.normalize_filters(cities=cities[:1]))
+
+        def all_tabs():
+            core.pivot_memo.clear()
+            for tab in core.TAB_CONTAINERS:
+                core.render_tab(handle, tab)
+
+        def active_tab():
+            core.pivot_memo.clear()
+            core.render_tab(handle, 'tab-person')
+
+        timings = {'all tabs': median_ms(all_tabs, args.repeat), 'active tab': median_ms(active_tab, args.repeat)}
+        timings['revisit'] = median_ms(lambda: core.render_tab(handle, 'tab-person'), args.repeat)
+        timings['export'] = median_ms(lambda: core.export_active_tab_data(1, handle, 'tab-person'), args.repeat)
+        print(f"\n{rows} rows")
+        for label, ms in timings.items():
+            print(f"  {label:10} {ms:8.2f} ms")
+        print(f"  memo {core.pivot_memo.stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
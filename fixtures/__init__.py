@@ -0,0 +1,6 @@
+"""Offline stand-in for the production MySQL hosts.
+
+fixtures.schema holds the DDL of the 13 tables the dashboard queries read,
+fixtures.generate the seeded row generator (10k, 1M and 10M bookings) and
+fixtures.load the command that builds the database and a config.ini for it.
+"""
@@ -0,0 +1,273 @@
+"""Seeded rows for every fixture table, scaled by the number of bookings.
+
+Bookings are spread over the `days` IST days ending on `end`, heavier in
+business hours, and stored in UTC like production. Around them:
+
+- one b2b booking for each GoAxle booking (axle_flag = 1, ~35%), with a
+  b2b_status row each, a check-in report for ~60% and feedback for ~50%;
+  ~20% of those followed up get one or two later follow-ups as well
+- one to three price rows per (service type, vehicle type), all with the
+  same master service
+- ~2.5 admin comments per booking; ~10% of the bookings with several have
+  two sharing the latest timestamp, left to the tie-break on id
+- 300 active CRM agents; shops, users and vehicles grow with the bookings
+- ~2-3% of bookings hit each exclusion in CORE_QUERY (test users, test
+  garages, excluded sources and service types, nmsa/unwanted flags)
+
+Rows come out in chunks of `chunk` bookings. Each chunk draws from its own
+generator seeded with (seed, first booking id), so the same seed and chunk
+size always produce the same rows.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import ACTIVITIES, CATEGORIES, CITIES, MASTER_SERVICES, SERVICE_TYPES, USER_SOURCES, VEHICLE_TYPES
+from services.partition_cache import ist_today
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+CHUNK_BOOKINGS = 200_000
+
+FIRST_BOOKING_ID = 1_000_001
+B2B_ID_OFFSET = 4_000_000
+# Later follow-ups of a b2b booking get ids b2b_booking_id + k * FEEDBACK_ID_OFFSET
+FEEDBACK_ID_OFFSET = 20_000_000
+FIRST_AGENT_ID = 1001
+AGENTS = 300
+INACTIVE_AGENTS = 20
+AGENT_PAGES = ['/core', '/feedback']
+
+# Values CORE_QUERY filters out, so the fixtures exercise its WHERE clause
+EXCLUDED_USERS = [21816, 41317, 859, 3132, 20666]
+EXCLUDED_MECHANICS = [400001, 200018, 200379]
+EXCLUDED_SOURCES = ['Sulekha Booking', 'Sbi Bookings', 'Uber']
+EXCLUDED_SERVICE_TYPES = ['Vehicle Towing', 'Puncture', 'Bike Breakdown']
+
+# Share of bookings per IST hour of day
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 3, 5, 8, 10, 12, 12, 11, 10, 10, 10, 10, 9, 8, 7, 5, 4, 2, 1], dtype=float)
+HOUR_WEIGHTS /= HOUR_WEIGHTS.sum()
+
+COMMENTS = ['Called', 'RNR', 'Customer busy', 'Switched off', 'Asked to call later', 'Quote shared']
+BRANDS = {'Maruti': ['Swift', 'Baleno', 'Alto'], 'Hyundai': ['i20', 'Creta'], 'Honda': ['City', 'Activa'],
+          'TVS': ['Jupiter', 'Apache'], 'Bajaj': ['Pulsar']}
+BOOKING_STATUS_WEIGHTS = [0.2, 0.25, 0.25, 0.1, 0.08, 0.07, 0.05]
+
+
+def cardinalities(bookings):
+    """Row counts of the tables that grow with the number of bookings."""
+    return {
+        'users': max(1000, bookings // 3),
+        'vehicles': max(1000, bookings // 2),
+        'shops': int(np.clip(bookings // 500, 200, 5000)),
+    }
+
+
+def utc_strings(ist_times):
+    return (ist_times - pd.Timedelta(hours=5, minutes=30)).dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def with_nulls(rng, values, share):
+    values = pd.Series(values, dtype=object)
+    return values.where(rng.random(len(values)) >= share, None)
+
+
+def dimension_tables(bookings, seed=0):
+    """(table, DataFrame) of the lookup tables."""
+    rng = np.random.default_rng([seed, 0])
+    sizes = cardinalities(bookings)
+
+    agent_ids = np.arange(FIRST_AGENT_ID, FIRST_AGENT_ID + AGENTS + INACTIVE_AGENTS)
+    yield 'crm_admin', pd.DataFrame({
+        'crm_log_id': agent_ids,
+        'name': [f'Agent {i - FIRST_AGENT_ID}' for i in agent_ids],
+        'flag': (agent_ids >= FIRST_AGENT_ID + AGENTS).astype(int),
+        'crm_flag': rng.choice([0, 1], len(agent_ids), p=[0.3, 0.7]),
+        'cre_flag': rng.choice([0, 1], len(agent_ids), p=[0.6, 0.4]),
+    })
+
+    # Every agent logs in with password "agent<crm_log_id>"
+    access = pd.DataFrame([(agent, page) for agent in agent_ids for page in AGENT_PAGES
+                           if page == '/core' or rng.random() < 0.6], columns=['crm_log_id', 'page_path'])
+    access['name'] = 'Agent ' + (access['crm_log_id'] - FIRST_AGENT_ID).astype(str)
+    access['agent_password'] = 'agent' + access['crm_log_id'].astype(str)
+    access['active_flag'] = (access['crm_log_id'] < FIRST_AGENT_ID + AGENTS).astype(int)
+    yield 'user_page_access', access[['crm_log_id', 'name', 'agent_password', 'page_path', 'active_flag']]
+
+    sources = [source for source in USER_SOURCES if source] + EXCLUDED_SOURCES
+    yield 'user_source_tbl', pd.DataFrame({'user_source': sources})
+
+    activities = [activity for activity in ACTIVITIES if activity is not None]
+    yield 'admin_activity_tbl', pd.DataFrame({'id': np.arange(1, len(activities) + 1), 'activity': activities})
+
+    service_types = [service for service in SERVICE_TYPES if service] + EXCLUDED_SERVICE_TYPES
+    masters = [master for master in MASTER_SERVICES if master]
+    # A row per price, so joins on (service_type, type) can fan out
+    yield 'go_axle_service_price_tbl', pd.DataFrame(
+        [(service, vehicle, masters[i % len(masters)], 250 * (i + 1) + 100 * tier)
+         for i, service in enumerate(service_types) for vehicle in ('2w', '4w') for tier in range(1 + i % 3)],
+        columns=['service_type', 'type', 'master_service', 'price'])
+
+    shop_ids = np.arange(1, sizes['shops'] + 1)
+    yield 'b2b_mec_tbl', pd.DataFrame({'b2b_shop_id': shop_ids, 'b2b_shop_name': [f'Outlet {i}' for i in shop_ids]})
+
+    # ~10% of the vehicle ids bookings point at are missing, as in production
+    for first in range(1, sizes['vehicles'] + 1, CHUNK_BOOKINGS):
+        chunk_rng = np.random.default_rng([seed, 1, first])
+        ids = np.arange(first, min(first + CHUNK_BOOKINGS, sizes['vehicles'] + 1))
+        ids = ids[chunk_rng.random(len(ids)) >= 0.1]
+        yield 'user_vehicle_table', pd.DataFrame({
+            'id': ids,
+            'user_id': chunk_rng.integers(1, sizes['users'] + 1, len(ids)),
+            'vehicle_id': with_nulls(chunk_rng, chunk_rng.integers(1, 2000, len(ids)), 0.05),
+        })
+
+
+def booking_tables(first_id, count, bookings, start, days, seed=0):
+    """(table, DataFrame) of `count` bookings from `first_id` and the rows hanging off them."""
+    rng = np.random.default_rng([seed, 2, first_id])
+    sizes = cardinalities(bookings)
+    n = count
+    booking_ids = np.arange(first_id, first_id + n)
+
+    day = rng.integers(0, days, n)
+    seconds = rng.choice(24, n, p=HOUR_WEIGHTS) * 3600 + rng.integers(0, 3600, n)
+    booked_at = pd.Series(pd.Timestamp(start) + pd.to_timedelta(day * 86400 + seconds, unit='s'))
+    # Follow-up events past the last day have not happened yet
+    horizon = pd.Timestamp(start) + pd.Timedelta(days=days)
+
+    user_ids = rng.integers(1, sizes['users'] + 1, n)
+    user_ids = np.where(rng.random(n) < 0.005, rng.choice(EXCLUDED_USERS, n), user_ids)
+    mec_ids = pd.Series(rng.integers(1, sizes['shops'] + 1, n), dtype=object)
+    mec_ids = mec_ids.where(rng.random(n) >= 0.6, None)
+    mec_ids = mec_ids.where(rng.random(n) >= 0.01, pd.Series(rng.choice(EXCLUDED_MECHANICS, n), dtype=object))
+    service_types = rng.choice(np.array(SERVICE_TYPES + EXCLUDED_SERVICE_TYPES, dtype=object), n,
+                               p=[0.97 / len(SERVICE_TYPES)] * len(SERVICE_TYPES) + [0.01] * 3)
+    sources = rng.choice(np.array(USER_SOURCES[:-1] + EXCLUDED_SOURCES, dtype=object), n,
+                         p=[0.97 / (len(USER_SOURCES) - 1)] * (len(USER_SOURCES) - 1) + [0.01] * 3)
+    axle_flag = (rng.random(n) < 0.35).astype(int)
+    service_status = rng.choice(np.array(['Completed', 'inprogress', 'Pending', None], dtype=object), n,
+                                p=[0.3, 0.1, 0.3, 0.3])
+
+    yield 'user_booking_tb', pd.DataFrame({
+        'booking_id': booking_ids,
+        'user_id': user_ids,
+        'user_veh_id': with_nulls(rng, rng.integers(1, sizes['vehicles'] + 1, n), 0.05),
+        'vech_id': rng.integers(1, 500, n),
+        'mec_id': mec_ids,
+        'vehicle_type': rng.choice(np.array(VEHICLE_TYPES, dtype=object), n),
+        'status': rng.choice(['Open', 'Closed'], n),
+        'booking_status': rng.choice(7, n, p=BOOKING_STATUS_WEIGHTS),
+        'axle_flag': axle_flag,
+        'flag': (rng.random(n) < 0.1).astype(int),
+        'flag_unwntd': (rng.random(n) < 0.01).astype(int),
+        'flag_duplicate': (rng.random(n) < 0.02).astype(int),
+        'nmsa_flag': (rng.random(n) < 0.01).astype(int),
+        'enquiry_flag': rng.choice(np.array([0, 1, None], dtype=object), n),
+        'log': utc_strings(booked_at),
+        'service_status': service_status,
+        'city': rng.choice(np.array(CITIES, dtype=object), n),
+        'locality': [f'Locality {i}' for i in rng.integers(0, 400, n)],
+        'service_type': service_types,
+        'source': sources,
+        'crm_update_id': with_nulls(rng, rng.integers(FIRST_AGENT_ID, FIRST_AGENT_ID + AGENTS, n), 0.05),
+        'activity_status': rng.integers(0, len(ACTIVITIES), n),
+    })
+
+    # Up to 7 comments per booking; ids are unique across chunks
+    counts = np.minimum(rng.poisson(2.5, n), 7)
+    book_ids = np.repeat(booking_ids, counts)
+    ordinal = np.arange(len(book_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+    comment_at = booked_at.repeat(counts).reset_index(drop=True) + pd.to_timedelta(
+        (ordinal + 1) * rng.integers(600, 86400, len(book_ids)), unit='s')
+    # Own generator, so the columns added later leave the other rows as they were
+    comment_rng = np.random.default_rng([seed, 3, first_id])
+    tied = np.repeat((counts >= 2) & (comment_rng.random(n) < 0.1), counts) & (ordinal < 2)
+    comment_at[tied] = comment_at.groupby(book_ids).transform('max')[tied]
+    categories = pd.Series(rng.choice(np.array(CATEGORIES, dtype=object), len(book_ids)), dtype=object)
+    prefixed = categories.notna() & (rng.random(len(book_ids)) < 0.2)
+    categories[prefixed] = pd.Series(book_ids[prefixed.to_numpy()]).astype(str).to_numpy() + ' - ' + categories[prefixed]
+    comments = pd.DataFrame({
+        'id': book_ids * 8 + ordinal,
+        'book_id': book_ids,
+        'user_id': np.repeat(user_ids, counts),
+        'comments': with_nulls(rng, rng.choice(COMMENTS, len(book_ids)), 0.1),
+        'category': categories,
+        'status': (comment_rng.random(len(book_ids)) >= 0.05).astype(int),
+        'log': utc_strings(comment_at),
+    })
+    yield 'admin_comments_tbl', comments[(comment_at < horizon).to_numpy()]
+
+    goaxle = np.flatnonzero(axle_flag == 1)
+    m = len(goaxle)
+    b2b_ids = booking_ids[goaxle] + B2B_ID_OFFSET
+    goaxle_at = booked_at.iloc[goaxle].reset_index(drop=True) + pd.to_timedelta(rng.integers(0, 48 * 3600, m), unit='s')
+    goaxle_at = goaxle_at.clip(upper=horizon - pd.Timedelta(seconds=1))
+    checked_in = rng.random(m) < 0.6
+    brands = rng.choice(list(BRANDS), m)
+    yield 'b2b_booking_tbl', pd.DataFrame({
+        'b2b_booking_id': b2b_ids,
+        'gb_booking_id': booking_ids[goaxle],
+        'b2b_shop_id': with_nulls(rng, rng.integers(1, sizes['shops'] + 1, m), 0.02),
+        'b2b_cust_phone': [f'9{number:09d}' for number in rng.integers(0, 10**9, m)],
+        'b2b_vehicle_type': rng.choice(['2w', '4w'], m),
+        'b2b_service_type': rng.choice(np.array([service for service in SERVICE_TYPES if service]), m),
+        'b2b_swap_flag': rng.choice(np.array([0, 1, None], dtype=object), m, p=[0.8, 0.03, 0.17]),
+        'b2b_check_in_report': checked_in.astype(int),
+        'tvs_job_card_no': with_nulls(rng, [f'JC{number:08d}' for number in rng.integers(0, 10**8, m)], 0.3),
+        'b2b_log': utc_strings(goaxle_at),
+        'brand': brands,
+        'model': [BRANDS[brand][i % len(BRANDS[brand])] for i, brand in zip(rng.integers(0, 3, m), brands)],
+    })
+    yield 'b2b_status', pd.DataFrame({
+        'id': b2b_ids,
+        'b2b_booking_id': b2b_ids,
+        'b2b_acpt_flag': (rng.random(m) < 0.85).astype(int),
+    })
+
+    reported = np.flatnonzero(checked_in | np.isin(service_status[goaxle], ['Completed', 'inprogress']))
+    reported_at = goaxle_at.iloc[reported].reset_index(drop=True) + pd.to_timedelta(
+        rng.integers(0, 72 * 3600, len(reported)), unit='s')
+    reports = pd.DataFrame({
+        'id': b2b_ids[reported],
+        'b2b_booking_id': b2b_ids[reported],
+        'b2b_log': utc_strings(reported_at),
+    })
+    yield 'b2b_checkin_report', reports[(reported_at < horizon).to_numpy()]
+
+    followed = np.flatnonzero(rng.random(m) < 0.5)
+    followed_at = goaxle_at.iloc[followed].reset_index(drop=True) + pd.to_timedelta(
+        rng.integers(3600, 7 * 86400, len(followed)), unit='s')
+    feedback = pd.DataFrame({
+        'id': b2b_ids[followed],
+        'b2b_booking_id': b2b_ids[followed],
+        'crm_goaxle_id': with_nulls(rng, rng.integers(FIRST_AGENT_ID, FIRST_AGENT_ID + AGENTS, len(followed)), 0.05),
+        'log': utc_strings(followed_at),
+    })
+    # Later follow-ups by other agents, drawn from their own generator so the
+    # rows above stay as they were
+    followup_rng = np.random.default_rng([seed, 4, first_id])
+    repeats = np.where(followup_rng.random(len(followed)) < 0.2, followup_rng.integers(1, 3, len(followed)), 0)
+    order = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    later = np.repeat(np.arange(len(followed)), repeats)
+    later_at = followed_at.iloc[later].reset_index(drop=True) + pd.to_timedelta(
+        (order + 1) * followup_rng.integers(3600, 2 * 86400, len(later)), unit='s')
+    extra = pd.DataFrame({
+        'id': feedback['id'].to_numpy()[later] + (order + 1) * FEEDBACK_ID_OFFSET,
+        'b2b_booking_id': feedback['b2b_booking_id'].to_numpy()[later],
+        'crm_goaxle_id': with_nulls(followup_rng, followup_rng.integers(FIRST_AGENT_ID, FIRST_AGENT_ID + AGENTS,
+                                                                        len(later)), 0.05),
+        'log': utc_strings(later_at),
+    })
+    yield 'feedback_track', pd.concat([feedback[(followed_at < horizon).to_numpy()],
+                                       extra[(later_at < horizon).to_numpy()]], ignore_index=True)
+
+
+def generate(bookings, seed=0, days=180, end=None, chunk=CHUNK_BOOKINGS):
+    """Yield (table, DataFrame) for every fixture table, lookup tables first."""
+    end = end or ist_today()
+    start = end - timedelta(days=days - 1)
+    yield from dimension_tables(bookings, seed)
+    for first in range(FIRST_BOOKING_ID, FIRST_BOOKING_ID + bookings, chunk):
+        count = min(chunk, FIRST_BOOKING_ID + bookings - first)
+        yield from booking_tables(first, count, bookings, start, days, seed)
@@ -0,0 +1,136 @@
+"""DDL of the tables the dashboard queries read, in the two production schemas.
+
+Only the columns the queries touch are declared. Indexes are the ones the
+queries rely on: the booking and check-in timestamps, and the join keys.
+"""
+
+DATABASES = ('go_bumpr', 'b2b')
+
+# (database, table, CREATE TABLE body), in dependency order
+TABLES = [
+    ('go_bumpr', 'crm_admin', """
+        crm_log_id INT NOT NULL PRIMARY KEY,
+        name VARCHAR(100),
+        flag TINYINT NOT NULL DEFAULT 0,
+        crm_flag TINYINT NOT NULL DEFAULT 0,
+        cre_flag TINYINT NOT NULL DEFAULT 0
+    """),
+    ('go_bumpr', 'user_page_access', """
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        crm_log_id INT NOT NULL,
+        name VARCHAR(100),
+        agent_password VARCHAR(100) NOT NULL,
+        page_path VARCHAR(100) NOT NULL,
+        active_flag TINYINT NOT NULL DEFAULT 1,
+        KEY idx_user_page_access_agent (crm_log_id, active_flag)
+    """),
+    ('go_bumpr', 'user_source_tbl', """
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        user_source VARCHAR(100) NOT NULL,
+        UNIQUE KEY idx_user_source (user_source)
+    """),
+    ('go_bumpr', 'admin_activity_tbl', """
+        id INT NOT NULL PRIMARY KEY,
+        activity VARCHAR(150)
+    """),
+    ('go_bumpr', 'go_axle_service_price_tbl', """
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        service_type VARCHAR(100) NOT NULL,
+        type VARCHAR(10) NOT NULL,
+        master_service VARCHAR(100),
+        price INT,
+        KEY idx_service_price (service_type, type)
+    """),
+    ('go_bumpr', 'user_vehicle_table', """
+        id INT NOT NULL PRIMARY KEY,
+        user_id INT NOT NULL,
+        vehicle_id INT
+    """),
+    ('go_bumpr', 'user_booking_tb', """
+        booking_id INT NOT NULL PRIMARY KEY,
+        user_id INT NOT NULL,
+        user_veh_id INT,
+        vech_id INT,
+        mec_id INT,
+        vehicle_type VARCHAR(10),
+        status VARCHAR(20),
+        booking_status TINYINT NOT NULL DEFAULT 0,
+        axle_flag TINYINT NOT NULL DEFAULT 0,
+        flag TINYINT NOT NULL DEFAULT 0,
+        flag_unwntd TINYINT NOT NULL DEFAULT 0,
+        flag_duplicate TINYINT NOT NULL DEFAULT 0,
+        nmsa_flag TINYINT NOT NULL DEFAULT 0,
+        enquiry_flag TINYINT,
+        log DATETIME NOT NULL,
+        service_status VARCHAR(20),
+        city VARCHAR(50),
+        locality VARCHAR(100),
+        service_type VARCHAR(100),
+        source VARCHAR(100),
+        crm_update_id INT,
+        activity_status INT,
+        KEY idx_user_booking_log (log)
+    """),
+    ('go_bumpr', 'admin_comments_tbl', """
+        id INT NOT NULL PRIMARY KEY,
+        book_id INT NOT NULL,
+        user_id INT,
+        comments VARCHAR(255),
+        category VARCHAR(100),
+        status TINYINT NOT NULL DEFAULT 1,
+        log DATETIME NOT NULL,
+        KEY idx_admin_comments_book (book_id, log)
+    """),
+    ('go_bumpr', 'feedback_track', """
+        id INT NOT NULL PRIMARY KEY,
+        b2b_booking_id INT NOT NULL,
+        crm_goaxle_id INT,
+        log DATETIME NOT NULL,
+        KEY idx_feedback_track_booking (b2b_booking_id)
+    """),
+    ('b2b', 'b2b_mec_tbl', """
+        b2b_shop_id INT NOT NULL PRIMARY KEY,
+        b2b_shop_name VARCHAR(150)
+    """),
+    ('b2b', 'b2b_booking_tbl', """
+        b2b_booking_id INT NOT NULL PRIMARY KEY,
+        gb_booking_id INT NOT NULL,
+        b2b_shop_id INT,
+        b2b_cust_phone VARCHAR(15),
+        b2b_vehicle_type VARCHAR(10),
+        b2b_service_type VARCHAR(100),
+        b2b_swap_flag TINYINT,
+        b2b_check_in_report TINYINT,
+        tvs_job_card_no VARCHAR(30),
+        b2b_log DATETIME NOT NULL,
+        brand VARCHAR(50),
+        model VARCHAR(50),
+        KEY idx_b2b_booking_gb (gb_booking_id)
+    """),
+    ('b2b', 'b2b_status', """
+        id INT NOT NULL PRIMARY KEY,
+        b2b_booking_id INT NOT NULL,
+        b2b_acpt_flag TINYINT NOT NULL DEFAULT 0,
+        KEY idx_b2b_status_booking (b2b_booking_id)
+    """),
+    ('b2b', 'b2b_checkin_report', """
+        id INT NOT NULL PRIMARY KEY,
+        b2b_booking_id INT NOT NULL,
+        b2b_log DATETIME NOT NULL,
+        KEY idx_checkin_log (b2b_log),
+        KEY idx_checkin_booking (b2b_booking_id)
+    """),
+]
+
+
+def create_statements(drop=False):
+    """SQL statements creating both databases and every table."""
+    statements = [f"CREATE DATABASE IF NOT EXISTS {database}" for database in DATABASES]
+    for database, table, body in TABLES:
+        if drop:
+            statements.append(f"DROP TABLE IF EXISTS {database}.{table}")
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS {database}.{table} ({body.rstrip()}\n) "
+            "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        )
+    return statements
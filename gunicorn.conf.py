@@ -0,0 +1,30 @@
+# gunicorn -c gunicorn.conf.py wsgi:application
+# Every setting can be overridden with the BRIDGE_* variables below or on the command line.
+import os
+
+bind = os.environ.get('BRIDGE_BIND', '0.0.0.0:8501')
+workers = int(os.environ.get('BRIDGE_WORKERS', 2))
+# Threads per worker; most request time is spent waiting on MySQL or on background jobs
+threads = int(os.environ.get('BRIDGE_THREADS', 8))
+worker_class = 'gthread'
+# Import the app once in the master so workers start fast and share its pages in memory
+preload_app = os.environ.get('BRIDGE_PRELOAD', '1') == '1'
+# Heavy loads run as background jobs, so a request that takes this long is stuck
+timeout = int(os.environ.get('BRIDGE_TIMEOUT', 120))
+graceful_timeout = 30
+accesslog = os.environ.get('BRIDGE_ACCESS_LOG')
+
+
+def post_fork(server, worker):
+    # Connections and diskcache handles opened by the master must not be shared
+    from services import background, cache, db
+
+    db.dispose_all(close=False)
+    background.cache.close()
+    cache.backend.close()
+
+
+def post_worker_init(worker):
+    from services import db
+
+    db.warm_up()
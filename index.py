@@ -1,6 +1,7 @@
 import dash
 from dash import Dash, html, dcc, Input, Output, State, page_container
 import dash_bootstrap_components as dbc
+from services import db, metrics
 
 SIDEBAR_WIDTH = 250
 
@@ -36,6 +37,9 @@ link_style = {
     "display": "block"
 }
 
+# Before the app exists, so the pages' callbacks are timed as they register
+metrics.instrument_callbacks()
+
 app = Dash(
     __name__,
     use_pages=True,
@@ -43,6 +47,7 @@ app = Dash(
     external_stylesheets=[dbc.themes.CERULEAN]
 )
 server = app.server
+metrics.serve(app)
 
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
@@ -238,4 +243,5 @@ app.index_string = '''
 '''
 
 if __name__ == "__main__":
+    db.warm_up()
     app.run(debug=False, port=8501)
\ No newline at end of file
@@ -1,49 +1,25 @@
 from dash import dcc, html, Input, Output, State, callback, dash_table, callback_context, no_update, ALL, register_page, page_container
+from dash.dash_table import FormatTemplate
 import dash
 import dash_bootstrap_components as dbc
 import pandas as pd
 import numpy as np
-import mysql.connector
-import configparser
-import os
 from datetime import datetime, timedelta
 import calendar
-import re   
+import os
 import json
-import sqlalchemy
+import logging
 import warnings
+from services import arrow_store, background, cache, cancellation, queries, query_log
+from services.aggregation import CountCube
+from services.datasets import datasets
+from services.filter_index import FilterIndex
+from services.partition_cache import PartitionCache
 warnings.filterwarnings("ignore") 
 
 dash.register_page(__name__, path="/core")
 
-# Read database configuration from config.ini
-config = configparser.ConfigParser()
-config.read(os.path.join(os.path.dirname(__file__), "config.ini"))
-
-def get_db_connection():
-    try:
-        creds = config['mysql_devcs']
-        return mysql.connector.connect(
-            host=creds.get('host'),
-            user=creds.get('user'),
-            passwd=creds.get('password'),
-            database=creds.get('database'),
-            port=int(creds.get('port')),
-            use_pure=True
-        )
-    except mysql.connector.Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
-
-def get_db_engine():
-    creds = config['mysql_devcs']
-    user = creds.get('user')
-    password = creds.get('password')
-    host = creds.get('host')
-    port = creds.get('port')
-    database = creds.get('database')
-    engine_str = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-    return sqlalchemy.create_engine(engine_str)
+logger = logging.getLogger(__name__)
 
 # Calculate dates at global scope
 current_date = pd.to_datetime("today").date()
@@ -61,6 +37,12 @@ TIME_PERIOD_OPTIONS = [
     {'label': 'This Year', 'value': 'this_year'},
 ]
 
+# CSV export of the active tab: numeric count and share columns, or "N (p%)" text
+EXPORT_FORMAT_OPTIONS = [
+    {'label': 'Numbers', 'value': 'numbers'},
+    {'label': 'Formatted', 'value': 'formatted'},
+]
+
 # Add this at the top of your file with other constants
 COLUMN_NAME_MAPPING = {
     'booking_id': 'Booking ID',
@@ -71,7 +53,7 @@ COLUMN_NAME_MAPPING = {
     'crm_admin_name': 'Person',
     'b2b_shop_name': 'Outlet Name',
     'Activity_Status_Final': 'Activity Status',
-    'category_clean': 'Category',
+    'cleaned_category': 'Category',
     'comments': 'Comments',
     'city': 'City',
     'service_type': 'Service Type'
@@ -113,125 +95,165 @@ def get_period_date_range(period_value):
         return max(start, six_months_ago), end
     return None, None
 
+# Column types of CORE_QUERY results, used for typed NULL handling
+CORE_NUMERIC_COLUMNS = [
+    'booking_id', 'booking_status_code', 'axle_flag', 'flag', 'flag_unwntd', 'enquiry_flag',
+    'b2b_check_in_report', 'b2b_swap_flag', 'activity_status_code', 'user_vehicle_id',
+    'vech_id', 'vehicle_table_id', 'user_veh_id',
+]
+CORE_TEXT_COLUMNS = [
+    'vehicle_type', 'booking_status', 'service_status_code', 'city', 'service_type', 'master_service',
+    'crm_admin_name', 'user_source', 'activity_name', 'comments', 'category', 'b2b_shop_name',
+]
+# Text NULLs become '0', the label the dashboard has always shown for them
+MISSING_TEXT = '0'
+# Numeric columns that can be NULL, and so arrive as floats
+CORE_NULLABLE_NUMERIC_COLUMNS = ['enquiry_flag', 'b2b_check_in_report', 'b2b_swap_flag', 'user_vehicle_id', 'vehicle_table_id']
+
+def fill_core_nulls(df):
+    """Fill NULLs per column type so text columns never turn into mixed objects."""
+    fills = {column: 0 for column in CORE_NUMERIC_COLUMNS if column in df.columns}
+    fills.update({column: MISSING_TEXT for column in CORE_TEXT_COLUMNS if column in df.columns})
+    df = df.fillna(fills)
+    if df.empty and not df.columns.empty:
+        # No rows to infer from: the dtypes fetched rows get
+        dtypes = {column: 'float64' if column in CORE_NULLABLE_NUMERIC_COLUMNS else 'int64'
+                  for column in CORE_NUMERIC_COLUMNS if column in df.columns}
+        if 'raw_log_timestamp' in df.columns:
+            dtypes['raw_log_timestamp'] = 'datetime64[ns]'
+        df = df.astype(dtypes)
+    return df
+
 def fetch_core_data(start_date=None, end_date=None):
     if start_date is None or end_date is None:
         return pd.DataFrame()
-    query = """
-    WITH LatestComments AS (
-        SELECT user_id, book_id, comments, category, status AS comment_status, log AS comment_log
-        FROM admin_comments_tbl ac
-        WHERE log = (SELECT MAX(log) FROM admin_comments_tbl ac2 WHERE ac2.book_id = ac.book_id)
-    )
-    SELECT DISTINCT
-        a.booking_id,
-        CONCAT(UPPER(LEFT(TRIM(a.vehicle_type), 1)), LOWER(SUBSTRING(TRIM(a.vehicle_type), 2))) AS vehicle_type,
-        a.status AS booking_status,
-        a.booking_status AS booking_status_code,
-        a.axle_flag,
-        a.flag,
-        a.flag_unwntd,
-        a.enquiry_flag,
-        a.log AS raw_log_timestamp,
-        DATE(ADDTIME(a.log, '05:30:00')) AS booking_date,
-        b.b2b_check_in_report,
-        b.b2b_swap_flag,
-        a.service_status AS service_status_code,
-        a.city,
-        a.service_type,
-        c.master_service,
-        d.name AS crm_admin_name,
-        e.user_source,
-        f.activity AS activity_name,
-        a.activity_status AS activity_status_code,
-        lc.comments,
-        lc.category,
-        g.b2b_shop_name,
-        uv.vehicle_id AS user_vehicle_id,
-        a.vech_id,
-        uv.id AS vehicle_table_id,
-        a.user_veh_id
-    FROM go_bumpr.user_booking_tb a
-    LEFT JOIN b2b.b2b_booking_tbl b ON a.booking_id = b.gb_booking_id
-    LEFT JOIN go_bumpr.go_axle_service_price_tbl c ON a.service_type = c.service_type AND a.vehicle_type = c.type
-    LEFT JOIN crm_admin d ON d.crm_log_id = a.crm_update_id
-    LEFT JOIN user_vehicle_table uv ON uv.id = a.user_veh_id
-    LEFT JOIN go_bumpr.user_source_tbl e ON e.user_source = a.source
-    LEFT JOIN go_bumpr.admin_activity_tbl f ON f.id = a.activity_status
-    LEFT JOIN b2b.b2b_mec_tbl g ON g.b2b_shop_id = b.b2b_shop_id
-    LEFT JOIN LatestComments lc ON a.booking_id = lc.book_id
-    WHERE
-        a.log BETWEEN 
-            SUBTIME(CONCAT(%s, ' 00:00:00'), '05:30:00') AND 
-            SUBTIME(CONCAT(%s, ' 23:59:59'), '05:30:00')
-        AND (a.mec_id NOT IN (400001, 200018, 200379, 203042, 400974) or a.mec_id is null)
-        AND a.user_id NOT IN (21816, 41317, 859, 3132, 20666, 56511, 2792, 128, 19, 7176, 19470, 1, 951, 103699, 113453, 108783, 226, 252884, 189598, 133986, 270162, 298572, 287322, 53865, 289516, 14485, 1678, 30865, 125455, 338469, 9570, 388733, 276771, 392833, 378368, 309341, 299526, 304771, 1935, 22115, 44794, 1031939, 639065, 662228, 965020, 804253, 722759, 378258, 1088113, 1165855, 1165488, 1133076, 1288252, 304783)
-        AND a.source NOT IN ('Sulekha Booking', 'Sbi Bookings', 'BTL Booking', 'RSA Bookings', 'nmsa_web', 'Uber')
-        AND (a.service_type NOT IN ('Breakdown Assistance', 'Bike Tyre Puncture', 'Car Tyre Puncture', 'Flat Tyre Assistance', 'Vehicle Towing', 'Puncture', 'Towing', 'Bike Breakdown', 'Bike Puncture', 'Deep Clean', 'IOCL Check-up') or a.service_type is null)
-        AND a.nmsa_flag != 1
-        AND a.flag_unwntd != 1
-        AND (b.b2b_swap_flag !=1 or b.b2b_swap_flag is null)
-    """
-    engine = get_db_engine()
+    # Failures propagate so the page can tell them from an empty range;
+    # read_sql has already put a failed statement in the query log
     try:
-        df = pd.read_sql(query, engine, params=(start_date, end_date))
-        df.fillna(0, inplace=True)
-        df.infer_objects(copy=False)
-        return df
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        return pd.DataFrame()
-    finally:
-        engine.dispose()
+        with cancellation.queries.query('mysql_devcs') as conn:
+            df = query_log.read_sql('core', queries.CORE_QUERY, conn,
+                                    params={'start_date': start_date, 'end_date': end_date})
+    except Exception:
+        logger.exception("Core query for %s to %s failed", start_date, end_date)
+        raise
+    return fill_core_nulls(df)
+
+# Columns of the prepared core frame stored as categoricals / downcast ints
+CATEGORICAL_COLUMNS = [
+    'city', 'vehicle_type', 'master_service', 'service_type', 'crm_admin_name',
+    'user_source', 'activity_name', 'comments', 'new_status', 'Activity_Status_Final',
+]
+INTEGER_FLAG_COLUMNS = ['flag', 'axle_flag', 'booking_status_code']
+
+# Blank text values and the label each cleaned column shows instead
+BLANK_VALUES = [MISSING_TEXT, '', ' ']
+LABEL_DEFAULTS = {
+    'master_service': 'No Service Available',
+    'service_type': 'No Service Available',
+    'crm_admin_name': 'No Name Available',
+    'user_source': 'No Service Available',
+    'activity_name': 'Unknown Status',
+}
+
+CANCELLED_BOOKING_COMMENTS = [
+    'Customer called for a status update', 'Done with Local shop', 'Duplicate Booking',
+    'Just Enquiry/checking the App', 'Just for Quotation', 'Post Service Escalationn',
+    'Price not satisfied/Quotes are too high', 'Testing', 'Wrong Number'
+]
+OTHER_BOOKING_COMMENTS = [
+    'All RNRs are exhausted ', 'Currentlyservice is not needed', 'Not in Chennai/Bangalore/Hyderabad/Trichy',
+    'Not Interested', 'Reminded in Whatsapp Images not received', 'Vehicle Sold / No Vehicle'
+]
+
+# Bookings that count towards the Follow-up tab
+FOLLOWUP_STATUS_CODES = [3, 4, 5, 6]
+
+def map_distinct(series, transform):
+    """Run `transform` once per distinct value and return a categorical with sorted categories."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), pd.Series(series.cat.categories, dtype=object).astype(str)
+    else:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object).astype(str)
+    labels = pd.Series(transform(uniques), dtype=object).to_numpy()
+    categories = np.unique(labels)
+    label_codes = np.searchsorted(categories, labels)
+    return pd.Categorical.from_codes(label_codes[codes], categories=categories)
+
+def clean_label(default):
+    return lambda values: values.mask(values.isin(BLANK_VALUES), default)
+
+def clean_category(values):
+    """Follow-up category label: missing -> 'Follow up', 'JD -' categories collapsed, booking id prefixes removed."""
+    values = values.replace(MISSING_TEXT, 'Follow up')
+    values = values.mask(values.str.startswith('JD -'), 'JD Category')
+    return values.str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
 
 def prepare_data(df):
-    if df is not None and not df.empty:
+    if df is not None and not df.columns.empty:
         df = df[df['user_source'] != 'Re-Engagement Bookings']
         
-        # Clean data
-        df['master_service'] = df['master_service'].astype(str).replace(['0', '', ' '], 'No Service Available')
-        df['service_type'] = df['service_type'].astype(str).replace(['0', '', ' '], 'No Service Available')
-        df['crm_admin_name'] = df['crm_admin_name'].astype(str).replace(['0', '', ' '], 'No Name Available')
-        df['user_source'] = df['user_source'].astype(str).replace(['0', '', ' '], 'No Service Available')
-        df['activity_name'] = df['activity_name'].astype(str).replace(['0', '', ' '], 'Unknown Status')
-        df['city'] = df['city'].astype(str).str.strip().str.title().replace(['0', '', ' '], 'No city Available')
-        df['comments'] = df['activity_name'].astype(str).replace(['0', "", ' '], 'Unknown Status')
-        
+        # Clean data, once per distinct value of each dimension
+        for column, default in LABEL_DEFAULTS.items():
+            df[column] = map_distinct(df[column], clean_label(default))
+        df['city'] = map_distinct(df['city'], lambda values: clean_label('No city Available')(values.str.strip().str.title()))
+        df['comments'] = df['activity_name']
         
-        #Convert to date only (no time component)
-        df['Dates'] = pd.to_datetime(df['booking_date']).dt.date
-        df['booking_date'] = pd.to_datetime(df['booking_date']).dt.date  # Add this line to ensure booking_date is date only
+        # Convert to date only (no time component), parsing each distinct day once
+        day_codes, days = pd.factorize(df['booking_date'])
+        booking_days = pd.Series(pd.to_datetime(days).date, dtype=object).to_numpy()[day_codes]
+        df['booking_date'] = booking_days
+        df['Dates'] = booking_days
         
         # Status mapping
-        condition = [
-            df['comments'].isin([
-                'Customer called for a status update', 'Done with Local shop', 'Duplicate Booking',
-                'Just Enquiry/checking the App', 'Just for Quotation', 'Post Service Escalationn',
-                'Price not satisfied/Quotes are too high', 'Testing', 'Wrong Number'
-            ]),
-            df['comments'].isin([
-                'All RNRs are exhausted ', 'Currentlyservice is not needed', 'Not in Chennai/Bangalore/Hyderabad/Trichy',
-                'Not Interested', 'Reminded in Whatsapp Images not received', 'Vehicle Sold / No Vehicle'
-            ])
-        ]
-        results = ['Cancelled Booking', 'Other Booking']
-        df['Activity_Status_Final'] = np.select(condition, results, default='Unknown Status').astype(str)
-
+        df['Activity_Status_Final'] = map_distinct(df['comments'], lambda values: np.select(
+            [values.isin(CANCELLED_BOOKING_COMMENTS), values.isin(OTHER_BOOKING_COMMENTS)],
+            ['Cancelled Booking', 'Other Booking'],
+            default='Unknown Status'
+        ))
+
+        flag = df['flag'].to_numpy()
+        status_code = df['booking_status_code'].to_numpy()
         conditions = [
-            (df['flag'] == 1),
-            (df['flag_unwntd'] == 1),
-            ((df['booking_status_code'] == 2) & (df['axle_flag'] == 1) & (df['flag'] == 0)) | (df['service_status_code'] == 'Completed'),
-            (df['booking_status_code'].isin([3, 4, 5, 6]) & (df['flag'] == 0)),
-            (df['booking_status_code'] == 1) & (df['flag'] == 0),
-            (df['booking_status_code'] == 0) & (df['flag'] != 1),
+            (flag == 1),
+            (df['flag_unwntd'].to_numpy() == 1),
+            ((status_code == 2) & (df['axle_flag'].to_numpy() == 1) & (flag == 0)) | (df['service_status_code'].to_numpy() == 'Completed'),
+            (np.isin(status_code, [3, 4, 5, 6]) & (flag == 0)),
+            (status_code == 1) & (flag == 0),
+            (status_code == 0) & (flag != 1),
         ]
         results = ['Cancelled', 'Duplicate', 'Goaxled', 'Follow-up', 'Idle', 'Others']
-        df['new_status'] = np.select(conditions, results, default='Unknown Status').astype(str)
+        df['new_status'] = pd.Categorical(np.select(conditions, results, default='Unknown Status'))
+
+        # Follow-up tab: cleaned category (once per distinct raw category) and eligibility
+        df['cleaned_category'] = map_distinct(df['category'], clean_category)
+        df['followup_eligible'] = np.isin(status_code, FOLLOWUP_STATUS_CODES) & (flag == 0)
         
-        df['vehicle_type'] = df['vehicle_type'].astype(str).str.strip().str.lower()
-        df['vehicle_type'] = df['vehicle_type'].apply(lambda x: x if x in ['4w', '2w'] else 'Others')
+        df['vehicle_type'] = map_distinct(df['vehicle_type'], lambda values: values.str.strip().str.lower().where(
+            lambda types: types.isin(['4w', '2w']), 'Others'
+        ))
+
+        # Flags as the smallest int type
+        for column in INTEGER_FLAG_COLUMNS:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
 
     return df
 
+def load_prepared_core_data(start_date, end_date):
+    background.stage('fetch')
+    df = fetch_core_data(start_date, end_date)
+    background.stage('prepare')
+    return prepare_data(df)
+
+# Prepared core rows, one partition per IST booking day. Closed days are
+# never refetched; today's partition is refreshed after CORE_CACHE_TTL seconds.
+# Partitions are shared with the other workers as Arrow files in CORE_SHARED_DIR.
+CORE_CACHE_BYTES = 512 * 1024 * 1024
+CORE_CACHE_TTL = 300
+CORE_SHARED_DIR = os.path.join(arrow_store.ARROW_CACHE_DIR, 'core')
+core_cache = PartitionCache('core', load_prepared_core_data, 'booking_date', CORE_CACHE_BYTES,
+                            open_ttl=CORE_CACHE_TTL, shared_dir=CORE_SHARED_DIR)
+
 def create_pivot_table(df, index_cols, column_cols, value_col, aggfunc, filter_condition=None):
     if df.empty:
         return pd.DataFrame()
@@ -246,16 +268,32 @@ def create_pivot_table(df, index_cols, column_cols, value_col, aggfunc, filter_c
         columns=column_cols,
         values=value_col,
         aggfunc=aggfunc,
+        observed=True,
         margins=True,
         margins_name='Grand Total'
     ).fillna(0).astype(int)
     
-    percentage_df = pivot_table_df.div(pivot_table_df['Grand Total'], axis=0) * 100
-    percentage_df = percentage_df.round(2)
+    return format_pivot_table(pivot_table_df, index_cols)
+
+# Each status count column is followed by its share of the row, as a fraction
+SHARE_SUFFIX = ' %'
+
+SHARE_FORMAT = FormatTemplate.percentage(2).to_plotly_json()
+
+def share_column(column):
+    return f"{column}{SHARE_SUFFIX}"
+
+def format_pivot_table(pivot_table_df, index_cols):
+    """Counts with margins -> numeric display table: row labels, Total Leads, then count and share per column."""
+    if pivot_table_df.empty:
+        return pd.DataFrame()
+    pivot_table_df = pivot_table_df.copy()
+    pivot_table_df.columns = pivot_table_df.columns.astype(object)
     
-    for col in pivot_table_df.columns:
-        if col != 'Grand Total':
-            pivot_table_df[col] = pivot_table_df[col].astype(str) + ' (' + percentage_df[col].astype(str) + '%)'
+    totals = pivot_table_df['Grand Total'].to_numpy()
+    count_columns = [col for col in pivot_table_df.columns if col != 'Grand Total']
+    for col in count_columns:
+        pivot_table_df[share_column(col)] = (pivot_table_df[col].to_numpy() / totals).round(4)
     
     pivot_table_df = pivot_table_df.reset_index()
     
@@ -270,10 +308,13 @@ def create_pivot_table(df, index_cols, column_cols, value_col, aggfunc, filter_c
         if col in available_columns:
             ordered_columns.append(col)
     
-    for col in available_columns:
-        if col not in ordered_columns and col not in index_cols:
+    for col in count_columns:
+        if col not in ordered_columns:
             ordered_columns.append(col)
     
+    ordered_columns = [column for col in ordered_columns
+                       for column in ([col, share_column(col)] if col in count_columns else [col])]
+    
     pivot_table_df = pivot_table_df[ordered_columns]
     pivot_table_df = pivot_table_df.rename(columns={
         'master_service': 'Service',
@@ -287,9 +328,47 @@ def create_pivot_table(df, index_cols, column_cols, value_col, aggfunc, filter_c
     
     return pivot_table_df
 
-def create_pivot_table_component(df, index_cols, column_cols, value_col, aggfunc, title, filter_condition=None, table_id_suffix=""):
-    pivot_df = create_pivot_table(df, index_cols, column_cols, value_col, aggfunc, filter_condition)
-    
+def pivot_table_as_text(pivot_df):
+    """Numeric pivot -> the "N (p%)" text layout, one column per status."""
+    if pivot_df.empty:
+        return pivot_df
+    text_df = pivot_df.drop(columns=[col for col in pivot_df.columns if str(col).endswith(SHARE_SUFFIX)])
+    totals = pivot_df['Total Leads']
+    for col in text_df.columns:
+        if share_column(col) in pivot_df.columns:
+            # Columns missing from some of several stacked tables stay empty
+            counts = pivot_df[col]
+            percentage = (counts / totals * 100).round(2)
+            text = counts.astype('Int64').astype(str) + ' (' + percentage.astype(str) + '%)'
+            text_df[col] = text.where(counts.notna())
+    return text_df
+
+def pivot_table_as_numbers(pivot_df):
+    """Numeric pivot for CSV export, shares as percentages."""
+    numbers_df = pivot_df.copy()
+    for col in numbers_df.columns:
+        if str(col).endswith(SHARE_SUFFIX):
+            numbers_df[col] = (numbers_df[col] * 100).round(2)
+        elif pd.api.types.is_float_dtype(numbers_df[col]):
+            # Counts of stacked tables turn float where a column is missing
+            numbers_df[col] = numbers_df[col].astype('Int64')
+    return numbers_df
+
+def pivot_table_columns(pivot_df, index_cols):
+    """DataTable columns: counts as numbers, shares as percentages, grouped under a merged status header."""
+    columns = []
+    for position, col in enumerate(pivot_df.columns):
+        col = str(col)
+        if position < len(index_cols) or col == 'Total Leads':
+            columns.append({"name": ["", col], "id": col})
+        elif col.endswith(SHARE_SUFFIX):
+            columns.append({"name": [col[:-len(SHARE_SUFFIX)], "%"], "id": col, "type": "numeric",
+                            "format": SHARE_FORMAT})
+        else:
+            columns.append({"name": [col, "Count"], "id": col, "type": "numeric"})
+    return columns
+
+def create_pivot_table_component(pivot_df, index_cols, title, table_id_suffix=""):
     if pivot_df.empty:
         return dbc.Alert("No data available for this view.", color="warning")
     
@@ -297,8 +376,11 @@ def create_pivot_table_component(df, index_cols, column_cols, value_col, aggfunc
     if table_id_suffix:
         table_id += f"-{table_id_suffix}"
     
-    columns = [{"name": str(col), "id": str(col)} for col in pivot_df.columns]
+    columns = pivot_table_columns(pivot_df, index_cols)
     data = pivot_df.to_dict('records')
+    row_label_columns = list(pivot_df.columns[:len(index_cols)])
+    for record in data:
+        record['id'] = pivot_row_id(record, row_label_columns)
     
     style_data_conditional = [
         # Style for grand total rows
@@ -338,6 +420,7 @@ def create_pivot_table_component(df, index_cols, column_cols, value_col, aggfunc
             },
             columns=columns,
             data=data,
+            merge_duplicate_headers=True,
             fixed_rows={'headers': True},
             style_table={
                 'overflowX': 'auto',
@@ -375,9 +458,179 @@ def create_pivot_table_component(df, index_cols, column_cols, value_col, aggfunc
         )
     ])
 
-# Initialize with empty data
-empty_df = pd.DataFrame()
-empty_dict = empty_df.to_dict('records')
+# Dropdown filters and the column each one applies to
+FILTER_COLUMNS = [
+    ('cities', 'city'),
+    ('vehicle_types', 'vehicle_type'),
+    ('master_services', 'master_service'),
+    ('service_types', 'service_type'),
+    ('crm_admins', 'crm_admin_name'),
+    ('user_sources', 'user_source'),
+]
+
+def normalize_filters(**selections):
+    """Drop empty selections and sort values so equal filters compare equal."""
+    return {name: sorted(values) for name, values in selections.items() if values}
+
+def apply_filters(df, filters):
+    for name, column in FILTER_COLUMNS:
+        if filters.get(name):
+            df = df[df[column].isin(filters[name])]
+    return df
+
+# Columns a drill-down can restrict on, besides the dropdown filters
+DRILL_DOWN_COLUMNS = ['new_status', 'Activity_Status_Final', 'comments', 'cleaned_category', 'followup_eligible']
+
+def resolve_filter_index(handle):
+    """Row bitmaps of every dropdown and drill-down value, built once per dataset version."""
+    columns = [column for _, column in FILTER_COLUMNS] + DRILL_DOWN_COLUMNS
+    return datasets.derive(handle, ('filter-index',), lambda df: FilterIndex(df, columns))
+
+def resolve_selection(handle):
+    """Positions of the stored rows that pass the dropdown filters, or None for all rows."""
+    filters = handle.get('filters', {}) if isinstance(handle, dict) else {}
+    if not filters:
+        return None
+    index = resolve_filter_index(handle)
+    if index is None:
+        return None
+    name = ('selection',) + tuple((key, tuple(values)) for key, values in sorted(filters.items()))
+    columns = dict(FILTER_COLUMNS)
+    return datasets.derive(handle, name, lambda df: index.select({columns[key]: values for key, values in filters.items()}))
+
+def resolve_filtered_data(handle):
+    """Filtered rows behind a `filtered-data` handle, taken by position through the filter index."""
+    df = datasets.resolve(handle)
+    if df is None:
+        return None
+    rows = resolve_selection(handle)
+    return df if rows is None else df.take(rows)
+
+# Every core tab is a booking count over these columns, so one cube answers them all
+CUBE_DIMENSIONS = [column for _, column in FILTER_COLUMNS] + [
+    'new_status', 'Activity_Status_Final', 'comments', 'cleaned_category', 'followup_eligible',
+]
+
+def resolve_cube(handle, spill=False):
+    """Count cube of the stored rows, built once per dataset version."""
+    return datasets.derive(handle, ('cube',), lambda df: CountCube(df, CUBE_DIMENSIONS),
+                           spill=CountCube if spill else None)
+
+def cube_filters(handle):
+    filters = handle.get('filters', {}) if isinstance(handle, dict) else {}
+    return {column: filters[name] for name, column in FILTER_COLUMNS if filters.get(name)}
+
+def cube_pivot_table(handle, index_cols, column_cols, where=None):
+    """create_pivot_table for the filtered rows behind `handle`, answered from the cube."""
+    cube = resolve_cube(handle)
+    if cube is None:
+        return pd.DataFrame()
+    filters = cube_filters(handle)
+    filters.update(where or {})
+    return format_pivot_table(cube.pivot(index_cols, column_cols, filters), index_cols)
+
+# Pivot tables by (table index, suffix) of their DataTable id: rows, columns and restriction
+PIVOT_TABLES = {
+    ('master_service', ''): (['master_service'], ['new_status'], None),
+    ('crm_admin_name', ''): (['crm_admin_name'], ['new_status'], None),
+    ('user_source', ''): (['user_source'], ['new_status'], None),
+    ('Activity_Status_Final-comments', 'cancelled'): (
+        ['Activity_Status_Final', 'comments'], ['vehicle_type'], {'Activity_Status_Final': ['Cancelled Booking']}),
+    ('Activity_Status_Final-comments', 'other'): (
+        ['Activity_Status_Final', 'comments'], ['vehicle_type'], {'Activity_Status_Final': ['Other Booking']}),
+    ('cleaned_category', 'followup'): (['cleaned_category'], ['vehicle_type'], {'followup_eligible': [True]}),
+}
+
+def pivot_row_id(record, index_cols):
+    """DataTable row id of a pivot row: its row labels, so a clicked cell names its row."""
+    return json.dumps([str(record[column]) for column in index_cols])
+
+def drill_down_rows(handle, table_index, suffix, row_key, column_id):
+    """Stored rows behind one pivot cell, looked up through the filter index."""
+    table = PIVOT_TABLES.get((table_index, suffix or ''))
+    df = datasets.resolve(handle)
+    index = resolve_filter_index(handle)
+    if table is None or df is None or index is None:
+        return None
+    index_cols, column_cols, where = table
+
+    filters = {column: [str(value) for value in values] for column, values in (where or {}).items()}
+    filters.update({column: values for column, values in cube_filters(handle).items()})
+    if row_key and row_key[0] != 'Grand Total':
+        for column, value in zip(index_cols, row_key):
+            filters[column] = [value]
+    # Clicking a row label or 'Total Leads' shows the whole row
+    if column_id.endswith(SHARE_SUFFIX):
+        column_id = column_id[:-len(SHARE_SUFFIX)]
+    if column_id in index.bitmaps[column_cols[0]]:
+        filters[column_cols[0]] = [column_id]
+
+    rows = index.select(filters)
+    return df if rows is None else df.take(rows)
+
+# Tabs in the order of their containers, and the pivot tables each one shows
+TAB_CONTAINERS = ['tab-service', 'tab-person', 'tab-source', 'tab-non-conversion', 'tab-follow-up']
+TAB_TABLES = {
+    'tab-service': [('master_service', '')],
+    'tab-person': [('crm_admin_name', '')],
+    'tab-source': [('user_source', '')],
+    'tab-non-conversion': [('Activity_Status_Final-comments', 'cancelled'), ('Activity_Status_Final-comments', 'other')],
+    'tab-follow-up': [('cleaned_category', 'followup')],
+}
+TAB_EXPORT_FILENAMES = {
+    'tab-service': "service_conversion_data.csv",
+    'tab-person': "person_conversion_data.csv",
+    'tab-source': "source_conversion_data.csv",
+    'tab-non-conversion': "non_conversion_data.csv",
+    'tab-follow-up': "followup_data.csv",
+}
+
+# Pivots per (dataset version, filters, tab), shared by the tab view and its export
+PIVOT_MEMO_BYTES = 64 * 1024 * 1024
+pivot_memo = cache.namespace('pivots', PIVOT_MEMO_BYTES)
+
+def tab_pivots(handle, tab):
+    """Numeric pivot tables of one tab, memoized per dataset version, filters and tab."""
+    filters = handle.get('filters', {}) if isinstance(handle, dict) else {}
+    memo_key = (handle['key'], handle['version'],
+                tuple((name, tuple(values)) for name, values in sorted(filters.items())), tab)
+    tables = pivot_memo.get(memo_key)
+    if tables is None:
+        tables = [cube_pivot_table(handle, *PIVOT_TABLES[table]) for table in TAB_TABLES[tab]]
+        pivot_memo.put(memo_key, tables)
+    return tables
+
+def render_tab(handle, tab):
+    tables = tab_pivots(handle, tab)
+    if tab == 'tab-service':
+        return create_pivot_table_component(tables[0], ['master_service'], "Service-Based Conversion")
+    if tab == 'tab-person':
+        return create_pivot_table_component(tables[0], ['crm_admin_name'], "Person-Based Conversion")
+    if tab == 'tab-source':
+        return create_pivot_table_component(tables[0], ['user_source'], "Source-Based Conversion")
+    if tab == 'tab-non-conversion':
+        return html.Div([
+            html.H4("Non Conversion - Cancelled", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
+            create_pivot_table_component(tables[0], ['Activity_Status_Final', 'comments'], "", "cancelled"),
+            html.H4("Non Conversion - Other Booking", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
+            create_pivot_table_component(tables[1], ['Activity_Status_Final', 'comments'], "", "other")
+        ])
+    return html.Div([
+        html.H4("Follow-up Bookings"),
+        create_pivot_table_component(tables[0], ['cleaned_category'], "", "followup")
+    ])
+
+# Stores hold dataset handles (see services.datasets), never the rows themselves
+empty_handle = None
+
+LOAD_ERROR_MESSAGE = "Could not load bookings from the database. The error has been logged; please try again."
+
+def error_handle(message):
+    """Store value telling the views a load failed; it resolves to no dataset."""
+    return {'error': message}
+
+def handle_error(handle):
+    return handle.get('error') if isinstance(handle, dict) else None
 
 layout = dbc.Container([
         
@@ -436,6 +689,14 @@ layout = dbc.Container([
             
             # Right-aligned buttons
             html.Div([
+                dcc.Dropdown(
+                    id='export-format-dropdown',
+                    options=EXPORT_FORMAT_OPTIONS,
+                    value='numbers',
+                    clearable=False,
+                    searchable=False,
+                    style={'width': '130px', 'marginRight': '4px'}
+                ),
                 html.Button("Export", id='export-data-btn', n_clicks=0, style={
                     'height': '32px',
                     'fontWeight': 'bold',
@@ -451,7 +712,7 @@ layout = dbc.Container([
                     'cursor': 'pointer',
                     'color': '#d9534f',
                 })
-            ], style={'display': 'flex'})
+            ], style={'display': 'flex', 'alignItems': 'center'})
         ], style={
             'display': 'flex',
             'alignItems': 'center',
@@ -541,8 +802,8 @@ layout = dbc.Container([
                             type="default",
                             color="#007bff",
                             children=[
-                                dcc.Store(id='stored-data', data=empty_dict),
-                                dcc.Store(id='filtered-data', data=empty_dict),
+                                dcc.Store(id='stored-data', data=empty_handle),
+                                dcc.Store(id='filtered-data', data=empty_handle),
                                 dcc.Download(id="download-active-tab-data"),
                             ]
                         ),
@@ -553,6 +814,9 @@ layout = dbc.Container([
                             # "marginTop": "30px"
                         }
                     ),
+        # Fetch -> prepare -> aggregate progress of update_stored_data
+        dbc.Progress(id='core-load-progress', value=0, striped=True, animated=True,
+                     style=background.PROGRESS_HIDDEN),
         dcc.Tabs(
             id="tabs",
             value="tab-service",  # Add default value
@@ -752,13 +1016,10 @@ layout = dbc.Container([
      Output('booking-details-table', 'columns'),
      Output('booking-details-table', 'style_data_conditional')],
     [Input({'type': 'pivot-table', 'index': ALL, 'suffix': ALL}, 'active_cell')],
-    [State('filtered-data', 'data'),
-     State({'type': 'pivot-table', 'index': ALL, 'suffix': ALL}, 'data'),
-     State({'type': 'pivot-table', 'index': ALL, 'suffix': ALL}, 'columns'),
-     State({'type': 'pivot-table', 'index': ALL, 'suffix': ALL}, 'id')],
+    [State('filtered-data', 'data')],
     prevent_initial_call=True
 )
-def toggle_booking_details(active_cells, filtered_data, tables_data, tables_columns, table_ids):
+def toggle_booking_details(active_cells, filtered_data):
     ctx = dash.callback_context
     if not ctx.triggered:
         return [False, [], [], []]
@@ -766,133 +1027,23 @@ def toggle_booking_details(active_cells, filtered_data, tables_data, tables_colu
     default_return = [False, [], [], []]
 
     try:
-        triggered_prop_id = ctx.triggered[0]['prop_id'].split('.')[0]
-        triggered_id = json.loads(triggered_prop_id)
-
-        if not filtered_data or not any(active_cells):
-            return default_return
-
-        # Match clicked table index
-        clicked_table_idx = None
-        for i, table_id in enumerate(table_ids):
-            if table_id['type'] == triggered_id.get('type') and \
-               table_id.get('index') == triggered_id.get('index') and \
-               table_id.get('suffix') == triggered_id.get('suffix'):
-                clicked_table_idx = i
-                break
-
-        if clicked_table_idx is None:
+        # Only the clicked cell (table id, row id, column id) is needed; the rows are looked up here
+        triggered_id = ctx.triggered_id
+        if not isinstance(triggered_id, dict) or not filtered_data:
             return default_return
 
-        clicked_cell = active_cells[clicked_table_idx]
-        if not clicked_cell or clicked_cell.get('row') is None or clicked_cell.get('column_id') is None:
+        clicked_cell = next((item.get('value') for item in ctx.inputs_list[0] if item['id'] == triggered_id), None)
+        if not clicked_cell or clicked_cell.get('row_id') is None or clicked_cell.get('column_id') is None:
             return default_return
 
-        row_idx = clicked_cell['row']
-        column_id = clicked_cell['column_id']
-        clicked_table_data = tables_data[clicked_table_idx]
-        clicked_table_columns = tables_columns[clicked_table_idx]
-
-        if row_idx >= len(clicked_table_data):
+        df = drill_down_rows(filtered_data, triggered_id.get('index'), triggered_id.get('suffix'),
+                             json.loads(clicked_cell['row_id']), clicked_cell['column_id'])
+        if df is None:
             return default_return
 
-        row_data = clicked_table_data[row_idx]
-        
-
-        df = pd.DataFrame.from_records(filtered_data)
         if df.empty:
-            return default_return
-
-        first_col_id = clicked_table_columns[0]['id']
-        is_grand_total = str(row_data.get(first_col_id)).strip().lower() == 'grand total'
-
-        filter_conditions = []
-
-        if triggered_id.get("suffix") == "followup":
-            df['category'] = df['category'].replace(0, 'Follow up')
-            df['cleaned_category'] = df['category'].astype(str)
-            df.loc[df['cleaned_category'].str.startswith('JD -'), 'cleaned_category'] = 'JD Category'
-            df['cleaned_category'] = df['cleaned_category'].str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
-            df = df[df['booking_status_code'].isin([3, 4, 5, 6]) & (df['flag'] == 0)].copy()
-
-            # Always apply column_id filtering if it's not 'Total Leads'
-            if column_id and column_id != 'Total Leads':
-                if column_id in df['vehicle_type'].unique():
-                    filter_conditions.append(df['vehicle_type'] == column_id)
-                elif column_id in df.columns:
-                    if pd.api.types.is_numeric_dtype(df[column_id]):
-                        filter_conditions.append(df[column_id] > 0)
-                    else:
-                        filter_conditions.append(df[column_id] == row_data.get(column_id))
-                elif 'week_label' in df.columns:
-                    filter_conditions.append(df['week_label'] == column_id)
-
-            # Only apply row-level category filter if not Grand Total
-            if not is_grand_total:
-                category_val = row_data.get('cleaned_category') or row_data.get('Category')
-                if category_val:
-                    filter_conditions.append(df['cleaned_category'] == category_val)
-
-
-        else:
-            if not is_grand_total:
-                for col in clicked_table_columns:
-                    col_id = col['id']
-                    val = row_data.get(col_id)
-                    if col_id == 'Service':
-                        filter_conditions.append(df['master_service'] == val)
-                    elif col_id == 'Name':
-                        filter_conditions.append(df['crm_admin_name'] == val)
-                    elif col_id == 'Source':
-                        filter_conditions.append(df['user_source'] == val)
-                    elif col_id == 'Activity status':
-                        filter_conditions.append(df['Activity_Status_Final'] == val)
-                    elif col_id == 'Type':
-                        filter_conditions.append(df['vehicle_type'] == val)
-                    elif col_id == 'Category':
-                        filter_conditions.append(df['cleaned_category'] == val)
-                    elif col_id == 'comments':
-                        filter_conditions.append(df['comments'] == val)
-
-            if triggered_id.get('suffix') in ['cancelled', 'other']:
-                condition_map = {
-                    'cancelled': 'Cancelled Booking',
-                    'other': 'Other Booking'
-                }
-                filter_conditions.append(df['Activity_Status_Final'] == condition_map[triggered_id.get('suffix')])
-
-            if column_id != 'Total Leads':
-                status_mapping = {
-                    'Goaxled': 'Goaxled',
-                    'Follow-up': 'Follow-up',
-                    'Cancelled': 'Cancelled',
-                    'Others': 'Others',
-                    'Idle': 'Idle',
-                    'Duplicate': 'Duplicate'
-                }
-                if column_id in status_mapping:
-                    filter_conditions.append(df['new_status'] == status_mapping[column_id])
-
-        # Parse cell value like '10 (100%)'
-        cell_value = row_data.get(column_id, '0')
-        try:
-            cell_value = int(re.search(r'\d+', str(cell_value)).group())
-        except:
-            cell_value = 0
-
-        if cell_value == 0:
             return [True, [{"message": "No Data Found"}], [{"name": "Message", "id": "message"}], []]
 
-        for condition in filter_conditions:
-            df = df[condition]
-
-        if df.empty:
-            return [True, [{"message": "No Matching Records Found"}], [{"name": "Message", "id": "message"}], []]
-
-        df.insert(0, 'S.No', range(1, len(df) + 1))
-        if 'raw_log_timestamp' in df.columns:
-            df['raw_log_timestamp'] = df['raw_log_timestamp'].astype(str).str.replace('T', ' ', regex=False)
-
         base_columns = [
             {"name": "S.No", "id": "S.No"},
             {"name": "Booking ID", "id": "booking_id"},
@@ -943,7 +1094,11 @@ def toggle_booking_details(active_cells, filtered_data, tables_data, tables_colu
 
         modal_columns = base_columns + tab_specific_columns
         display_columns = [col['id'] for col in modal_columns if col['id'] in df.columns]
-        modal_data = df[display_columns].to_dict('records')
+        df = df[display_columns]
+        df.insert(0, 'S.No', range(1, len(df) + 1))
+        if 'raw_log_timestamp' in df.columns:
+            df['raw_log_timestamp'] = df['raw_log_timestamp'].astype(str).str.replace('T', ' ', regex=False)
+        modal_data = df.to_dict('records')
 
         style_data_conditional = [
             {'if': {'row_index': 'odd'}, 'backgroundColor': 'rgb(248, 248, 248)'},
@@ -952,8 +1107,10 @@ def toggle_booking_details(active_cells, filtered_data, tables_data, tables_colu
 
         return [True, modal_data, modal_columns, style_data_conditional]
 
-    except Exception as e:
-        return default_return
+    except Exception:
+        logger.exception("Booking drill-down failed")
+        return [True, [{"message": "Could not load the bookings for this cell. The error has been logged."}],
+                [{"name": "Message", "id": "message"}], []]
 
 
 @callback(
@@ -964,10 +1121,16 @@ def toggle_booking_details(active_cells, filtered_data, tables_data, tables_colu
      Input('clear-filters-btn', 'n_clicks')],
     [State('log-date-picker', 'start_date'),
      State('log-date-picker', 'end_date'),
-     State('sort-order-dropdown', 'value')],
+     State('sort-order-dropdown', 'value'),
+     State('login-status', 'data')],
+    # Loads run in a job process; the browser polls for progress meanwhile
+    background=True,
+    manager=background.manager,
+    progress=[Output('core-load-progress', 'value'), Output('core-load-progress', 'label')],
+    running=[(Output('core-load-progress', 'style'), background.PROGRESS_SHOWN, background.PROGRESS_HIDDEN)],
     prevent_initial_call=True
 )
-def update_stored_data(apply_clicks, clear_clicks, start_date, end_date, period_value):
+def update_stored_data(set_progress, apply_clicks, clear_clicks, start_date, end_date, period_value, login_data=None):
     try:
         ctx = dash.callback_context
         if not ctx.triggered:
@@ -976,7 +1139,7 @@ def update_stored_data(apply_clicks, clear_clicks, start_date, end_date, period_
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         if trigger_id == 'clear-filters-btn':
-            return empty_dict, None, None
+            return empty_handle, None, None
 
         if trigger_id == 'date-apply-btn':
             # Calculate 6 months ago date
@@ -994,7 +1157,7 @@ def update_stored_data(apply_clicks, clear_clicks, start_date, end_date, period_
                     end_date_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
                     
                     if start_date_dt < six_months_ago or end_date_dt < six_months_ago:
-                        return empty_dict, None, None
+                        return empty_handle, None, None
                     
                     # Ensure end date is not before start date
                     if end_date_dt < start_date_dt:
@@ -1005,22 +1168,37 @@ def update_stored_data(apply_clicks, clear_clicks, start_date, end_date, period_
                     start_date = datetime.today().date().strftime('%Y-%m-%d')
                     end_date = start_date
 
-            # Fetch data with the enforced date range
-            df = fetch_core_data(start_date, end_date)
-            df = prepare_data(df)
-
-            if df is None or df.empty or 'vehicle_type' not in df.columns:
-                return empty_dict, start_date, end_date
-
-            df_filtered = df[df['vehicle_type'] != 'pv']
-            return df_filtered.to_dict('records'), start_date, end_date
+            # Fetch data with the enforced date range; a newer click of this
+            # session cancels the query and discards this result
+            session_id = cancellation.session_id(login_data)
+            generation = cancellation.queries.begin(session_id, 'core')
+            with background.heavy_load(set_progress), cancellation.owned_by(session_id, 'core'):
+                try:
+                    df = core_cache.get_range(start_date, end_date)
+                except Exception:
+                    if not cancellation.queries.is_current(session_id, 'core', generation):
+                        # Cancelled by a newer click, which shows its own result
+                        return dash.no_update, dash.no_update, dash.no_update
+                    return error_handle(LOAD_ERROR_MESSAGE), start_date, end_date
+                if not cancellation.queries.is_current(session_id, 'core', generation):
+                    return dash.no_update, dash.no_update, dash.no_update
+
+                if df is None or df.empty or 'vehicle_type' not in df.columns:
+                    return empty_handle, start_date, end_date
+
+                background.stage('aggregate')
+                df_filtered = df[df['vehicle_type'] != 'pv']
+                handle = datasets.register(df_filtered, key=f"core:{start_date}:{end_date}", spill=True)
+                # Built and spilled here so the job, not the next callback, pays for it
+                resolve_cube(handle, spill=True)
+            return handle, start_date, end_date
 
         raise dash.exceptions.PreventUpdate
-    except Exception as e:
-        import traceback
-        print("Error in update_stored_data:", e)
-        traceback.print_exc()
-        return empty_dict, None, None
+    except dash.exceptions.PreventUpdate:
+        raise
+    except Exception:
+        logger.exception("Loading core data failed")
+        return error_handle(LOAD_ERROR_MESSAGE), None, None
 
 
 @callback(
@@ -1033,14 +1211,12 @@ def update_stored_data(apply_clicks, clear_clicks, start_date, end_date, period_
     [Input('stored-data', 'data')]
 )
 def update_filter_options(stored_data):
-    if not stored_data:
+    cube = resolve_cube(stored_data)
+    if cube is None or len(cube) == 0:
         return [], [], [], [], [], []
     
-    df = pd.DataFrame.from_records(stored_data)
-    
     def get_options(column):
-        unique_values = df[column].astype(str).unique()
-        return [{'label': val, 'value': val} for val in sorted(unique_values)]
+        return [{'label': val, 'value': val} for val in cube.values(column)]
     
     return (
         get_options('city'),
@@ -1062,25 +1238,17 @@ def update_filter_options(stored_data):
      Input('user-source-filter', 'value')]
 )
 def filter_data(stored_data, cities, vehicle_types, master_services, service_types, crm_admins, user_sources):
-    if not stored_data:
-        return empty_dict
+    if handle_error(stored_data):
+        return stored_data
+    if datasets.resolve(stored_data) is None:
+        return empty_handle
     
-    df = pd.DataFrame.from_records(stored_data)
-    
-    if cities and len(cities) > 0:
-        df = df[df['city'].isin(cities)]
-    if vehicle_types and len(vehicle_types) > 0:
-        df = df[df['vehicle_type'].isin(vehicle_types)]
-    if master_services and len(master_services) > 0:
-        df = df[df['master_service'].isin(master_services)]
-    if service_types and len(service_types) > 0:
-        df = df[df['service_type'].isin(service_types)]
-    if crm_admins and len(crm_admins) > 0:
-        df = df[df['crm_admin_name'].isin(crm_admins)]
-    if user_sources and len(user_sources) > 0:
-        df = df[df['user_source'].isin(user_sources)]
-    
-    return df.to_dict('records')
+    filters = normalize_filters(
+        cities=cities, vehicle_types=vehicle_types, master_services=master_services,
+        service_types=service_types, crm_admins=crm_admins, user_sources=user_sources
+    )
+    # Pivots are sliced from the count cube; the rows are only filtered for a drill-down
+    return {'key': stored_data['key'], 'version': stored_data['version'], 'filters': filters}
 
 @callback(
     [Output('service-pivot-container', 'children'),
@@ -1088,12 +1256,19 @@ def filter_data(stored_data, cities, vehicle_types, master_services, service_typ
      Output('source-pivot-container', 'children'),
      Output('non-conversion-container', 'children'),
      Output('category-container', 'children')],  # Add this output
-    [Input('filtered-data', 'data')],
+    [Input('filtered-data', 'data'),
+     Input('tabs', 'value')],
     [State('log-date-picker', 'start_date'),
      State('log-date-picker', 'end_date')]
 )
-def update_pivot_tables(filtered_data, start_date, end_date):
-    if not filtered_data:
+def update_pivot_tables(filtered_data, active_tab, start_date, end_date):
+    error = handle_error(filtered_data)
+    if error:
+        error_alert = dbc.Alert(error, color="danger", dismissable=False)
+        return error_alert, error_alert, error_alert, error_alert, error_alert
+
+    cube = resolve_cube(filtered_data)
+    if cube is None or cube.total(cube_filters(filtered_data)) == 0:
         message = "No data available"
         if start_date and end_date:
             message += f" from {start_date} to {end_date}."
@@ -1103,67 +1278,13 @@ def update_pivot_tables(filtered_data, start_date, end_date):
         empty_alert = dbc.Alert(message, color="warning", dismissable=False)
         return empty_alert, empty_alert, empty_alert, empty_alert, empty_alert  # Add extra empty_alert
 
-    df = pd.DataFrame.from_records(filtered_data)
-
-    service_pivot = create_pivot_table_component(
-        df, ['master_service'], ['new_status'], 'booking_id', 'count',
-        "Service-Based Conversion", "vehicle_type != 'pv'"
-    )
-
-    person_pivot = create_pivot_table_component(
-        df, ['crm_admin_name'], ['new_status'], 'booking_id', 'count',
-        "Person-Based Conversion", "vehicle_type != 'pv'"
-    )
-
-    source_pivot = create_pivot_table_component(
-        df, ['user_source'], ['new_status'], 'booking_id', 'count',
-        "Source-Based Conversion", "vehicle_type != 'pv'"
-    )
-
-    non_conversion = html.Div([
-        html.H4("Non Conversion - Cancelled", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
-        create_pivot_table_component(
-            df, ['Activity_Status_Final', 'comments'], ['vehicle_type'], 'booking_id', 'count',
-            "", "vehicle_type != 'pv' & Activity_Status_Final == 'Cancelled Booking'", "cancelled"
-        ),
-        html.H4("Non Conversion - Other Booking", style={'fontWeight': 'bold', 'marginBottom': '10px'}),
-        create_pivot_table_component(
-            df, ['Activity_Status_Final', 'comments'], ['vehicle_type'], 'booking_id', 'count',
-            "", "vehicle_type != 'pv' & Activity_Status_Final == 'Other Booking'", "other"
-        )
-    ])
-
-    # Step 1: Replace category = 0 with "Unknown Category"
-    df['category'] = df['category'].replace(0, 'Follow up')
-
-    # Step 2: Clean the category column
-    df['cleaned_category'] = df['category'].astype(str)
-
-    # Step 3: Mark JD Categories
-    df.loc[df['cleaned_category'].str.startswith('JD -'), 'cleaned_category'] = 'JD Category'
-
-    # Step 4: Remove numeric booking ID prefixes like "3690262 -", but skip "JD Category"
-    df['cleaned_category'] = df['cleaned_category'].str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
-
-    # Filter for follow-up rows
-    followup_df = df[(df['booking_status_code'].isin([3, 4, 5, 6])) & (df['flag'] == 0)]
-
-
-    category_pivot = html.Div([
-        html.H4("Follow-up Bookings"),
-        create_pivot_table_component(
-            followup_df, 
-            ['cleaned_category'],  # Group by person - change this as needed
-            ['vehicle_type'], 
-            'booking_id', 
-            'count',
-            "",
-            "vehicle_type != 'pv'",
-            "followup"
-        )
-    ])    
-    
-    return service_pivot, person_pivot, source_pivot, non_conversion, category_pivot  # Add category_pivot to return
+    # Only the visible tab is built. Hidden tabs are emptied when the data or filters
+    # change and built when they are selected; switching tabs leaves them as they are.
+    tab_switched = dash.callback_context.triggered_id == 'tabs'
+    outputs = [no_update if tab_switched else None] * len(TAB_CONTAINERS)
+    if active_tab in TAB_CONTAINERS:
+        outputs[TAB_CONTAINERS.index(active_tab)] = render_tab(filtered_data, active_tab)
+    return outputs
 
 @callback(
     [Output('city-filter', 'value'),
@@ -1207,40 +1328,29 @@ def download_booking_details_csv(n_clicks, table_data, table_columns):
     Input("export-data-btn", "n_clicks"),
     State('filtered-data', 'data'),
     State('tabs', 'value'),
+    State('export-format-dropdown', 'value'),
     prevent_initial_call=True
 )
-def export_active_tab_data(n_clicks, filtered_data, active_tab):
+def export_active_tab_data(n_clicks, filtered_data, active_tab, export_format='numbers'):
     if not n_clicks or not filtered_data or not active_tab:
         return no_update
     
     try:
-        df = pd.DataFrame.from_records(filtered_data)
+        cube = resolve_cube(filtered_data)
+        if cube is None or cube.total(cube_filters(filtered_data)) == 0:
+            return no_update
         
-        # Determine which columns to include based on active tab
-        if active_tab == "tab-service":
-            pivot_df = create_pivot_table(df, ['master_service'], ['new_status'], 'booking_id', 'count')
-            filename = "service_conversion_data.csv"
-        elif active_tab == "tab-person":
-            pivot_df = create_pivot_table(df, ['crm_admin_name'], ['new_status'], 'booking_id', 'count')
-            filename = "person_conversion_data.csv"
-        elif active_tab == "tab-source":
-            pivot_df = create_pivot_table(df, ['user_source'], ['new_status'], 'booking_id', 'count')
-            filename = "source_conversion_data.csv"
-        elif active_tab == "tab-non-conversion":
-            cancelled_df = df[df['Activity_Status_Final'] == 'Cancelled Booking']
-            other_df = df[df['Activity_Status_Final'] == 'Other Booking']
-            cancelled_pivot = create_pivot_table(cancelled_df, ['Activity_Status_Final', 'comments'], ['vehicle_type'], 'booking_id', 'count')
-            other_pivot = create_pivot_table(other_df, ['Activity_Status_Final', 'comments'], ['vehicle_type'], 'booking_id', 'count')
-            pivot_df = pd.concat([cancelled_pivot, other_pivot])
-            filename = "non_conversion_data.csv"
-        elif active_tab == "tab-follow-up":
-            df['category_clean'] = df['category'].astype(str).str.replace(r'^\d+\s*-\s*', '', regex=True).str.strip()
-            followup_df = df[df['booking_status_code'].isin([3, 4, 5, 6]) & (df['flag'] == 0)]
-            pivot_df = create_pivot_table(followup_df, ['category_clean'], ['vehicle_type'], 'booking_id', 'count')
-            filename = "followup_data.csv"
-        else:
+        if active_tab not in TAB_EXPORT_FILENAMES:
             return no_update
+        # Same memoized pivots the tab rendered
+        pivot_df = pd.concat(tab_pivots(filtered_data, active_tab))
+        filename = TAB_EXPORT_FILENAMES[active_tab]
         
+        if export_format == 'formatted':
+            pivot_df = pivot_table_as_text(pivot_df)
+        else:
+            pivot_df = pivot_table_as_numbers(pivot_df)
+
         # Convert to CSV
         csv_string = pivot_df.to_csv(index=False, encoding='utf-8')
         return dict(content=csv_string, filename=filename)
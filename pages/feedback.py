@@ -6,45 +6,19 @@ import dash_bootstrap_components as dbc
 import pandas as pd
 from dash.exceptions import PreventUpdate
 from datetime import datetime as dt, timedelta
-import mysql.connector
-import configparser
+import logging
 import os
-import sqlalchemy
 import warnings
+from services import arrow_store, background, cancellation, queries, query_log
+from services.datasets import datasets
+from services.partition_cache import PartitionCache
 warnings.filterwarnings("ignore")
 
 dash.register_page(__name__, path="/feedback")
 
-# Read database configuration from config.ini
-config = configparser.ConfigParser()
-config.read(os.path.join(os.path.dirname(__file__), "config.ini"))
+logger = logging.getLogger(__name__)
 
-def get_db():
-    try:
-        creds = config['mysql_dev']
-        return mysql.connector.connect(
-            host=creds.get('host'),
-            user=creds.get('user'),
-            passwd=creds.get('password'),
-            database=creds.get('database'),
-            port=int(creds.get('port')),
-            use_pure=True
-        )
-    except mysql.connector.Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
-
-def get_db_engine():
-    creds = config['mysql_dev']
-    user = creds.get('user')
-    password = creds.get('password')
-    host = creds.get('host')
-    port = creds.get('port')
-    database = creds.get('database')
-    engine_str = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-    return sqlalchemy.create_engine(engine_str)
-
-# Calculate default date range (last 6 months)
+# Calculate the selectable date range (last 6 months)
 end_date = dt.today().date()
 start_date = end_date - timedelta(days=180)
 
@@ -52,71 +26,19 @@ start_date = end_date - timedelta(days=180)
 def load_feedback_data(start_date=None, end_date=None):
     if start_date is None or end_date is None:
        return pd.DataFrame()  # Return empty DataFrame if no dates provided
-    query = """
-    WITH LatestBookings AS (
-        SELECT DISTINCT
-            b.gb_booking_id AS gb_booking_id,
-            b.b2b_cust_phone AS customer_number,
-            b.b2b_vehicle_type AS b2b_vehicle_type,
-            b.b2b_swap_flag AS b2b_swap_flag,
-            b.b2b_service_type AS b2b_service_type,
-            b.tvs_job_card_no AS tvs_job_card_no,
-            b.b2b_log as goaxle_date,
-            b.brand as make,
-            b.model,
-            g.booking_id AS g_booking_id,
-            g.mec_id AS mec_id,
-            g.status AS g_status,
-            g.flag AS g_flag,
-            g.booking_status AS g_booking_status,
-            g.source AS g_source,
-            g.log AS booking_date,
-            g.axle_flag AS g_axle_flag,
-            g.city AS g_city,
-            g.locality AS locality,
-            g.flag_unwntd AS flag_unwntd,
-            g.flag_duplicate AS flag_duplicate,
-            g.service_status AS g_service_status,
-            f.b2b_booking_id AS f_b2b_booking_id,
-            f.crm_goaxle_id AS crm_goaxle_id,
-            f.log AS f_log,
-            s.b2b_acpt_flag AS b2b_acpt_flag,
-            cm.crm_log_id AS crm_log_id,
-            cm.name AS cm_name,
-            cm.flag AS cm_flag,
-            cm.crm_flag AS crm_flag,
-            cm.cre_flag AS cre_flag,
-            c.b2b_log AS b2b_log,
-            ms.master_service AS ms_master_service
-        FROM
-            b2b.b2b_booking_tbl AS b
-                LEFT JOIN go_bumpr.user_booking_tb AS g ON b.gb_booking_id = g.booking_id
-                LEFT JOIN go_bumpr.go_axle_service_price_tbl AS ms ON ms.service_type = g.service_type AND g.vehicle_type = ms.type
-                LEFT JOIN go_bumpr.feedback_track AS f ON f.b2b_booking_id = b.b2b_booking_id
-                JOIN b2b.b2b_status s ON s.b2b_booking_id = b.b2b_booking_id
-                LEFT JOIN go_bumpr.crm_admin cm ON cm.crm_log_id = f.crm_goaxle_id
-                LEFT JOIN b2b.b2b_mec_tbl AS m ON m.b2b_shop_id = b.b2b_shop_id
-                LEFT JOIN b2b.b2b_checkin_report AS c ON b.b2b_booking_id = c.b2b_booking_id
-        WHERE 
-            DATE(c.b2b_log) BETWEEN %s AND %s            
-            AND
-            (
-                (b.b2b_check_in_report = 1  OR  g.service_status IN ('Completed', 'inprogress'))
-            )
-    )
-    SELECT * FROM LatestBookings
-    """
-    engine = get_db_engine()
+    # Failures propagate so the page can tell them from an empty range;
+    # read_sql has already put a failed statement in the query log
     try:
-        df = pd.read_sql(query, engine, params=(start_date, end_date))
-        df.fillna({'datetime_column': pd.NaT}, inplace=True)
-        df.infer_objects(copy=False)
-        return df
-    except Exception as e:
-        print(f"Error executing query: {e}")
-        return pd.DataFrame()
-    finally:
-        engine.dispose()
+        with cancellation.queries.query('mysql_dev') as conn:
+            df = query_log.read_sql('feedback', queries.FEEDBACK_QUERY, conn,
+                                    params={'start_date': start_date, 'end_date': end_date})
+    except Exception:
+        logger.exception("Feedback query for %s to %s failed", start_date, end_date)
+        raise
+    df.infer_objects(copy=False)
+    return df
+
+LOAD_ERROR_MESSAGE = "Could not load check-ins from the database. The error has been logged; please try again."
 
 # Column name mapping for display purposes
 COLUMN_NAMES_MAPPING = {
@@ -139,12 +61,37 @@ COLUMN_NAMES_MAPPING = {
     'customer_number': 'Customer Number'
 }
 
-# Load and prepare data
-df = load_feedback_data(start_date, end_date)
-df = df.copy()  # Add this line
-df['b2b_log'] = pd.to_datetime(df['b2b_log']).dt.date
-df['service_category'] = df['ms_master_service'].str.extract(r'^(.*?)(?:\s\d+|$)')[0].fillna('Other')
-df['source'] = df['g_source'].str.replace('_', ' ').str.title()
+# Non-text columns of the feedback query
+FEEDBACK_EMPTY_DTYPES = {'gb_booking_id': 'int64', 'goaxle_date': 'datetime64[ns]', 'booking_date': 'datetime64[ns]'}
+
+def prepare_feedback_data(df):
+    if df is not None and not df.columns.empty:
+        df = df.copy()
+        if df.empty:
+            # No rows to infer from: the dtypes fetched rows get
+            df = df.astype({column: dtype for column, dtype in FEEDBACK_EMPTY_DTYPES.items() if column in df.columns})
+        df['b2b_log'] = pd.to_datetime(df['b2b_log']).dt.date
+        df['service_category'] = df['ms_master_service'].str.extract(r'^(.*?)(?:\s\d+|$)')[0].fillna('Other')
+        df['source'] = df['g_source'].str.replace('_', ' ').str.title()
+    return df
+
+def load_prepared_feedback_data(start_date, end_date):
+    background.stage('fetch')
+    df = load_feedback_data(start_date, end_date)
+    background.stage('prepare')
+    return prepare_feedback_data(df)
+
+# Feedback rows are loaded on demand, one partition per checkin day. Check-ins
+# of the last FEEDBACK_OPEN_DAYS days can still change and are refreshed.
+# Partitions are shared with the other workers as Arrow files in FEEDBACK_SHARED_DIR.
+FEEDBACK_CACHE_BYTES = 512 * 1024 * 1024
+FEEDBACK_CACHE_TTL = 300
+FEEDBACK_OPEN_DAYS = 3
+FEEDBACK_SHARED_DIR = os.path.join(arrow_store.ARROW_CACHE_DIR, 'feedback')
+feedback_store = PartitionCache(
+    'feedback', load_prepared_feedback_data, 'b2b_log', FEEDBACK_CACHE_BYTES,
+    open_ttl=FEEDBACK_CACHE_TTL, open_days=FEEDBACK_OPEN_DAYS, shared_dir=FEEDBACK_SHARED_DIR
+)
 
 def create_grouped_table(df, group_col):
     return df.groupby(group_col).agg(
@@ -159,7 +106,7 @@ def create_checklist_options(values, label_prefix):
 # Initialize with empty options - will be populated after date selection
 source_options = []
 service_options = []
-name_options = [] if 'cm_name' in df.columns else []
+name_options = []
 
 layout = dbc.Container([
     html.Div([
@@ -375,6 +322,10 @@ layout = dbc.Container([
             "display": "none"
         }
     ),
+
+    # Fetch -> prepare -> aggregate progress of update_filter_options
+    dbc.Progress(id='feedback-load-progress', value=0, striped=True, animated=True,
+                 style=background.PROGRESS_HIDDEN),
     
     # Main Content Area
     html.Div(
@@ -590,7 +541,7 @@ layout = dbc.Container([
     ),
     
     # Data Stores
-    dcc.Store(id='filtered-data', data=df.to_dict('records')),
+    dcc.Store(id='filtered-data', data=None),
     dcc.Store(id='filters-applied', data=False),
     dcc.Store(id='date-filter-applied', data=False)
 ], fluid=True, style={
@@ -698,11 +649,17 @@ def update_labels_and_checklists(source_values, service_values, name_values, cle
     [
         State('date-range', 'start_date'),
         State('date-range', 'end_date'),
-        State('filtered-data', 'data')
+        State('filtered-data', 'data'),
+        State('login-status', 'data')
     ],
+    # Loads run in a job process; the browser polls for progress meanwhile
+    background=True,
+    manager=background.manager,
+    progress=[Output('feedback-load-progress', 'value'), Output('feedback-load-progress', 'label')],
+    running=[(Output('feedback-load-progress', 'style'), background.PROGRESS_SHOWN, background.PROGRESS_HIDDEN)],
     prevent_initial_call=True
 )
-def update_filter_options(date_go_clicks, clear_clicks, start_date, end_date, current_data):
+def update_filter_options(set_progress, date_go_clicks, clear_clicks, start_date, end_date, current_data, login_data=None):
     ctx = dash.callback_context
     if not ctx.triggered:
         raise PreventUpdate
@@ -711,7 +668,7 @@ def update_filter_options(date_go_clicks, clear_clicks, start_date, end_date, cu
 
     if trigger_id == 'clear-filters-btn':
         return (
-    [], [], [], [], [], [], [], False, None, None, None, "", {"display": "none"}, {"display": "none"}
+    [], [], [], [], [], [], None, False, None, None, None, "", {"display": "none"}, {"display": "none"}
 )
 
 
@@ -719,16 +676,37 @@ def update_filter_options(date_go_clicks, clear_clicks, start_date, end_date, cu
     if not (start_date and end_date):
         raise PreventUpdate
     
-    filtered_df = df[
-        (df['b2b_log'] >= pd.to_datetime(start_date).date()) &
-        (df['b2b_log'] <= pd.to_datetime(end_date).date())
-    ].copy()
+    # A newer Go click of this session cancels the query and discards this result
+    session_id = cancellation.session_id(login_data)
+    generation = cancellation.queries.begin(session_id, 'feedback')
+    with background.heavy_load(set_progress), cancellation.owned_by(session_id, 'feedback'):
+        try:
+            filtered_df = feedback_store.get_range(start_date, end_date)
+        except Exception:
+            if not cancellation.queries.is_current(session_id, 'feedback', generation):
+                # Cancelled by a newer click, which shows its own result
+                raise PreventUpdate
+            return (
+                [], [], [], [], [], [],
+                None,
+                True,
+                dash.no_update, dash.no_update, dash.no_update,
+                LOAD_ERROR_MESSAGE,
+                {"display": "block", "color": "#842029"},
+                {"display": "none"}
+            )
+        if not cancellation.queries.is_current(session_id, 'feedback', generation):
+            raise PreventUpdate
+        background.stage('aggregate')
+        handle = None
+        if not filtered_df.empty:
+            handle = datasets.register(filtered_df, key=f"feedback:{start_date}:{end_date}", spill=True)
 
     if filtered_df.empty:
         message = f"No data available from {start_date} to {end_date}"
         return (
             [], [], [], [], [], [],
-            [],
+            None,
             True,
             dash.no_update, dash.no_update, dash.no_update,
             message,
@@ -745,7 +723,7 @@ def update_filter_options(date_go_clicks, clear_clicks, start_date, end_date, cu
         new_service_options,
         new_name_options,
         [], [], [],
-        filtered_df.to_dict('records'),
+        handle,
         True,
         dash.no_update,
         dash.no_update,
@@ -773,8 +751,9 @@ def update_table(selected_table, filtered_data, source_values, service_values, n
     if not date_filter_applied:
         return [], [], {"display": "none"}
     
-    # Add this line before modifying the filtered DataFrame
-    filtered_df = pd.DataFrame(filtered_data).copy()    
+    filtered_df = datasets.resolve(filtered_data)
+    if filtered_df is None:
+        return [], [], {"display": "none"}
 
     # Apply filters
     if 'source' in filtered_df.columns and source_values:
@@ -858,8 +837,9 @@ def handle_modal(active_cell, close_clicks, overlay_clicks, table_data, table_ty
         row = table_data[active_cell['row']]
         group_value = row[list(row.keys())[0]];
 
-        # Add this line before modifying the filtered DataFrame
-        filtered_df = pd.DataFrame(filtered_data).copy()   
+        filtered_df = datasets.resolve(filtered_data)
+        if filtered_df is None:
+            return modal_style, dash.no_update, dash.no_update, None, dash.no_update, dash.no_update
 
         # Apply all current filters to the modal data
         if 'source' in filtered_df.columns and source_values:
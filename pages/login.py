@@ -1,68 +1,52 @@
+import uuid
+
 import dash
 from dash import html, dcc, Output, Input, State, callback, no_update, page_container
 import dash_bootstrap_components as dbc
-import mysql.connector
-import configparser     
-import os
 from dash.exceptions import PreventUpdate
+from sqlalchemy import text
+from services import cache, db
 
 dash.register_page(__name__, path="/login")
 
-# Read database configuration from config.ini
-config = configparser.ConfigParser()
-config.read(os.path.join(os.path.dirname(__file__), "config.ini"))
-
-def get_db_connection():
-    try:
-        creds = config['mysql_devcs']
-        return mysql.connector.connect(
-            host=creds.get('host'),
-            user=creds.get('user'),
-            passwd=creds.get('password'),
-            database=creds.get('database'),
-            port=int(creds.get('port')),
-            use_pure=True
-        )
-    except mysql.connector.Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+# Allowed pages per agent; access changes show up within PAGE_ACCESS_TTL seconds.
+# Credentials are always checked against the database.
+PAGE_ACCESS_TTL = 300
+page_access = cache.namespace('page-access', 4 * 1024 * 1024, ttl=PAGE_ACCESS_TTL)
 
 def authenticate_user(agent_id, password):
     """Authenticates user and gets their allowed pages"""
-    db = get_db_connection()
-    if not db:
-        return None
-    
     try:
-        with db.cursor(dictionary=True) as cursor:
+        with db.connect('mysql_devcs') as conn:
             # Check user credentials and active status
-            cursor.execute("""
+            user = conn.execute(text("""
                 SELECT DISTINCT crm_log_id, name 
                 FROM user_page_access 
-                WHERE crm_log_id = %s AND agent_password = %s AND active_flag = 1
+                WHERE crm_log_id = :agent_id AND agent_password = :password AND active_flag = 1
                 LIMIT 1
-            """, (agent_id, password))
+            """), {'agent_id': agent_id, 'password': password}).mappings().first()
             
-            user = cursor.fetchone()
             if not user:
                 return False
+            user = dict(user)
             
             # Get user's allowed pages
-            cursor.execute("""
-                SELECT DISTINCT page_path 
-                FROM user_page_access 
-                WHERE crm_log_id = %s AND active_flag = 1
-            """, (agent_id,))
+            allowed_pages = page_access.get(agent_id)
+            if allowed_pages is None:
+                rows = conn.execute(text("""
+                    SELECT DISTINCT page_path 
+                    FROM user_page_access 
+                    WHERE crm_log_id = :agent_id AND active_flag = 1
+                """), {'agent_id': agent_id})
+                allowed_pages = [row.page_path for row in rows]
+                page_access.put(agent_id, allowed_pages)
             
-            user['allowed_pages'] = [row['page_path'] for row in cursor.fetchall()]
+            user['allowed_pages'] = allowed_pages
             return user
             
     except Exception as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        if db and db.is_connected():
-            db.close()
 
 # Login Layout
 layout = dbc.Container(
@@ -210,7 +194,9 @@ def handle_login(n_clicks, username, password):
                 "logged_in": True,
                 "username": username,
                 "name": user.get("name", username),
-                "allowed_pages": user['allowed_pages']
+                "allowed_pages": user['allowed_pages'],
+                # Identifies this browser session's queries (see services.cancellation)
+                "session_id": uuid.uuid4().hex
             }
         )
 
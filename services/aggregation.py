@@ -0,0 +1,138 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from services import arrow_store
+
+# Column of a saved cube holding the cell counts, next to one column per dimension
+COUNTS_COLUMN = '__count__'
+
+
+class CountCube:
+    """Row counts of a frame for every observed combination of `dimensions`.
+
+    Each dimension is kept as an integer code per cell plus its labels, so
+    any count pivot over a subset of the dimensions, restricted to any set
+    of dimension values, is a masked np.bincount over the cells instead of
+    a filter and pivot_table over the rows.
+    """
+
+    def __init__(self, df, dimensions):
+        self.dimensions = list(dimensions)
+        self.rows = len(df)
+        counts = df.groupby(self.dimensions, observed=True, sort=False).size()
+        index = counts.index if isinstance(counts.index, pd.MultiIndex) else pd.MultiIndex.from_arrays([counts.index])
+        self.labels = {}
+        self.codes = {}
+        for i, column in enumerate(self.dimensions):
+            # Renumber so code order is label order, which is the order pivot_table sorts rows in
+            labels = pd.Index(index.levels[i])
+            order = labels.argsort()
+            rank = np.empty(len(order), dtype=np.asarray(index.codes[i]).dtype)
+            rank[order] = np.arange(len(order))
+            self.labels[column] = labels[order]
+            self.codes[column] = rank[np.asarray(index.codes[i])]
+        self.counts = counts.to_numpy(dtype=np.int64)
+
+    def save(self, path):
+        """Write the cube as an Arrow IPC file: one dictionary column per dimension, plus the counts."""
+        cells = pd.DataFrame({
+            str(i): pd.Categorical.from_codes(self.codes[column], categories=self.labels[column])
+            for i, column in enumerate(self.dimensions)
+        })
+        cells[COUNTS_COLUMN] = self.counts
+        arrow_store.write_frame(cells, path, metadata={
+            'dimensions': json.dumps(self.dimensions), 'rows': str(self.rows)})
+
+    @classmethod
+    def load(cls, path):
+        """Cube written by save(), memory-mapped."""
+        metadata = arrow_store.read_metadata(path)
+        cells = arrow_store.read_frame(path)
+        cube = cls.__new__(cls)
+        cube.dimensions = json.loads(metadata['dimensions'])
+        cube.rows = int(metadata['rows'])
+        cube.labels = {}
+        cube.codes = {}
+        for i, column in enumerate(cube.dimensions):
+            values = cells[str(i)]
+            cube.labels[column] = values.cat.categories
+            cube.codes[column] = values.cat.codes.to_numpy()
+        cube.counts = cells[COUNTS_COLUMN].to_numpy()
+        return cube
+
+    @property
+    def nbytes(self):
+        return int(self.counts.nbytes + sum(codes.nbytes for codes in self.codes.values()))
+
+    def __len__(self):
+        return len(self.counts)
+
+    def mask(self, filters=None):
+        """Cells whose value is in `filters[column]` for every filtered column."""
+        mask = np.ones(len(self.counts), dtype=bool)
+        for column, values in (filters or {}).items():
+            if values is None or not len(values):
+                continue
+            wanted = self.labels[column].get_indexer(list(values))
+            keep = np.zeros(len(self.labels[column]), dtype=bool)
+            keep[wanted[wanted >= 0]] = True
+            mask &= keep[self.codes[column]]
+        return mask
+
+    def total(self, filters=None):
+        return int(self.counts[self.mask(filters)].sum())
+
+    def values(self, column, filters=None):
+        """Distinct values of `column` with at least one row, as sorted strings."""
+        present = np.unique(self.codes[column][self.mask(filters)])
+        return sorted(self.labels[column][present].astype(str))
+
+    def _group(self, columns, mask):
+        """Mixed-radix group number of each masked cell over `columns`, and the radix sizes."""
+        sizes = [len(self.labels[column]) for column in columns]
+        group = np.zeros(int(mask.sum()), dtype=np.int64)
+        for column, size in zip(columns, sizes):
+            group = group * size + self.codes[column][mask]
+        return group, sizes
+
+    def _group_labels(self, columns, sizes, groups):
+        positions = np.unravel_index(groups, sizes)
+        labels = [self.labels[column][codes].astype(object) for column, codes in zip(columns, positions)]
+        if len(columns) == 1:
+            return pd.Index(labels[0], name=columns[0])
+        return pd.MultiIndex.from_arrays(labels, names=list(columns))
+
+    def pivot(self, index, columns, filters=None, margins_name='Grand Total'):
+        """Counts of `index` x `columns` with margins.
+
+        Same table as ``df.pivot_table(index=index, columns=columns,
+        aggfunc='count', observed=True, margins=True).fillna(0).astype(int)``
+        on the filtered rows. Empty if no row matches.
+        """
+        mask = self.mask(filters)
+        if not mask.any():
+            return pd.DataFrame()
+
+        row_group, row_sizes = self._group(index, mask)
+        column_group, column_sizes = self._group(columns, mask)
+        n_columns = int(np.prod(column_sizes))
+        grid = np.bincount(row_group * n_columns + column_group, weights=self.counts[mask],
+                           minlength=int(np.prod(row_sizes)) * n_columns)
+        grid = grid.reshape(-1, n_columns).astype(np.int64)
+
+        # Keep only observed rows and columns, in label order like pivot_table
+        rows = np.flatnonzero(grid.sum(axis=1))
+        cols = np.flatnonzero(grid.sum(axis=0))
+        grid = grid[np.ix_(rows, cols)]
+        table = pd.DataFrame(grid, index=self._group_labels(index, row_sizes, rows),
+                             columns=self._group_labels(columns, column_sizes, cols))
+
+        if len(index) == 1:
+            margin_index = pd.Index([margins_name], name=index[0])
+        else:
+            margin_index = pd.MultiIndex.from_tuples([(margins_name,) + ('',) * (len(index) - 1)], names=list(index))
+        table[margins_name] = grid.sum(axis=1)
+        margin = pd.DataFrame([table.sum(axis=0).to_numpy()], index=margin_index, columns=table.columns)
+        return pd.concat([table, margin])
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# Prepared frames shared by every worker process on this host
+ARROW_CACHE_DIR = os.environ.get(
+    "BRIDGE_ARROW_DIR", os.path.join(tempfile.gettempdir(), "bridge_dashboards", "arrow")
+)
+LOCK_POLL_SECONDS = 0.05
+
+
+def write_frame(df, path, metadata=None):
+    """Write `df` as an uncompressed Arrow IPC file, atomically.
+
+    `metadata` (str to str) is kept in the file's schema; see read_metadata().
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, **{key.encode(): value.encode() for key, value in metadata.items()}})
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(tmp, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_frame(path):
+    """Memory-map an Arrow IPC file as a DataFrame.
+
+    Numeric columns and categorical codes stay backed by the mapping, which
+    the OS shares between processes; they are read-only. Text columns are
+    materialized (deduplicated) in the calling process.
+    """
+    source = pa.memory_map(path, 'r')
+    return ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+
+def read_metadata(path):
+    """The `metadata` an Arrow IPC file was written with, without reading its columns."""
+    with pa.memory_map(path, 'r') as source:
+        metadata = ipc.open_file(source).schema.metadata or {}
+    return {key.decode(): value.decode() for key, value in metadata.items() if key != b'pandas'}
+
+
+def can_store(df):
+    """False for frames Arrow cannot represent, e.g. object columns of mixed types."""
+    try:
+        pa.Schema.from_pandas(df, preserve_index=False)
+        return True
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return False
+
+
+def _try_lock(fd):
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Cross-process lock: an exclusive OS lock (flock, or msvcrt on Windows) on `path`.
+
+    The OS drops the lock when its holder exits or dies, so there is no
+    stale lock to break. The file itself stays in place; removing it would
+    let a new opener lock a different file than a waiter still holds open.
+    """
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        self.acquired = False
+        self._fd = None
+
+    def acquire(self, blocking=True):
+        """True once held; False if `timeout` passed, or at once if the lock is taken and not `blocking`."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+        while not _try_lock(fd):
+            if not blocking or deadline is not None and time.monotonic() > deadline:
+                os.close(fd)
+                return False
+            time.sleep(LOCK_POLL_SECONDS)
+        self._fd = fd
+        self.acquired = True
+        return True
+
+    def release(self):
+        if self.acquired:
+            self.acquired = False
+            fd, self._fd = self._fd, None
+            try:
+                # Explicitly, since forked children share the open file
+                _unlock(fd)
+            finally:
+                os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
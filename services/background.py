@@ -0,0 +1,115 @@
+import contextvars
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import diskcache
+import psutil
+from dash import DiskcacheManager
+
+from services import cache as shared_cache, cancellation, db, load_waits
+
+# Job results, progress and shared query state live here; every worker
+# process of one deployment must point at the same directory
+BACKGROUND_DIR = os.environ.get(
+    "BRIDGE_BACKGROUND_DIR", os.path.join(tempfile.gettempdir(), "bridge_dashboards", "jobs")
+)
+# Loads allowed to run at once, across processes; the rest wait for a slot
+HEAVY_LOADS = int(os.environ.get("BRIDGE_HEAVY_LOADS", 2))
+JOB_RESULT_TTL = 3600
+SLOT_POLL_INTERVAL = 0.2
+SLOT_RECLAIM_INTERVAL = 5
+
+cache = diskcache.Cache(BACKGROUND_DIR)
+manager = DiskcacheManager(cache, expire=JOB_RESULT_TTL)
+
+# Jobs run in forked processes, so the cancellation registry and the
+# partition load waits must be on disk
+cancellation.queries.share(cache)
+load_waits.loads.share(cache)
+
+# Progress bar position and label per loading stage
+STAGES = {
+    'queued': (5, "Waiting for a free slot"),
+    'fetch': (15, "Fetching rows"),
+    'prepare': (50, "Preparing data"),
+    'aggregate': (85, "Aggregating"),
+}
+PROGRESS_HIDDEN = {'display': 'none'}
+PROGRESS_SHOWN = {'height': '18px', 'margin': '8px 0'}
+
+_progress = contextvars.ContextVar('background_progress', default=None)
+_server_pid = os.getpid()
+
+
+def stage(name):
+    """Report a loading stage to the background callback running in this context."""
+    set_progress = _progress.get()
+    if set_progress is not None:
+        set_progress(STAGES[name])
+
+
+def _alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def _acquire_slot():
+    # One key per slot holding the owner's pid, so a job Dash terminated
+    # mid-load does not keep its slot forever. Waiting jobs only read until
+    # a slot looks free: polling with write transactions starves SQLite.
+    pid = os.getpid()
+    reclaimed_at = time.monotonic()
+    while True:
+        for slot in range(HEAVY_LOADS):
+            key = ('heavy-load', slot)
+            if cache.get(key) is None and cache.add(key, pid):
+                return key
+        if time.monotonic() - reclaimed_at > SLOT_RECLAIM_INTERVAL:
+            reclaimed_at = time.monotonic()
+            for slot in range(HEAVY_LOADS):
+                key = ('heavy-load', slot)
+                holder = cache.get(key)
+                if holder is not None and not _alive(holder):
+                    with cache.transact():
+                        if cache.get(key) == holder:
+                            cache.delete(key)
+        time.sleep(SLOT_POLL_INTERVAL)
+
+
+def _release_slot(key):
+    with cache.transact():
+        if cache.get(key) == os.getpid():
+            cache.delete(key)
+
+
+@contextmanager
+def heavy_load(set_progress):
+    """Run one dashboard load inside a background job.
+
+    Waits for one of the HEAVY_LOADS slots and reports stage() calls made by
+    the loaders to `set_progress`.
+    """
+    if os.getpid() != _server_pid:
+        # The job is a fork of the server: never reuse the parent's sockets
+        # or the SQLite connection of the thread that forked it
+        db.dispose_all(close=False)
+        cache.close()
+        shared_cache.backend.close()
+    token = _progress.set(set_progress)
+    try:
+        stage('queued')
+        key = _acquire_slot()
+        try:
+            yield
+        finally:
+            _release_slot(key)
+    finally:
+        _progress.reset(token)
+
+
+def slot_stats():
+    return {'slots': HEAVY_LOADS, 'busy': sum(cache.get(('heavy-load', slot)) is not None for slot in range(HEAVY_LOADS))}
@@ -0,0 +1,419 @@
+"""Namespaced caches with interchangeable backends.
+
+    BRIDGE_CACHE_URL=memory://                  # per-process LRU (default)
+    BRIDGE_CACHE_URL=disk:///var/cache/bridge   # diskcache, shared by the workers of one host
+    BRIDGE_CACHE_URL=redis://:secret@cache:6379/2
+
+Every namespace offers get/put/pop/clear/stats with the same meaning on each
+backend, so callers do not know where their values live. The memory backend
+keeps the objects themselves; the others store values serialized by dumps():
+msgpack, with tuples and numpy scalars kept as such and DataFrames as Arrow
+IPC streams. Nothing read back from a store is unpickled; values of any other
+type (or frames Arrow cannot represent) are not stored by those backends.
+"""
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+from urllib.parse import unquote, urlparse
+
+import diskcache
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from services.lru import ByteLRU, approx_nbytes
+
+CACHE_URL = os.environ.get("BRIDGE_CACHE_URL", "memory://")
+DISK_CACHE_DIR = os.path.join(tempfile.gettempdir(), "bridge_dashboards", "cache")
+REDIS_TIMEOUT = 5
+
+_EXT_FRAME = 1
+_EXT_TUPLE = 2
+
+
+def _encode(value):
+    if isinstance(value, tuple):
+        return msgpack.ExtType(_EXT_TUPLE, dumps(list(value)))
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(value, preserve_index=None)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            table = None
+        if table is not None:
+            sink = pa.BufferOutputStream()
+            with ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return msgpack.ExtType(_EXT_FRAME, sink.getvalue().to_pybytes())
+    raise TypeError(f"cannot serialize {type(value).__name__} for the cache")
+
+
+def _decode(code, data):
+    if code == _EXT_TUPLE:
+        return tuple(loads(data))
+    if code == _EXT_FRAME:
+        return ipc.open_stream(data).read_all().to_pandas()
+    raise ValueError(f"unknown cache value type {code}")
+
+
+def dumps(value):
+    return msgpack.packb(value, default=_encode, strict_types=True, use_bin_type=True)
+
+
+def loads(data):
+    return msgpack.unpackb(data, ext_hook=_decode, raw=False, strict_map_key=False)
+
+
+def key_digest(key):
+    """Stable string for a cache key made of strings, numbers, dates and tuples of them."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    """One socket speaking RESP2, enough of it for GET/SET/DEL/SCAN and MULTI/EXEC."""
+
+    def __init__(self, host, port, db, password, timeout):
+        self.pid = os.getpid()
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+        if db:
+            self.command('SELECT', db)
+
+    @staticmethod
+    def _pack(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def command(self, *args):
+        self.sock.sendall(self._pack(args))
+        return self._reply()
+
+    def transaction(self, *commands):
+        """Replies of `commands`, run atomically between MULTI and EXEC."""
+        self.sock.sendall(b''.join(self._pack(args) for args in (('MULTI',), *commands, ('EXEC',))))
+        for _ in range(len(commands) + 1):
+            try:
+                # +OK for MULTI, +QUEUED per command
+                self._reply()
+            except RedisError:
+                # A command the server refused to queue; EXEC reports the abort
+                pass
+        return self._reply()
+
+    def _reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            return None if length < 0 else self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected Redis reply {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class _SerializedNamespace:
+    """Namespace whose values are serialized into an external store.
+
+    Store errors are printed and read as a miss, so a cache outage only
+    makes the dashboards slower; so are entries that do not decode. Values
+    dumps() cannot serialize, or whose serialized size exceeds `max_bytes`,
+    are not stored.
+    """
+
+    def __init__(self, name, max_bytes, ttl):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _failed(self, action, error):
+        print(f"Error {action} cache namespace {self.name}: {error}")
+        self._count('errors')
+
+    def __contains__(self, key):
+        try:
+            return self._read(key_digest(key)) is not None
+        except Exception as e:
+            self._failed('reading', e)
+            return False
+
+    def get(self, key, default=None):
+        try:
+            data = self._read(key_digest(key))
+        except Exception as e:
+            self._failed('reading', e)
+            data = None
+        value = self._decode(data)
+        if value is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return value
+
+    def put(self, key, value, ttl=None):
+        try:
+            data = dumps(value)
+        except TypeError as e:
+            print(f"Not caching in namespace {self.name}: {e}")
+            self._count('skipped')
+            return
+        if len(data) > self.max_bytes:
+            self._count('skipped')
+            return
+        try:
+            self._write(key_digest(key), data, self.ttl if ttl is None else ttl)
+            self._count('sets')
+        except Exception as e:
+            self._failed('writing', e)
+
+    def pop(self, key, default=None):
+        try:
+            data = self._delete(key_digest(key))
+        except Exception as e:
+            self._failed('deleting from', e)
+            data = None
+        value = self._decode(data)
+        return default if value is None else value
+
+    def _decode(self, data):
+        if data is None:
+            return None
+        try:
+            return loads(data)
+        except Exception as e:
+            # Written by an older version, or not by this deployment at all
+            self._failed('decoding', e)
+            return None
+
+    def clear(self):
+        try:
+            self._clear()
+        except Exception as e:
+            self._failed('clearing', e)
+
+    def stats(self):
+        with self._lock:
+            stats = {'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses, 'sets': self.sets,
+                     'skipped': self.skipped, 'errors': self.errors}
+        try:
+            stats.update(self._usage())
+        except Exception as e:
+            self._failed('measuring', e)
+        return stats
+
+    def close(self):
+        pass
+
+    def _usage(self):
+        return {}
+
+
+class _DiskNamespace(_SerializedNamespace):
+    def __init__(self, directory, name, max_bytes, ttl):
+        super().__init__(name, max_bytes, ttl)
+        self._cache = diskcache.Cache(os.path.join(directory, name), size_limit=max_bytes,
+                                      eviction_policy='least-recently-used')
+
+    def _read(self, digest):
+        return self._cache.get(digest)
+
+    def _write(self, digest, data, ttl):
+        self._cache.set(digest, data, expire=ttl)
+
+    def _delete(self, digest):
+        return self._cache.pop(digest)
+
+    def _clear(self):
+        self._cache.clear()
+
+    def _usage(self):
+        return {'entries': len(self._cache), 'bytes': self._cache.volume()}
+
+    def close(self):
+        self._cache.close()
+
+
+class _RedisNamespace(_SerializedNamespace):
+    def __init__(self, backend, name, max_bytes, ttl):
+        super().__init__(name, max_bytes, ttl)
+        self._backend = backend
+        self._prefix = f"{backend.prefix}:{name}:"
+
+    def _read(self, digest):
+        return self._backend.execute('GET', self._prefix + digest)
+
+    def _write(self, digest, data, ttl):
+        if ttl is None:
+            self._backend.execute('SET', self._prefix + digest, data)
+        else:
+            self._backend.execute('SET', self._prefix + digest, data, 'PX', max(1, int(ttl * 1000)))
+
+    def _delete(self, digest):
+        data, _ = self._backend.transaction(('GET', self._prefix + digest), ('DEL', self._prefix + digest))
+        return data
+
+    def _clear(self):
+        cursor = '0'
+        while True:
+            cursor, keys = self._backend.execute('SCAN', cursor, 'MATCH', self._prefix + '*', 'COUNT', 1000)
+            if keys:
+                self._backend.execute('DEL', *keys)
+            cursor = cursor.decode()
+            if cursor == '0':
+                return
+
+
+class _Backend:
+    # Whether other processes see the values; the memory backend's die with the process
+    shared = True
+
+    def __init__(self):
+        self.namespaces = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name, max_bytes, ttl=None, sizeof=approx_nbytes):
+        """The cache called `name`: at most `max_bytes`, entries expiring after `ttl` seconds.
+
+        `sizeof` measures values for the memory backend; the others count
+        serialized bytes.
+        """
+        with self._lock:
+            if name not in self.namespaces:
+                self.namespaces[name] = self._create(name, max_bytes, ttl, sizeof)
+            return self.namespaces[name]
+
+    def stats(self):
+        with self._lock:
+            namespaces = dict(self.namespaces)
+        return {name: namespace.stats() for name, namespace in namespaces.items()}
+
+    def close(self):
+        """Drop connections and handles; they reopen on next use (call after fork)."""
+
+
+class MemoryBackend(_Backend):
+    """Values stay objects in this process, in one ByteLRU per namespace."""
+
+    shared = False
+
+    def _create(self, name, max_bytes, ttl, sizeof):
+        return ByteLRU(max_bytes, sizeof=sizeof, ttl=ttl)
+
+
+class DiskBackend(_Backend):
+    """One diskcache directory per namespace, evicted least recently used first."""
+
+    def __init__(self, directory=DISK_CACHE_DIR):
+        super().__init__()
+        self.directory = directory
+
+    def _create(self, name, max_bytes, ttl, sizeof):
+        return _DiskNamespace(self.directory, name, max_bytes, ttl)
+
+    def close(self):
+        with self._lock:
+            for namespace in self.namespaces.values():
+                namespace.close()
+
+
+class RedisBackend(_Backend):
+    """Any server speaking the Redis protocol, one connection per thread.
+
+    TTLs become PX expiries; evicting under memory pressure is left to the
+    server's maxmemory policy (allkeys-lru suits this cache).
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, prefix='bridge', timeout=REDIS_TIMEOUT):
+        super().__init__()
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _create(self, name, max_bytes, ttl, sizeof):
+        return _RedisNamespace(self, name, max_bytes, ttl)
+
+    def execute(self, *args):
+        return self._call(lambda conn: conn.command(*args))
+
+    def transaction(self, *commands):
+        return self._call(lambda conn: conn.transaction(*commands))
+
+    def _call(self, fn):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.pid != os.getpid():
+            conn = self._local.conn = _RespConnection(self.host, self.port, self.db, self.password, self.timeout)
+        try:
+            return fn(conn)
+        except OSError:
+            # Includes timeouts and resets; reconnect on the next command
+            conn.close()
+            self._local.conn = None
+            raise
+
+    def close(self):
+        self._local = threading.local()
+
+
+def from_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme == 'memory':
+        return MemoryBackend()
+    if parsed.scheme == 'disk':
+        return DiskBackend(unquote(parsed.path) or DISK_CACHE_DIR)
+    if parsed.scheme == 'redis':
+        return RedisBackend(host=parsed.hostname or '127.0.0.1', port=parsed.port or 6379,
+                            db=int(parsed.path.lstrip('/') or 0),
+                            password=unquote(parsed.password) if parsed.password else None)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+backend = from_url(CACHE_URL)
+
+
+def namespace(name, max_bytes, ttl=None, sizeof=approx_nbytes):
+    return backend.namespace(name, max_bytes, ttl=ttl, sizeof=sizeof)
+
+
+def stats():
+    return backend.stats()
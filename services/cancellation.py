@@ -0,0 +1,124 @@
+import contextvars
+import uuid
+from contextlib import contextmanager
+
+from services import db, load_waits
+from services.shared_state import LocalState, SharedState
+
+# MySQL errors raised in the connection running a query that was stopped
+ER_QUERY_INTERRUPTED = 1317   # KILL QUERY
+ER_QUERY_TIMEOUT = 3024       # MAX_EXECUTION_TIME exceeded
+
+# (session_id, page) the queries of the current callback belong to
+_owner = contextvars.ContextVar('query_owner', default=None)
+
+
+COUNTERS = ('started', 'cancelled', 'timed_out', 'failed')
+
+
+class QueryTracker:
+    """At most one in-flight dashboard query per (session, page).
+
+    A callback calls begin() when the user clicks Go; that kills the query an
+    earlier click of the same session is still running on that page, unless
+    other users are waiting for the partitions it loads. Queries run through
+    query() so the tracker knows their MySQL connection id.
+    """
+
+    def __init__(self):
+        self._state = LocalState()
+
+    def share(self, cache):
+        """Keep the registry and counters in `cache` so other processes see them."""
+        self._state = SharedState(cache)
+
+    def begin(self, session_id, page):
+        """Start a new request for this session and page, cancelling the previous one."""
+        if not session_id:
+            return None
+        generation = self._state.incr(('query-generation', session_id, page))
+        key = ('query-running', session_id, page)
+        running = self._state.get(key)
+        if running is not None:
+            section, connection_id, _, loading = running
+            if load_waits.loads.waiters(loading):
+                # Someone else is waiting for the same rows, let it finish
+                return generation
+            self._state.delete_if(key, running)
+            kill_query(section, connection_id)
+        return generation
+
+    def is_current(self, session_id, page, generation):
+        """False once a newer request of the same session and page has begun."""
+        if not session_id:
+            return True
+        return self._state.get(('query-generation', session_id, page)) == generation
+
+    @contextmanager
+    def query(self, section):
+        """Pooled connection for one dashboard query, with the statement timeout set."""
+        owner = _owner.get()
+        timeout = db.pool_setting(section, 'statement_timeout_ms')
+        with db.connect(section) as conn:
+            conn.exec_driver_sql(f"SET SESSION MAX_EXECUTION_TIME = {int(timeout)}")
+            key = running = None
+            if owner is not None:
+                connection_id = conn.exec_driver_sql("SELECT CONNECTION_ID()").scalar()
+                key = ('query-running',) + owner
+                running = (section, connection_id, uuid.uuid4().hex, load_waits.loading())
+                # A process that died mid-query cannot leave its entry behind for long
+                self._state.set(key, running, expire=timeout / 1000 if timeout else None)
+            self._state.incr(('query-count', 'started'))
+            try:
+                yield conn
+            except Exception as e:
+                code = error_code(e)
+                if code == ER_QUERY_INTERRUPTED:
+                    self._state.incr(('query-count', 'cancelled'))
+                elif code == ER_QUERY_TIMEOUT:
+                    self._state.incr(('query-count', 'timed_out'))
+                else:
+                    self._state.incr(('query-count', 'failed'))
+                raise
+            finally:
+                if running is not None:
+                    self._state.delete_if(key, running)
+
+    def stats(self):
+        stats = {name: self._state.get(('query-count', name), 0) for name in COUNTERS}
+        stats['running'] = self._state.count('query-running')
+        return stats
+
+
+def error_code(error):
+    """MySQL error number behind a SQLAlchemy/PyMySQL exception, or None."""
+    orig = getattr(error, 'orig', error)
+    args = getattr(orig, 'args', ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def kill_query(section, connection_id):
+    """Stop the statement running on `connection_id`; the connection itself stays open."""
+    try:
+        with db.connect(section) as conn:
+            conn.exec_driver_sql(f"KILL QUERY {int(connection_id)}")
+    except Exception as e:
+        print(f"Error cancelling query {connection_id}: {e}")
+
+
+@contextmanager
+def owned_by(session_id, page):
+    """Queries run inside this block belong to `page` of the given session."""
+    token = _owner.set((session_id, page) if session_id else None)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+def session_id(login_data):
+    return login_data.get('session_id') if isinstance(login_data, dict) else None
+
+
+# Dashboard queries of all sessions
+queries = QueryTracker()
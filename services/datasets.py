@@ -0,0 +1,153 @@
+import itertools
+import os
+import threading
+import time
+import uuid
+
+
+from services import arrow_store
+from services.lru import ByteLRU, approx_nbytes
+
+DATASET_REGISTRY_BYTES = 1024 * 1024 * 1024
+DERIVED_CACHE_BYTES = 256 * 1024 * 1024
+
+# Frames registered by background jobs, and values derived from them, are
+# written here for the server process. Every worker maps what it finds there,
+# so it must be private to the service user and not under a world-writable
+# directory like /tmp.
+DATASET_SPILL_DIR = os.environ.get(
+    "BRIDGE_DATASET_DIR", os.path.join(os.path.expanduser("~"), ".cache", "bridge_dashboards", "datasets")
+)
+DATASET_SPILL_TTL = 6 * 3600
+
+
+def ensure_private_dir(path):
+    """Create `path` with mode 0700, or refuse it if another user owns it."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        # Windows: the directory inherits the ACL of its parent
+        return
+    st = os.stat(path)
+    if st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by uid {st.st_uid}, not by this user")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+class DatasetRegistry:
+    """DataFrames kept on the server and addressed by small handles.
+
+    A handle is a plain dict ``{'key': ..., 'version': ...}`` that is safe to
+    put in a dcc.Store. Frames handed out by `resolve` are shared between
+    callbacks and must not be modified in place.
+
+    Frames registered with ``spill=True`` are also written to `spill_dir` as
+    Arrow files, so a handle created in a background job process resolves in
+    every worker, each memory-mapping the same file. Only Arrow files are
+    read back from `spill_dir`, which is kept private to this user.
+    """
+
+    def __init__(self, max_bytes=DATASET_REGISTRY_BYTES, derived_bytes=DERIVED_CACHE_BYTES,
+                 spill_dir=DATASET_SPILL_DIR, spill_ttl=DATASET_SPILL_TTL):
+        self._frames = ByteLRU(max_bytes)
+        self._derived = ByteLRU(derived_bytes, sizeof=approx_nbytes)
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self.spill_dir = spill_dir
+        self.spill_ttl = spill_ttl
+
+    def register(self, df, key=None, spill=False):
+        key = key or uuid.uuid4().hex
+        if spill:
+            # Process-local counters would collide between job processes
+            version = uuid.uuid4().hex[:16]
+            self._spill(df, key, version)
+        else:
+            with self._lock:
+                version = next(self._versions)
+        self._frames.put((key, version), df)
+        return {'key': key, 'version': version}
+
+    def resolve(self, handle):
+        """Return the frame behind a handle, or None if it is unknown or evicted."""
+        if not isinstance(handle, dict) or 'key' not in handle or 'version' not in handle:
+            return None
+        frame = self._frames.get((handle['key'], handle['version']))
+        if frame is None and isinstance(handle['version'], str):
+            frame = self._load_spilled(handle['key'], handle['version'])
+        return frame
+
+    def _spill_path(self, key, version, name=None, ext=".arrow"):
+        parts = [str(key), str(version)] + ([repr(name)] if name is not None else [])
+        slug = ".".join("".join(c if c.isalnum() or c in '-_' else '_' for c in part) for part in parts)
+        return os.path.join(self.spill_dir, slug + ext)
+
+    def _spill(self, df, key, version):
+        if not arrow_store.can_store(df):
+            raise ValueError(f"Dataset {key} has columns Arrow cannot store, so it cannot be spilled")
+        ensure_private_dir(self.spill_dir)
+        self._prune_spilled()
+        arrow_store.write_frame(df, self._spill_path(key, version))
+
+    def _spill_dir_private(self):
+        try:
+            ensure_private_dir(self.spill_dir)
+            return True
+        except OSError as e:
+            print(f"Error using dataset spill directory: {e}")
+            return False
+
+    def _load_spilled(self, key, version):
+        if not self._spill_dir_private():
+            return None
+        try:
+            frame = arrow_store.read_frame(self._spill_path(key, version))
+        except FileNotFoundError:
+            return None
+        self._frames.put((key, version), frame)
+        return frame
+
+    def _prune_spilled(self):
+        cutoff = time.time() - self.spill_ttl
+        for entry in os.scandir(self.spill_dir):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                # Gone already, or still mapped where that forbids removal
+                pass
+
+    def derive(self, handle, name, build, spill=None):
+        """Memoize `build(frame)` per dataset version under `name`.
+
+        `spill` is the class `build` returns, if it has save(path) and
+        load(path); the value is then written next to a spilled frame, so the
+        server process reuses what a background job built.
+        """
+        frame = self.resolve(handle)
+        if frame is None:
+            return None
+        key, version = handle['key'], handle['version']
+        cache_key = (key, version, name)
+        value = self._derived.get(cache_key)
+        if value is not None:
+            return value
+        path = self._spill_path(key, version, name)
+        if spill is not None and isinstance(version, str) and self._spill_dir_private():
+            try:
+                value = spill.load(path)
+            except FileNotFoundError:
+                value = None
+        if value is None:
+            value = build(frame)
+            if spill is not None and isinstance(version, str):
+                ensure_private_dir(self.spill_dir)
+                value.save(path)
+        self._derived.put(cache_key, value)
+        return value
+
+    def stats(self):
+        return {'frames': self._frames.stats(), 'derived': self._derived.stats()}
+
+
+datasets = DatasetRegistry()
@@ -0,0 +1,155 @@
+import configparser
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import sqlalchemy
+
+# Read database configuration from config.ini (shared with the pages)
+CONFIG_PATH = os.environ.get(
+    "BRIDGE_DB_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages", "config.ini")
+)
+
+config = configparser.ConfigParser()
+config.read(CONFIG_PATH)
+
+# Pool and query settings, each one can be overridden per section in config.ini
+POOL_DEFAULTS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'warm_up': 2,
+    # MAX_EXECUTION_TIME for dashboard queries, 0 disables it
+    'statement_timeout_ms': 120000,
+}
+
+_engines = {}
+_pool_counters = {}
+_lock = threading.Lock()
+
+
+class PoolCounters:
+    """Connection acquisition counters for one engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.acquired += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+
+def pool_setting(section, name):
+    return int(config[section].get(name, POOL_DEFAULTS[name]))
+
+
+def get_engine(section='mysql_devcs'):
+    """Return the process-wide pooled engine for a config.ini section."""
+    engine = _engines.get(section)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        if section not in _engines:
+            creds = config[section]
+            url = sqlalchemy.engine.URL.create(
+                "mysql+pymysql",
+                username=creds.get('user'),
+                password=creds.get('password'),
+                host=creds.get('host'),
+                port=int(creds.get('port')),
+                database=creds.get('database'),
+            )
+            _engines[section] = sqlalchemy.create_engine(
+                url,
+                pool_size=pool_setting(section, 'pool_size'),
+                max_overflow=pool_setting(section, 'max_overflow'),
+                pool_timeout=pool_setting(section, 'pool_timeout'),
+                pool_recycle=pool_setting(section, 'pool_recycle'),
+                pool_pre_ping=True,
+            )
+            _pool_counters[section] = PoolCounters()
+        return _engines[section]
+
+
+@contextmanager
+def connect(section='mysql_devcs'):
+    """Borrow a pooled connection, recording how long the checkout waited."""
+    engine = get_engine(section)
+    counters = _pool_counters[section]
+
+    started = time.perf_counter()
+    try:
+        conn = engine.connect()
+    except sqlalchemy.exc.TimeoutError:
+        counters.record_timeout()
+        raise
+    counters.record_wait(time.perf_counter() - started)
+
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def warm_up(sections=('mysql_devcs', 'mysql_dev')):
+    """Open `warm_up` connections per section so the first requests skip the handshake."""
+    for section in sections:
+        if section not in config:
+            continue
+        engine = get_engine(section)
+        conns = []
+        try:
+            for _ in range(pool_setting(section, 'warm_up')):
+                conns.append(engine.connect())
+        except Exception as e:
+            print(f"Error warming up {section} pool: {e}")
+        finally:
+            for conn in conns:
+                conn.close()
+
+
+def pool_stats(section=None):
+    """Pool occupancy and checkout wait statistics, per section (exported on /metrics)."""
+    sections = [section] if section else list(_engines)
+    stats = {}
+    for name in sections:
+        if name not in _engines:
+            continue
+        pool = _engines[name].pool
+        counters = _pool_counters[name]
+        stats[name] = {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'acquired': counters.acquired,
+            'timeouts': counters.timeouts,
+            'wait_total_ms': round(counters.wait_total * 1000, 3),
+            'wait_avg_ms': round(counters.wait_total * 1000 / counters.acquired, 3) if counters.acquired else 0.0,
+            'wait_max_ms': round(counters.wait_max * 1000, 3),
+        }
+    return stats
+
+
+def dispose_all(close=True):
+    """Drop every pooled connection; pass close=False in a freshly forked worker."""
+    with _lock:
+        for section, engine in _engines.items():
+            engine.dispose(close=close)
+            if not close:
+                # The parent process reports the checkouts made before the fork
+                _pool_counters[section] = PoolCounters()
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+def positions_to_mask(positions, rows):
+    mask = np.zeros(rows, dtype=bool)
+    mask[positions] = True
+    return mask
+
+
+class RowBitmap:
+    """Set of row positions, stored packed or as sorted positions, whichever is smaller.
+
+    Like a roaring container: a value on fewer than 1 in 32 rows keeps its
+    int32 positions, anything denser keeps one bit per row.
+    """
+
+    __slots__ = ('rows', 'positions', 'bits')
+
+    def __init__(self, positions, rows):
+        self.rows = rows
+        if len(positions) * 32 < rows:
+            self.positions = np.asarray(positions, dtype=np.int32)
+            self.bits = None
+        else:
+            self.positions = None
+            self.bits = np.packbits(positions_to_mask(positions, rows))
+
+    @property
+    def sparse(self):
+        return self.bits is None
+
+    @property
+    def nbytes(self):
+        return int(self.positions.nbytes if self.sparse else self.bits.nbytes)
+
+    def mask(self):
+        if self.sparse:
+            return positions_to_mask(self.positions, self.rows)
+        return np.unpackbits(self.bits, count=self.rows).view(bool)
+
+
+def union(bitmaps, rows):
+    """OR of bitmaps, as sorted positions if every input is sparse, else a boolean mask."""
+    if all(bitmap.sparse for bitmap in bitmaps):
+        # Each row has one value per column, so the position sets are disjoint
+        return np.sort(np.concatenate([bitmap.positions for bitmap in bitmaps]))
+    mask = np.zeros(rows, dtype=bool)
+    for bitmap in bitmaps:
+        if bitmap.sparse:
+            mask[bitmap.positions] = True
+        else:
+            mask |= bitmap.mask()
+    return mask
+
+
+def intersect(left, right):
+    """AND of two selections, each sorted positions or a boolean mask."""
+    left_mask, right_mask = left.dtype == bool, right.dtype == bool
+    if left_mask and right_mask:
+        return left & right
+    if left_mask:
+        return right[left[right]]
+    if right_mask:
+        return left[right[left]]
+    return np.intersect1d(left, right, assume_unique=True)
+
+
+class FilterIndex:
+    """Row bitmaps for every distinct value of the filter columns of one frame.
+
+    `select({column: values})` ORs the bitmaps of the values within a column
+    and ANDs across columns, returning sorted row positions. No rows are
+    copied; callers take the positions from the frame they indexed.
+    """
+
+    def __init__(self, df, columns):
+        self.rows = len(df)
+        self.bitmaps = {}
+        for column in columns:
+            values = df[column] if isinstance(df[column].dtype, pd.CategoricalDtype) else df[column].astype(str)
+            codes, uniques = pd.factorize(values)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))])
+            order = order[len(order) - bounds[-1]:]
+            self.bitmaps[column] = {
+                str(value): RowBitmap(order[bounds[i]:bounds[i + 1]], self.rows) for i, value in enumerate(uniques)
+            }
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps.values())
+
+    def select(self, filters):
+        """Sorted row positions matching `filters`, or None when nothing is filtered."""
+        selection = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            bitmaps = [self.bitmaps[column][value] for value in values if value in self.bitmaps[column]]
+            chosen = union(bitmaps, self.rows) if bitmaps else np.empty(0, dtype=np.int32)
+            selection = chosen if selection is None else intersect(selection, chosen)
+        if selection is None:
+            return None
+        if selection.dtype == bool:
+            return np.flatnonzero(selection)
+        return selection.astype(np.int64)
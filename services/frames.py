@@ -0,0 +1,46 @@
+import pandas as pd
+
+from services.lru import frame_nbytes
+
+
+def concat_frames(frames):
+    """Concatenate frames with the same columns, keeping categoricals categorical.
+
+    pd.concat falls back to object dtype when categorical columns carry
+    different categories, so the categories are unioned first. Frames
+    without rows are skipped because they may not carry the prepared dtypes.
+    """
+    if not frames:
+        return pd.DataFrame()
+    with_rows = [frame for frame in frames if len(frame)]
+    if not with_rows:
+        return frames[0]
+    if len(with_rows) == 1:
+        return with_rows[0].reset_index(drop=True)
+
+    categorical = [
+        column for column in with_rows[0].columns
+        if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in with_rows if column in frame)
+    ]
+    if categorical:
+        categories = {
+            column: pd.Index(pd.concat([pd.Series(frame[column].cat.categories) for frame in with_rows])).unique()
+            for column in categorical
+        }
+        with_rows = [
+            frame.assign(**{column: frame[column].cat.set_categories(categories[column]) for column in categorical})
+            for frame in with_rows
+        ]
+    return pd.concat(with_rows, ignore_index=True)
+
+
+def memory_report(df):
+    """Per-column dtype and deep memory usage, largest first."""
+    usage = df.memory_usage(deep=True, index=False)
+    total = frame_nbytes(df)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'share': (usage / total * 100).round(2) if total else 0.0,
+    })
+    return report.sort_values('bytes', ascending=False)
@@ -0,0 +1,65 @@
+"""Callers waiting on a partition load, seen by every process.
+
+A PartitionCache caller that finds a day's lock taken waits for the holder
+to store that day instead of querying it again. Waits are registered here,
+so the query tracker leaves a load alone while others wait for its rows,
+and callers that got their rows that way are counted as coalesced.
+"""
+import contextvars
+import uuid
+from contextlib import contextmanager
+
+from services.shared_state import LocalState, SharedState
+
+# (cache name, day) keys the current thread is loading, if any
+_loading = contextvars.ContextVar('partition_loading', default=())
+
+
+class LoadWaits:
+    def __init__(self):
+        self._state = LocalState()
+
+    def share(self, cache):
+        """Keep the waits and counters in `cache` so other processes see them."""
+        self._state = SharedState(cache)
+
+    @contextmanager
+    def waiting(self, name, day, expire=None):
+        """Registers the caller as waiting for `day` of cache `name` inside this block."""
+        key = ('load-waiting', name, str(day), uuid.uuid4().hex)
+        # A process that died while waiting cannot leave its entry behind for long
+        self._state.set(key, True, expire=expire)
+        try:
+            yield
+        finally:
+            self._state.delete(key)
+
+    def waiters(self, keys):
+        """Callers currently waiting for any of the (name, day) `keys`."""
+        return sum(self._state.count('load-waiting', name, day) for name, day in keys)
+
+    @contextmanager
+    def loading(self, name, days):
+        """Marks the queries run inside this block as loading `days` of cache `name`."""
+        token = _loading.set(tuple((name, str(day)) for day in days))
+        try:
+            yield
+        finally:
+            _loading.reset(token)
+
+    def coalesced(self):
+        """Count a caller that waited and then used the rows another caller stored."""
+        self._state.incr(('load-count', 'coalesced'))
+
+    def stats(self):
+        return {'coalesced': self._state.get(('load-count', 'coalesced'), 0),
+                'waiting': self._state.count('load-waiting')}
+
+
+def loading():
+    """(cache name, day) keys the current thread is loading, or ()."""
+    return _loading.get()
+
+
+# Partition loads of every PartitionCache
+loads = LoadWaits()
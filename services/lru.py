@@ -0,0 +1,113 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def frame_nbytes(df):
+    """Deep memory footprint of a DataFrame, index included."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def approx_nbytes(value):
+    """Best-effort size of a cached value for LRU accounting."""
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_nbytes(item) for item in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class ByteLRU:
+    """Thread-safe LRU mapping bounded by the total size of its values.
+
+    Entries put with a `ttl` (or the default `ttl`) expire after that many
+    seconds; an expired entry reads as missing.
+    """
+
+    def __init__(self, max_bytes, sizeof=frame_nbytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _live(self, key):
+        # Caller holds the lock
+        item = self._items.get(key)
+        if item is not None and item[2] is not None and item[2] <= time.monotonic():
+            self.bytes -= self._items.pop(key)[1]
+            self.expirations += 1
+            return None
+        return item
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._live(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, ttl=None):
+        nbytes = self._sizeof(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._items:
+                self.bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, nbytes, expires_at)
+            self.bytes += nbytes
+            self.sets += 1
+            # Never evict the entry that was just inserted
+            while self.bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted_bytes, _) = self._items.popitem(last=False)
+                self.bytes -= evicted_bytes
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._live(key)
+            if item is None:
+                return default
+            self._items.pop(key)
+            self.bytes -= item[1]
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'sets': self.sets,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
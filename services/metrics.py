@@ -0,0 +1,381 @@
+"""Per-callback latency and payload metrics, served as Prometheus text on /metrics.
+
+instrument_callbacks() must run before the Dash app is created: from then
+on every callback registered with @callback or @app.callback is timed.
+serve(app) adds the request hooks and the /metrics route.
+
+Each request to /_dash-update-component is split into three phases:
+deserialize (request start to the callback body, i.e. JSON parsing and
+argument mapping), compute (the callback body) and serialize (callback
+return to the response, i.e. output validation and JSON encoding). Request
+and response bytes are recorded per callback too. Background callbacks run
+their body in a job process, so their compute phase is recorded there and
+their requests (start and polls) have no phase split.
+
+Every process (gunicorn worker, background job) keeps its own numbers and
+writes them to BRIDGE_METRICS_DIR; a scrape adds up the files of every
+process, so any worker answers for all of them. Files of processes that
+exited are folded into one retired.json, which keeps counters monotonic;
+their gauges are dropped. The connection pools of each process (services/db.py)
+are exported the same way, as per-section gauges and counters. Dashboard
+query outcomes (services/cancellation.py) and partition load waits
+(services/load_waits.py) are already kept in the shared background cache,
+so they are read from there on each scrape.
+"""
+import atexit
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from functools import wraps
+
+import flask
+import psutil
+from dash import _callback
+from dash.exceptions import PreventUpdate
+
+from services import cancellation, db, load_waits
+from services.arrow_store import FileLock
+
+METRICS_DIR = os.environ.get(
+    "BRIDGE_METRICS_DIR", os.path.join(tempfile.gettempdir(), "bridge_dashboards", "metrics")
+)
+# A process writes its numbers at most this often while serving, and on every scrape
+FLUSH_INTERVAL = 5
+RETIRED_FILE = 'retired.json'
+UPDATE_PATH = '/_dash-update-component'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'dash_callback_calls_total': ('counter', "Callback invocations.", None),
+    'dash_callback_exceptions_total': ('counter', "Callbacks that raised, by exception class.", None),
+    'dash_callback_prevented_total': ('counter', "Callbacks that raised PreventUpdate.", None),
+    'dash_callback_duration_seconds': ('histogram', "Callback request time by phase.", DURATION_BUCKETS),
+    'dash_callback_request_seconds': ('histogram', "Callback request wall time.", DURATION_BUCKETS),
+    'dash_callback_request_bytes': ('histogram', "Callback request body size.", BYTES_BUCKETS),
+    'dash_callback_response_bytes': ('histogram', "Callback response body size.", BYTES_BUCKETS),
+    'db_pool_size': ('gauge', "Configured pool size, summed over live processes.", None),
+    'db_pool_checked_out': ('gauge', "Connections in use.", None),
+    'db_pool_checked_in': ('gauge', "Idle pooled connections.", None),
+    'db_pool_overflow': ('gauge', "Connections open beyond the pool size (negative while the pool is not full).", None),
+    'db_pool_checkouts_total': ('counter', "Connections checked out of the pool.", None),
+    'db_pool_timeouts_total': ('counter', "Checkouts that gave up after pool_timeout.", None),
+    'db_pool_wait_seconds_total': ('counter', "Time spent waiting for a pooled connection.", None),
+    'dashboard_queries_started_total': ('counter', "Dashboard queries started.", None),
+    'dashboard_queries_cancelled_total': ('counter', "Dashboard queries killed by a newer request.", None),
+    'dashboard_queries_timed_out_total': ('counter', "Dashboard queries stopped by the statement timeout.", None),
+    'dashboard_queries_failed_total': ('counter', "Dashboard queries that failed otherwise.", None),
+    'dashboard_queries_running': ('gauge', "Dashboard queries running now.", None),
+    'partition_loads_coalesced_total': ('counter', "Partition loads served by waiting for another caller's query.", None),
+    'partition_load_waiters': ('gauge', "Callers waiting for another caller's partition load now.", None),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_pid = os.getpid()
+_flushed_at = 0.0
+
+
+def label(callback_id):
+    """Readable output id of a callback: "id.prop" per output, comma separated.
+
+    Dash joins multiple outputs as "..a.b...c.d.." and suffixes outputs with
+    allow_duplicate by a hash of the inputs, kept here to its first 8 digits
+    so such callbacks stay apart.
+    """
+    if callback_id.startswith('..') and callback_id.endswith('..'):
+        callback_id = ','.join(callback_id[2:-2].split('...'))
+    return re.sub(r'@([0-9a-f]{8})[0-9a-f]{56}', r'@\1', callback_id)
+
+
+def _reset_after_fork():
+    # A forked process starts with a copy of its parent's numbers, which the
+    # parent reports itself
+    global _pid, _flushed_at
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        _flushed_at = 0.0
+        _counters.clear()
+        _histograms.clear()
+
+
+def inc(name, labels, value=1):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _reset_after_fork()
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, labels, value):
+    buckets = METRICS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _reset_after_fork()
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+def _timed(func, callback_label, background):
+    @wraps(func)
+    def timed(*args, **kwargs):
+        labels = {'callback': callback_label}
+        inc('dash_callback_calls_total', labels)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            inc('dash_callback_prevented_total', labels)
+            raise
+        except Exception as e:
+            inc('dash_callback_exceptions_total', {**labels, 'exception': type(e).__name__})
+            raise
+        finally:
+            finished = time.perf_counter()
+            if background:
+                # Job processes exit without serving another request
+                observe('dash_callback_duration_seconds', {**labels, 'phase': 'compute'}, finished - started)
+                flush()
+            elif flask.has_request_context():
+                flask.g.metrics_compute = (started, finished)
+
+    return timed
+
+
+def instrument_callbacks():
+    """Time every callback registered from now on; call before creating the Dash app."""
+    register = _callback.register_callback
+    if getattr(register, 'instrumented', False):
+        return
+
+    def register_callback(callback_list, *args, **kwargs):
+        wrap_func = register(callback_list, *args, **kwargs)
+        callback_label = label(callback_list[-1]['output'])
+        background = kwargs.get('background') is not None
+
+        def wrap_timed(func):
+            # Only Dash calls the timed copy; the page module keeps the plain function
+            wrap_func(_timed(func, callback_label, background))
+            return func
+
+        return wrap_timed
+
+    register_callback.instrumented = True
+    _callback.register_callback = register_callback
+
+
+def _before_request():
+    if flask.request.path.endswith(UPDATE_PATH):
+        flask.g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = flask.g.pop('metrics_started', None)
+    if started is None:
+        return response
+    finished = time.perf_counter()
+    try:
+        body = flask.request.get_json(silent=True) or {}
+        labels = {'callback': label(body.get('output', 'unknown'))}
+        observe('dash_callback_request_seconds', labels, finished - started)
+        compute = flask.g.pop('metrics_compute', None)
+        if compute is not None:
+            observe('dash_callback_duration_seconds', {**labels, 'phase': 'deserialize'}, compute[0] - started)
+            observe('dash_callback_duration_seconds', {**labels, 'phase': 'compute'}, compute[1] - compute[0])
+            observe('dash_callback_duration_seconds', {**labels, 'phase': 'serialize'}, finished - compute[1])
+        request_bytes = flask.request.content_length
+        if request_bytes is None:
+            request_bytes = len(flask.request.get_data())
+        observe('dash_callback_request_bytes', labels, request_bytes)
+        response_bytes = response.content_length
+        if response_bytes is None and not response.is_streamed:
+            response_bytes = len(response.get_data())
+        if response_bytes is not None:
+            observe('dash_callback_response_bytes', labels, response_bytes)
+        if time.monotonic() - _flushed_at > FLUSH_INTERVAL:
+            flush()
+    except Exception as e:
+        print(f"Error recording callback metrics: {e}")
+    return response
+
+
+def _pool_samples():
+    """(counters, gauges) of this process's connection pools."""
+    counters, gauges = [], []
+    for section, stats in db.pool_stats().items():
+        labels = {'section': section}
+        gauges += [['db_pool_size', labels, stats['size']], ['db_pool_checked_out', labels, stats['checked_out']],
+                   ['db_pool_checked_in', labels, stats['checked_in']], ['db_pool_overflow', labels, stats['overflow']]]
+        counters += [['db_pool_checkouts_total', labels, stats['acquired']],
+                     ['db_pool_timeouts_total', labels, stats['timeouts']],
+                     ['db_pool_wait_seconds_total', labels, stats['wait_total_ms'] / 1000]]
+    return counters, gauges
+
+
+def _shared_samples():
+    """(counters, gauges) kept in the shared background cache, for all processes at once."""
+    queries = cancellation.queries.stats()
+    loads = load_waits.loads.stats()
+    counters = [[f'dashboard_queries_{name}_total', {}, queries[name]] for name in cancellation.COUNTERS]
+    counters.append(['partition_loads_coalesced_total', {}, loads['coalesced']])
+    gauges = [['dashboard_queries_running', {}, queries['running']],
+              ['partition_load_waiters', {}, loads['waiting']]]
+    return counters, gauges
+
+
+def _snapshot():
+    pool_counters, pool_gauges = _pool_samples()
+    with _lock:
+        _reset_after_fork()
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in _counters.items()] + pool_counters,
+            'histograms': [[name, dict(labels), dict(h, buckets=list(h['buckets']))]
+                           for (name, labels), h in _histograms.items()],
+            'gauges': pool_gauges,
+        }
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'counters': [], 'histograms': [], 'gauges': []}
+
+
+def flush():
+    """Write this process's numbers to METRICS_DIR."""
+    global _flushed_at
+    snapshot = _snapshot()
+    if not snapshot['counters'] and not snapshot['histograms'] and not snapshot['gauges']:
+        return
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write_json(os.path.join(METRICS_DIR, f"{os.getpid()}.json"), snapshot)
+        _flushed_at = time.monotonic()
+    except OSError as e:
+        print(f"Error writing callback metrics: {e}")
+
+
+def _merge(into, snapshot, gauges=True):
+    for name, labels, value in snapshot['counters']:
+        key = (name, tuple(sorted(labels.items())))
+        into['counters'][key] = into['counters'].get(key, 0) + value
+    # A gauge is a current reading, which a process that exited no longer has
+    for name, labels, value in snapshot.get('gauges', []) if gauges else []:
+        key = (name, tuple(sorted(labels.items())))
+        into['gauges'][key] = into['gauges'].get(key, 0) + value
+    for name, labels, h in snapshot['histograms']:
+        key = (name, tuple(sorted(labels.items())))
+        merged = into['histograms'].get(key)
+        if merged is None:
+            into['histograms'][key] = dict(h, buckets=list(h['buckets']))
+        else:
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], h['buckets'])]
+            merged['sum'] += h['sum']
+            merged['count'] += h['count']
+
+
+def _alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def collect():
+    """Numbers of every process, live and exited, added up."""
+    flush()
+    merged = {'counters': {}, 'histograms': {}, 'gauges': {}}
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    retired_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+    with FileLock(os.path.join(METRICS_DIR, 'retire.lock')):
+        retired = None
+        for entry in os.listdir(METRICS_DIR):
+            pid = entry[:-len('.json')]
+            if not entry.endswith('.json') or not pid.isdigit():
+                continue
+            path = os.path.join(METRICS_DIR, entry)
+            snapshot = _read_json(path)
+            if _alive(int(pid)):
+                _merge(merged, snapshot)
+                continue
+            if retired is None:
+                retired = {'counters': {}, 'histograms': {}, 'gauges': {}}
+                _merge(retired, _read_json(retired_path), gauges=False)
+            _merge(retired, snapshot, gauges=False)
+            _write_json(retired_path, {
+                'counters': [[name, dict(labels), value] for (name, labels), value in retired['counters'].items()],
+                'histograms': [[name, dict(labels), h] for (name, labels), h in retired['histograms'].items()],
+            })
+            os.remove(path)
+        _merge(merged, _read_json(retired_path), gauges=False)
+    shared_counters, shared_gauges = _shared_samples()
+    _merge(merged, {'counters': shared_counters, 'gauges': shared_gauges, 'histograms': []})
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}' if labels else ''
+
+
+def render(merged):
+    """Prometheus text exposition format of collect()'s result."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind in ('counter', 'gauge'):
+            for (metric, labels), value in sorted(merged[kind + 's'].items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            continue
+        for (metric, labels), h in sorted(merged['histograms'].items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), h['buckets']):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels((*labels, ('le', bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def serve(app):
+    """Record callback requests of `app` and expose the numbers on /metrics."""
+    server = app.server
+    server.before_request(_before_request)
+    server.after_request(_after_request)
+
+    @server.route('/metrics')
+    def metrics():
+        return flask.Response(render(collect()), mimetype='text/plain; version=0.0.4')
+
+    atexit.register(flush)
@@ -0,0 +1,261 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from services import arrow_store, cache, load_waits
+from services.frames import concat_frames
+from services.lru import frame_nbytes
+
+# Bookings are bucketed by their IST calendar day
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def ist_today():
+    return datetime.now(IST).date()
+
+
+def to_date(value):
+    return pd.to_datetime(value).date()
+
+
+def contiguous_runs(days):
+    """Group sorted dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+class Partition:
+    __slots__ = ('frame', 'loaded_at', 'closed')
+
+    def __init__(self, frame, loaded_at, closed):
+        self.frame = frame
+        self.loaded_at = loaded_at
+        self.closed = closed
+
+
+class PartitionCache:
+    """Prepared rows kept as one partition per IST day.
+
+    `loader(start_date, end_date)` must return the prepared rows for that
+    inclusive window, with the day of each row in `day_column`; a window
+    without rows still needs the prepared columns and dtypes, since days
+    without rows are stored as its empty slice. Only the days that are not
+    cached are loaded. A day is closed once it lies more than `open_days - 1`
+    days before today; closed partitions never change, open ones are
+    reloaded after `open_ttl` seconds.
+
+    With `shared_dir`, partitions are also written there as Arrow files
+    (``<day>.<loaded_at>.<open|closed>.arrow``) and memory-mapped, so every
+    worker process on the host reads the same copy. A worker takes the
+    day's lockfile before loading it; workers waiting on that lock then map
+    the file it wrote instead of querying again. Those waits are registered
+    in load_waits.loads, which also counts the callers they saved a query.
+    A caller that times out on a lock after `open_ttl` seconds loads that
+    day for itself and leaves the shared file to the lock holder.
+
+    Partitions are also held in the ``partitions-<name>`` cache namespace
+    when the cache backend is shared (disk or Redis), which shares them
+    between hosts as well. With the per-process memory backend and a
+    `shared_dir` that tier is skipped: loads run in forked background jobs
+    whose memory is gone once they return, so the mapped files are what
+    every process, the server included, reads from.
+    """
+
+    def __init__(self, name, loader, day_column, max_bytes, open_ttl=300, open_days=1, shared_dir=None):
+        self.name = name
+        self.loader = loader
+        self.day_column = day_column
+        self.open_ttl = open_ttl
+        self.open_days = open_days
+        self.shared_dir = shared_dir
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+        self._partitions = None
+        if cache.backend.shared or not shared_dir:
+            self._partitions = cache.namespace(
+                f"partitions-{name}", max_bytes, sizeof=lambda value: frame_nbytes(value[0]))
+        self.loads = 0
+        self.loaded_days = 0
+        self.shared_hits = 0
+        self.coalesced = 0
+
+    def _is_closed(self, day, today):
+        return day <= today - timedelta(days=self.open_days)
+
+    def _is_fresh(self, day, partition, today, now):
+        if partition.closed:
+            return True
+        if self._is_closed(day, today):
+            # Loaded while the day was still open, fetch the final version once
+            return False
+        return now - partition.loaded_at < self.open_ttl
+
+    def _cached(self, day):
+        if self._partitions is None:
+            return None
+        value = self._partitions.get(day)
+        return None if value is None else Partition(*value)
+
+    def _remember(self, day, partition):
+        if self._partitions is None:
+            return
+        # Stored as a plain tuple so every cache backend can serialize it
+        self._partitions.put(day, (partition.frame, partition.loaded_at, partition.closed))
+
+    def _shared_files(self, day):
+        """(loaded_at, closed, path) of the day's shared files, newest first."""
+        prefix = f"{day.isoformat()}."
+        files = []
+        for entry in os.scandir(self.shared_dir):
+            if entry.name.startswith(prefix) and entry.name.endswith('.arrow'):
+                _, loaded_at, state, _ = entry.name.split('.')
+                files.append((int(loaded_at) / 1e9, state == 'closed', entry.path))
+        return sorted(files, reverse=True)
+
+    def _map_shared(self, day, today, now):
+        """Partition mapped from the newest fresh shared file of `day`, or None."""
+        files = self._shared_files(day)
+        if not files:
+            return None
+        loaded_at, closed, path = files[0]
+        if not self._is_fresh(day, Partition(None, loaded_at, closed), today, now):
+            return None
+        try:
+            partition = Partition(arrow_store.read_frame(path), loaded_at, closed)
+        except (FileNotFoundError, OSError):
+            # Replaced and removed by a newer load in the meantime
+            return None
+        self._remember(day, partition)
+        self.shared_hits += 1
+        return partition
+
+    def _store(self, day, part, loaded_at, closed, shared=True):
+        if shared and self.shared_dir and arrow_store.can_store(part):
+            path = os.path.join(
+                self.shared_dir, f"{day.isoformat()}.{int(loaded_at * 1e9)}.{'closed' if closed else 'open'}.arrow")
+            arrow_store.write_frame(part, path)
+            for _, _, old_path in self._shared_files(day)[1:]:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    # Still mapped on a platform that forbids removing it
+                    pass
+            part = arrow_store.read_frame(path)
+        partition = Partition(part, loaded_at, closed)
+        self._remember(day, partition)
+        return partition
+
+    def _load(self, missing, frames, today, shared=True):
+        for run_start, run_end in contiguous_runs(missing):
+            with load_waits.loads.loading(self.name, missing):
+                fetched = self.loader(run_start, run_end)
+            if fetched is None or fetched.columns.empty:
+                # Loader failed; do not cache anything for this request
+                return False
+            self.loads += 1
+            loaded_at = time.time()
+
+            positions = fetched.groupby(self.day_column, sort=False).indices
+            empty = fetched.iloc[0:0]
+            day = run_start
+            while day <= run_end:
+                part = fetched.take(positions[day]) if day in positions else empty
+                part = part.reset_index(drop=True)
+                frames[day] = self._store(day, part, loaded_at, self._is_closed(day, today), shared).frame
+                self.loaded_days += 1
+                day += timedelta(days=1)
+        return True
+
+    def _lock_days(self, days):
+        """Locks held, days whose lock another caller was holding, and days whose lock timed out."""
+        locks = []
+        waited = set()
+        unlocked = set()
+        # Always in date order, so two workers never wait on each other
+        for day in sorted(days):
+            lock = arrow_store.FileLock(os.path.join(self.shared_dir, f"{day.isoformat()}.lock"), timeout=self.open_ttl)
+            if not lock.acquire(blocking=False):
+                waited.add(day)
+                with load_waits.loads.waiting(self.name, day, expire=self.open_ttl):
+                    if not lock.acquire():
+                        print(f"Timed out waiting for the {self.name} partition lock of {day}, loading it unshared")
+                        unlocked.add(day)
+                        continue
+            locks.append(lock)
+        return locks, waited, unlocked
+
+    def get_range(self, start_date, end_date):
+        start_date, end_date = to_date(start_date), to_date(end_date)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        today = ist_today()
+        now = time.time()
+
+        frames = {}
+        missing = []
+        for day in days:
+            partition = self._cached(day)
+            if partition is None or not self._is_fresh(day, partition, today, now):
+                partition = self._map_shared(day, today, now) if self.shared_dir else None
+            if partition is not None:
+                frames[day] = partition.frame
+            else:
+                missing.append(day)
+
+        if missing and self.shared_dir:
+            locks, waited, unlocked = self._lock_days(missing)
+            try:
+                # Another worker may have loaded some of them while we waited
+                now = time.time()
+                still_missing = []
+                for day in missing:
+                    partition = self._map_shared(day, today, now)
+                    if partition is not None:
+                        frames[day] = partition.frame
+                    else:
+                        still_missing.append(day)
+                if waited & (set(missing) - set(still_missing)):
+                    self.coalesced += 1
+                    load_waits.loads.coalesced()
+                # Days whose lock we do not hold are loaded for this caller only,
+                # never written over the shared file the holder is producing
+                locked = [day for day in still_missing if day not in unlocked]
+                unshared = [day for day in still_missing if day in unlocked]
+                if not self._load(locked, frames, today) or not self._load(unshared, frames, today, shared=False):
+                    return pd.DataFrame()
+            finally:
+                for lock in locks:
+                    lock.release()
+        elif missing and not self._load(missing, frames, today):
+            return pd.DataFrame()
+
+        if not frames:
+            return pd.DataFrame()
+        return concat_frames([frames[day] for day in days])
+
+    def invalidate(self, day=None):
+        if self._partitions is None:
+            pass
+        elif day is None:
+            self._partitions.clear()
+        else:
+            self._partitions.pop(to_date(day))
+        if self.shared_dir:
+            for entry in os.scandir(self.shared_dir):
+                if entry.name.endswith('.arrow') and (day is None or entry.name.startswith(f"{to_date(day).isoformat()}.")):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def stats(self):
+        stats = self._partitions.stats() if self._partitions is not None else {}
+        stats.update({'name': self.name, 'loads': self.loads, 'loaded_days': self.loaded_days,
+                      'shared_hits': self.shared_hits, 'coalesced': self.coalesced})
+        return stats
@@ -0,0 +1,116 @@
+# Dashboard SQL. Parameters use the pyformat style understood by PyMySQL.
+
+# Core conversion panel rows for an IST booking-date window
+CORE_QUERY = """
+WITH WindowBookings AS (
+    SELECT booking_id
+    FROM go_bumpr.user_booking_tb
+    WHERE log BETWEEN
+        SUBTIME(CONCAT(%(start_date)s, ' 00:00:00'), '05:30:00') AND
+        SUBTIME(CONCAT(%(end_date)s, ' 23:59:59'), '05:30:00')
+),
+LatestComments AS (
+    -- One comment per booking: latest log wins, highest id breaks ties
+    SELECT book_id, comments, category
+    FROM (
+        SELECT
+            ac.book_id,
+            ac.comments,
+            ac.category,
+            ROW_NUMBER() OVER (PARTITION BY ac.book_id ORDER BY ac.log DESC, ac.id DESC) AS comment_rank
+        FROM admin_comments_tbl ac
+        JOIN WindowBookings wb ON wb.booking_id = ac.book_id
+    ) ranked
+    WHERE comment_rank = 1
+)
+SELECT DISTINCT
+    a.booking_id,
+    CONCAT(UPPER(LEFT(TRIM(a.vehicle_type), 1)), LOWER(SUBSTRING(TRIM(a.vehicle_type), 2))) AS vehicle_type,
+    a.status AS booking_status,
+    a.booking_status AS booking_status_code,
+    a.axle_flag,
+    a.flag,
+    a.flag_unwntd,
+    a.enquiry_flag,
+    a.log AS raw_log_timestamp,
+    DATE(ADDTIME(a.log, '05:30:00')) AS booking_date,
+    b.b2b_check_in_report,
+    b.b2b_swap_flag,
+    a.service_status AS service_status_code,
+    a.city,
+    a.service_type,
+    c.master_service,
+    d.name AS crm_admin_name,
+    e.user_source,
+    f.activity AS activity_name,
+    a.activity_status AS activity_status_code,
+    lc.comments,
+    lc.category,
+    g.b2b_shop_name,
+    uv.vehicle_id AS user_vehicle_id,
+    a.vech_id,
+    uv.id AS vehicle_table_id,
+    a.user_veh_id
+FROM go_bumpr.user_booking_tb a
+LEFT JOIN b2b.b2b_booking_tbl b ON a.booking_id = b.gb_booking_id
+LEFT JOIN go_bumpr.go_axle_service_price_tbl c ON a.service_type = c.service_type AND a.vehicle_type = c.type
+LEFT JOIN crm_admin d ON d.crm_log_id = a.crm_update_id
+LEFT JOIN user_vehicle_table uv ON uv.id = a.user_veh_id
+LEFT JOIN go_bumpr.user_source_tbl e ON e.user_source = a.source
+LEFT JOIN go_bumpr.admin_activity_tbl f ON f.id = a.activity_status
+LEFT JOIN b2b.b2b_mec_tbl g ON g.b2b_shop_id = b.b2b_shop_id
+LEFT JOIN LatestComments lc ON a.booking_id = lc.book_id
+WHERE
+    a.log BETWEEN 
+        SUBTIME(CONCAT(%(start_date)s, ' 00:00:00'), '05:30:00') AND 
+        SUBTIME(CONCAT(%(end_date)s, ' 23:59:59'), '05:30:00')
+    AND (a.mec_id NOT IN (400001, 200018, 200379, 203042, 400974) or a.mec_id is null)
+    AND a.user_id NOT IN (21816, 41317, 859, 3132, 20666, 56511, 2792, 128, 19, 7176, 19470, 1, 951, 103699, 113453, 108783, 226, 252884, 189598, 133986, 270162, 298572, 287322, 53865, 289516, 14485, 1678, 30865, 125455, 338469, 9570, 388733, 276771, 392833, 378368, 309341, 299526, 304771, 1935, 22115, 44794, 1031939, 639065, 662228, 965020, 804253, 722759, 378258, 1088113, 1165855, 1165488, 1133076, 1288252, 304783)
+    AND a.source NOT IN ('Sulekha Booking', 'Sbi Bookings', 'BTL Booking', 'RSA Bookings', 'nmsa_web', 'Uber')
+    AND (a.service_type NOT IN ('Breakdown Assistance', 'Bike Tyre Puncture', 'Car Tyre Puncture', 'Flat Tyre Assistance', 'Vehicle Towing', 'Puncture', 'Towing', 'Bike Breakdown', 'Bike Puncture', 'Deep Clean', 'IOCL Check-up') or a.service_type is null)
+    AND a.nmsa_flag != 1
+    AND a.flag_unwntd != 1
+    AND (b.b2b_swap_flag !=1 or b.b2b_swap_flag is null)
+"""
+
+# Feedback panel rows for a check-in date window: one per check-in report and
+# follow-up of its booking (one with no follow-up columns if it has none), as
+# the page has always counted them. The half-open range on c.b2b_log lets
+# idx_checkin_log drive the joins, and only the columns the page reads are
+# returned. b2b_status is only required to exist and the price table is
+# reduced to one master service per (service type, vehicle type), so no other
+# join repeats a row and no DISTINCT is needed.
+FEEDBACK_QUERY = """
+WITH ServiceMasters AS (
+    -- The price table has a row per price; the master service is the same on each
+    SELECT service_type, type, MIN(master_service) AS master_service
+    FROM go_bumpr.go_axle_service_price_tbl
+    GROUP BY service_type, type
+)
+SELECT
+    b.gb_booking_id,
+    b.b2b_cust_phone AS customer_number,
+    b.b2b_vehicle_type,
+    b.tvs_job_card_no,
+    b.b2b_log AS goaxle_date,
+    b.brand AS make,
+    b.model,
+    g.source AS g_source,
+    g.log AS booking_date,
+    g.city AS g_city,
+    g.service_status AS g_service_status,
+    cm.name AS cm_name,
+    c.b2b_log,
+    ms.master_service AS ms_master_service
+FROM b2b.b2b_checkin_report c
+JOIN b2b.b2b_booking_tbl b ON b.b2b_booking_id = c.b2b_booking_id
+LEFT JOIN go_bumpr.user_booking_tb g ON g.booking_id = b.gb_booking_id
+LEFT JOIN ServiceMasters ms ON ms.service_type = g.service_type AND ms.type = g.vehicle_type
+LEFT JOIN go_bumpr.feedback_track f ON f.b2b_booking_id = b.b2b_booking_id
+LEFT JOIN go_bumpr.crm_admin cm ON cm.crm_log_id = f.crm_goaxle_id
+WHERE
+    c.b2b_log >= %(start_date)s
+    AND c.b2b_log < %(end_date)s + INTERVAL 1 DAY
+    AND (b.b2b_check_in_report = 1 OR g.service_status IN ('Completed', 'inprogress'))
+    AND EXISTS (SELECT 1 FROM b2b.b2b_status s WHERE s.b2b_booking_id = b.b2b_booking_id)
+"""
@@ -0,0 +1,252 @@
+"""Slow-query log for the dashboard SQL.
+
+Every query run through read_sql() appends one JSON line to a log file of
+its process next to BRIDGE_QUERY_LOG (queries.log becomes queries.<pid>.log),
+so rotation never races another process. Each line has the duration, rows
+returned, bytes the server sent for it
+(the session's Bytes_sent counter, MySQL and MariaDB), the bound parameters
+and, if it failed, the error. A query slower than BRIDGE_SLOW_QUERY_MS is
+explained with EXPLAIN FORMAT=JSON on the same connection and the line also
+carries the statement and its plan.
+
+    python -m services.query_log --since 24h            # worst query shapes of the last day
+    python -m services.query_log --since 2h --explain   # with the latest plan of each
+
+A query shape is the query name plus a digest of its whitespace-normalized
+statement, so an edited query shows up apart from its older version. The
+summary reads the files of every process; files untouched for
+QUERY_LOG_RETENTION_DAYS are removed when a process opens its own.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+QUERY_LOG_PATH = os.environ.get(
+    "BRIDGE_QUERY_LOG", os.path.join(tempfile.gettempdir(), "bridge_dashboards", "queries.log")
+)
+SLOW_QUERY_MS = float(os.environ.get("BRIDGE_SLOW_QUERY_MS", 2000))
+QUERY_LOG_MAX_BYTES = 20 * 2**20
+QUERY_LOG_BACKUPS = 5
+QUERY_LOG_RETENTION_DAYS = 14
+
+_logger = logging.getLogger('bridge.queries')
+_logger.propagate = False
+_logger.setLevel(logging.INFO)
+_handler_lock = threading.Lock()
+# Process the handler was opened by; a forked child opens its own file
+_handler_pid = None
+
+
+def process_log_path(path=QUERY_LOG_PATH, pid=None):
+    """Log file of process `pid` (this one by default) for the base path `path`."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def log_files(path=QUERY_LOG_PATH):
+    """Log files of every process for `path`, rotated ones included, and `path` itself."""
+    root, ext = os.path.splitext(path)
+    pattern = re.compile(re.escape(root) + r'\.\d+' + re.escape(ext) + r'(\.\d+)?')
+    return [p for p in glob.glob(f"{glob.escape(root)}.*") if pattern.fullmatch(p)] + [path]
+
+
+def _prune(path):
+    cutoff = time.time() - QUERY_LOG_RETENTION_DAYS * 86400
+    for log_path in log_files(path):
+        try:
+            if os.path.getmtime(log_path) < cutoff:
+                os.remove(log_path)
+        except OSError:
+            pass
+
+
+def _log(entry):
+    global _handler_pid
+    if _handler_pid != os.getpid():
+        with _handler_lock:
+            if _handler_pid != os.getpid():
+                for handler in list(_logger.handlers):
+                    # Inherited from the parent process, whose file that is
+                    _logger.removeHandler(handler)
+                    handler.close()
+                os.makedirs(os.path.dirname(QUERY_LOG_PATH) or '.', exist_ok=True)
+                _prune(QUERY_LOG_PATH)
+                _logger.addHandler(logging.handlers.RotatingFileHandler(
+                    process_log_path(), maxBytes=QUERY_LOG_MAX_BYTES, backupCount=QUERY_LOG_BACKUPS))
+                _handler_pid = os.getpid()
+    _logger.info(json.dumps(entry, default=str))
+
+
+def shape(sql):
+    """Digest of a statement with its whitespace normalized."""
+    return hashlib.sha1(' '.join(sql.split()).encode()).hexdigest()[:12]
+
+
+def _bytes_sent(conn):
+    try:
+        return int(conn.exec_driver_sql("SHOW SESSION STATUS LIKE 'Bytes_sent'").fetchone()[1])
+    except Exception:
+        return None
+
+
+def _explain(conn, sql, params):
+    try:
+        plan = conn.exec_driver_sql(f"EXPLAIN FORMAT=JSON {sql}", params).scalar()
+        return json.loads(plan), None
+    except Exception as e:
+        return None, str(e)
+
+
+def read_sql(name, sql, conn, params):
+    """pd.read_sql(sql, conn, params=params), logged under `name`.
+
+    Errors are logged and re-raised for the caller to handle.
+    """
+    entry = {'ts': time.time(), 'name': name, 'shape': shape(sql), 'params': params, 'pid': os.getpid()}
+    sent_before = _bytes_sent(conn)
+    started = time.perf_counter()
+    try:
+        df = pd.read_sql(sql, conn, params=params)
+    except BaseException as e:
+        entry['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        entry['error'] = str(e)
+        raise
+    else:
+        entry['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        entry['rows'] = len(df)
+        sent_after = _bytes_sent(conn)
+        # Includes the few bytes of the first SHOW STATUS result
+        entry['bytes'] = sent_after - sent_before if sent_before is not None and sent_after is not None else None
+        return df
+    finally:
+        if entry['duration_ms'] >= SLOW_QUERY_MS:
+            # Also for queries stopped by MAX_EXECUTION_TIME or KILL QUERY,
+            # which leave the connection usable
+            entry['slow'] = True
+            entry['sql'] = sql
+            entry['explain'], explain_error = _explain(conn, sql, params)
+            if explain_error:
+                entry['explain_error'] = explain_error
+        _log(entry)
+
+
+def read_entries(path=QUERY_LOG_PATH, since=None):
+    """Log entries of every process logging under `path`, oldest first."""
+    entries = []
+    for log_path in log_files(path):
+        try:
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is None or entry.get('ts', 0) >= since:
+                        entries.append(entry)
+        except FileNotFoundError:
+            continue
+    entries.sort(key=lambda entry: entry.get('ts', 0))
+    return entries
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(entries):
+    """Per query shape: counts, duration percentiles, rows, bytes and the latest plan."""
+    shapes = {}
+    for entry in entries:
+        key = (entry.get('name'), entry.get('shape'))
+        summary = shapes.setdefault(key, {'name': key[0], 'shape': key[1], 'count': 0, 'errors': 0,
+                                          'slow': 0, 'durations': [], 'rows': [], 'bytes': [], 'last': None})
+        summary['count'] += 1
+        summary['durations'].append(entry.get('duration_ms', 0))
+        if entry.get('error'):
+            summary['errors'] += 1
+        if entry.get('slow'):
+            summary['slow'] += 1
+        if entry.get('rows') is not None:
+            summary['rows'].append(entry['rows'])
+        if entry.get('bytes') is not None:
+            summary['bytes'].append(entry['bytes'])
+        if entry.get('slow') or entry.get('error'):
+            summary['last'] = entry
+    rows = []
+    for summary in shapes.values():
+        durations = summary.pop('durations')
+        rows_returned = summary.pop('rows')
+        sent = summary.pop('bytes')
+        summary.update({
+            'total_ms': sum(durations),
+            'p50_ms': _percentile(durations, 0.5),
+            'p95_ms': _percentile(durations, 0.95),
+            'max_ms': max(durations),
+            'avg_rows': sum(rows_returned) / len(rows_returned) if rows_returned else None,
+            'avg_bytes': sum(sent) / len(sent) if sent else None,
+        })
+        rows.append(summary)
+    return rows
+
+
+def parse_window(text):
+    """Seconds in a window like 30m, 6h or 2d."""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected a window like 30m, 6h or 2d, not {text!r}")
+    return float(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the worst dashboard query shapes")
+    parser.add_argument('--log', default=QUERY_LOG_PATH)
+    parser.add_argument('--since', type=parse_window, default=parse_window('24h'), help="window, e.g. 30m, 6h, 2d")
+    parser.add_argument('--sort', choices=['total_ms', 'p95_ms', 'max_ms', 'count', 'errors'], default='total_ms')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--explain', action='store_true', help="print the latest plan or error of each shape")
+    args = parser.parse_args(argv)
+
+    entries = read_entries(args.log, since=time.time() - args.since)
+    if not entries:
+        print(f"No queries logged in {args.log} in that window")
+        return 0
+    summaries = sorted(summarize(entries), key=lambda s: s[args.sort], reverse=True)[:args.top]
+    print(f"{len(entries)} queries, {len({(e.get('name'), e.get('shape')) for e in entries})} shapes")
+    print(f"{'query':24} {'shape':12} {'count':>6} {'errors':>6} {'slow':>5} {'total s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'avg rows':>10} {'avg KiB':>9}")
+    for s in summaries:
+        avg_rows = f"{s['avg_rows']:.0f}" if s['avg_rows'] is not None else "-"
+        avg_kib = f"{s['avg_bytes'] / 1024:.1f}" if s['avg_bytes'] is not None else "-"
+        print(f"{s['name']:24} {s['shape']:12} {s['count']:6d} {s['errors']:6d} {s['slow']:5d} "
+              f"{s['total_ms'] / 1000:9.2f} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} {s['max_ms']:9.1f} "
+              f"{avg_rows:>10} {avg_kib:>9}")
+    if args.explain:
+        for s in summaries:
+            last = s['last']
+            if last is None:
+                continue
+            print(f"\n{s['name']} {s['shape']} at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last['ts']))}, "
+                  f"{last['duration_ms']:.0f} ms, params {last.get('params')}")
+            if last.get('error'):
+                print(f"  error: {last['error']}")
+            if last.get('explain') is not None:
+                print(json.dumps(last['explain'], indent=2))
+            elif last.get('explain_error'):
+                print(f"  EXPLAIN failed: {last['explain_error']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
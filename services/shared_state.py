@@ -0,0 +1,65 @@
+import threading
+
+
+class LocalState:
+    """Counters and entries of a single process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def incr(self, key):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + 1
+            return self._values[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value, expire=None):
+        with self._lock:
+            self._values[key] = value
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def delete_if(self, key, value):
+        with self._lock:
+            if self._values.get(key) == value:
+                del self._values[key]
+
+    def count(self, *prefix):
+        """Entries whose tuple key starts with `prefix`."""
+        with self._lock:
+            return sum(1 for key in self._values if isinstance(key, tuple) and key[:len(prefix)] == prefix)
+
+
+class SharedState:
+    """The same in a diskcache.Cache, shared by every process using it."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def incr(self, key):
+        return self._cache.incr(key, default=0)
+
+    def get(self, key, default=None):
+        return self._cache.get(key, default)
+
+    def set(self, key, value, expire=None):
+        self._cache.set(key, value, expire=expire)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def delete_if(self, key, value):
+        with self._cache.transact():
+            if self._cache.get(key) == value:
+                self._cache.delete(key)
+
+    def count(self, *prefix):
+        # Expired entries are only culled lazily, so check each match is still there
+        return sum(1 for key in self._cache.iterkeys()
+                   if isinstance(key, tuple) and key[:len(prefix)] == prefix and key in self._cache)
@@ -0,0 +1,52 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+    python wsgi.py --port 8501 --threads 8        # waitress, e.g. on Windows
+
+`python index.py` still starts the Flask development server for local work.
+
+Concurrency model: each worker process holds its own copy of the
+module-level state in pages/core.py and pages/feedback.py (partition
+caches, dataset registry, pivot memo, connection pools) and serves
+requests from several threads. That state is safe to share between
+threads: the caches are lock-protected ByteLRUs, frames they hand out are
+never modified in place, and connections are checked out per query. What
+must be seen by every worker goes through disk: dataset handles created by
+the background loaders resolve from BRIDGE_DATASET_DIR (private to the
+service user), and job results, load slots, partition load waits and query
+cancellation live in BRIDGE_BACKGROUND_DIR.
+Partitions, pivots and page-access lookups are cache namespaces
+(services/cache.py): per process by default, shared by every worker when
+BRIDGE_CACHE_URL points at a disk directory or a Redis server.
+Callback metrics on /metrics add up the files every process writes to
+BRIDGE_METRICS_DIR (services/metrics.py), so any worker can be scraped.
+"""
+import argparse
+import os
+
+from index import app, server  # noqa: F401
+from services import db
+
+application = server
+
+# Dash finishes registering callbacks on its first request, and that step is
+# not thread-safe: run it here, before any worker thread serves traffic
+with server.test_client() as client:
+    client.get('/_dash-layout')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboards with waitress")
+    parser.add_argument('--host', default=os.environ.get('BRIDGE_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('BRIDGE_PORT', 8501)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('BRIDGE_THREADS', 8)))
+    args = parser.parse_args(argv)
+
+    from waitress import serve
+
+    db.warm_up()
+    serve(application, host=args.host, port=args.port, threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()